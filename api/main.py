@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -8,7 +9,6 @@ import sys
 import subprocess
 import time
 import html
-import urllib.request
 import urllib.parse
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -17,19 +17,39 @@ from pathlib import Path
 # - uvicorn api.main:app (repo root)
 # - uvicorn main:app (rootDir=api)
 try:
-    from api.scheduler.autoschedule import init_scheduler
+    from api.scheduler.autoschedule import init_scheduler, wake_scheduler
     from api.utils.cycle_day import cycle_day_str
 except ModuleNotFoundError:
-    from scheduler.autoschedule import init_scheduler
+    from scheduler.autoschedule import init_scheduler, wake_scheduler
     from utils.cycle_day import cycle_day_str
 
 
 
 # Display enrichment (attach logos + live scores from local event snapshots)
 try:
-    from api.services.display_enrichment import enrich_contract_inplace, build_display_index
+    from api.services.display_enrichment import enrich_contract_inplace, build_display_index, display_index_stats, display_index_signature
 except ModuleNotFoundError:
-    from services.display_enrichment import enrich_contract_inplace, build_display_index  # type: ignore
+    from services.display_enrichment import enrich_contract_inplace, build_display_index, display_index_stats, display_index_signature  # type: ignore
+
+# Rendered-response cache (/bets/today)
+try:
+    from api.services.response_cache import BETS_TODAY_CACHE, dir_json_files, file_sha256, file_signature, signatures
+except ModuleNotFoundError:
+    from services.response_cache import BETS_TODAY_CACHE, dir_json_files, file_sha256, file_signature, signatures  # type: ignore
+
+# Live scores overlay (/bets/today lo mezcla al leer; el contrato congelado no se reescribe)
+try:
+    from api.services.live_overlay import apply_overlay, overlay_signature
+except ModuleNotFoundError:
+    from services.live_overlay import apply_overlay, overlay_signature  # type: ignore
+
+# Push de deltas live (/live/stream)
+try:
+    from api.services.live_hub import LIVE_HUB, event_key
+    from api.services.live_overlay import build_pick_index
+except ModuleNotFoundError:
+    from services.live_hub import LIVE_HUB, event_key  # type: ignore
+    from services.live_overlay import build_pick_index  # type: ignore
 
 
 # Contract building (fallback when contract.json is missing)
@@ -38,12 +58,29 @@ try:
 except ModuleNotFoundError:
     from services.contract_service import create_empty_contract, populate_contract_with_day_data  # type: ignore
 
+# Shared HTTP transport (keep-alive por host + métricas)
+try:
+    from api.services.http_transport import http_get, transport_stats
+except ModuleNotFoundError:
+    from services.http_transport import http_get, transport_stats  # type: ignore
+
+# Single-flight (coalescing de misses concurrentes)
+try:
+    from api.services.single_flight import SingleFlight
+except ModuleNotFoundError:
+    from services.single_flight import SingleFlight  # type: ignore
+
 # Live events multisource (ESPN + alternatives + snapshots)
 try:
     from api.services.live_events_multisource import LiveEventsMultiSource
 except ModuleNotFoundError:
     from services.live_events_multisource import LiveEventsMultiSource  # type: ignore
 
+try:
+    from api.services.live_fanout import fanout
+except ModuleNotFoundError:
+    from services.live_fanout import fanout  # type: ignore
+
 # Repo root: .../bot-ultimate-prediction
 REPO_ROOT = Path(__file__).resolve().parents[1]
 API_DATA_DIR = REPO_ROOT / "api" / "data"
@@ -54,6 +91,8 @@ API_DATA_DIR = REPO_ROOT / "api" / "data"
 
 _FLASH_TEAM_CACHE = {}   # (sport_name, norm_team_name) -> {"exp": float, "value": {...}}
 _FLASH_MATCH_CACHE = {}  # (sport_path, home_norm, away_norm, expected_date) -> {"exp": float, "value": {...}}
+_FLASH_TEAM_FLIGHT = SingleFlight("flash_team")    # misma clave que _FLASH_TEAM_CACHE
+_FLASH_MATCH_FLIGHT = SingleFlight("flash_match")  # misma clave que _FLASH_MATCH_CACHE
 
 def _flash_now() -> float:
     return time.time()
@@ -69,30 +108,20 @@ def _flash_norm_name(s: object) -> str:
             out.append(" ")
     return " ".join("".join(out).split())
 
+_FLASH_UA = "ultimate-predictor/1.0 (flashscore-resolver; +https://example.invalid)"
+
+def _flash_http_get_bytes(url: str, accept: str) -> bytes:
+    r = http_get(url, headers={"User-Agent": _FLASH_UA, "Accept": accept}, timeout=15)
+    r.raise_for_status()  # igual que urlopen: error en 4xx/5xx
+    return r.content
+
 def _flash_http_get_json(url: str):
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "ultimate-predictor/1.0 (flashscore-resolver; +https://example.invalid)",
-            "Accept": "application/json,text/plain,*/*",
-        },
-        method="GET",
-    )
-    with urllib.request.urlopen(req, timeout=15) as r:
-        raw = r.read().decode("utf-8", "replace")
+    raw = _flash_http_get_bytes(url, "application/json,text/plain,*/*").decode("utf-8", "replace")
     return json.loads(raw)
 
 def _flash_http_get_text(url: str) -> str:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "ultimate-predictor/1.0 (flashscore-resolver; +https://example.invalid)",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        },
-        method="GET",
-    )
-    with urllib.request.urlopen(req, timeout=15) as r:
-        return r.read().decode("utf-8", "replace")
+    return _flash_http_get_bytes(url, "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8").decode("utf-8", "replace")
+
 
 def _flash_pick_date_from_title_html(html_text: str):
     """Extract dd/mm/yyyy from <title>... without regex (best-effort)."""
@@ -147,6 +176,18 @@ def _flash_resolve_team(sport_name: str, team_name: str):
     if isinstance(hit, dict) and hit.get("exp", 0) > _flash_now():
         return hit.get("value")
 
+    # DF_SINGLE_FLIGHT: búsquedas concurrentes del mismo equipo -> 1 request a Livesport
+    def _leader():
+        hit2 = _FLASH_TEAM_CACHE.get(ck)  # otro leader pudo rellenarlo justo antes
+        if isinstance(hit2, dict) and hit2.get("exp", 0) > _flash_now():
+            return hit2.get("value")
+        return _flash_fetch_team(sport_name, team_name, norm, ck)
+
+    value, _shared = _FLASH_TEAM_FLIGHT.do(ck, _leader)
+    return value
+
+
+def _flash_fetch_team(sport_name: str, team_name: str, norm: str, ck: tuple):
     q = urllib.parse.quote_plus(team_name.strip())
     data = _flash_http_get_json(f"https://s.livesport.services/api/v2/search/?q={q}")
     if not isinstance(data, list):
@@ -364,18 +405,51 @@ async def add_api_headers(request: Request, call_next):
     response.headers["X-API-Version"] = "1"
     response.headers["X-Contract-Centric"] = "true"
     response.headers["X-API-Frozen"] = "true"
-    response.headers["Cache-Control"] = "no-store"
+    # endpoints con ETag (p.ej. /bets/today) fijan su propio Cache-Control
+    if "cache-control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store"
     return response
 
 
+def _bets_today_version(day: str) -> tuple:
+    """
+    DF_RESPONSE_CACHE: versión de los inputs de /bets/today para un día.
+    contract.json + artefactos de picks (fallback/rebuild) + snapshots del índice de display
+    + sidecar del overlay live.
+    """
+    contract_path = API_DATA_DIR / "contracts" / day / "contract.json"
+    picks = []
+    for sub in ("picks_classic", "picks_parlay"):
+        d = API_DATA_DIR / sub / day
+        picks.append((sub, file_signature(d), signatures(dir_json_files(d))))
+    for sub, name in (("picks_parlay_featured", "featured_parlay.json"), ("picks_value", "all.json")):
+        picks.append((sub, file_signature(API_DATA_DIR / sub / day / name)))
+    return (file_signature(contract_path), tuple(picks), display_index_signature(day), overlay_signature(day))
+
+
 # ✅ READ-ONLY endpoint (contrato = única verdad)
 # ✅ READ-ONLY endpoint (contrato = única verdad)
 @app.get("/bets/today")
-def get_today_bets(day: str = None):
+def get_today_bets(request: Request, day: str = None):
     if day is None:
         day = cycle_day_str()  # 06:00 Europe/Madrid cycle
-    
+
+    def _version() -> tuple:
+        return _bets_today_version(day)
+
+    cached = BETS_TODAY_CACHE.get(day, _version)
+    if cached is None:
+        # versión ANTES de renderizar: si un input cambia durante el render, el próximo request lo detecta
+        version = _version()
+        contract = _render_today_bets(day)
+        contract_path = API_DATA_DIR / "contracts" / day / "contract.json"
+        cached = BETS_TODAY_CACHE.put(day, contract, version, meta={"contract_sha256": file_sha256(contract_path)})
+    return cached.to_response(request)
+
+
+def _render_today_bets(day: str) -> dict:
     contract_path = API_DATA_DIR / "contracts" / day / "contract.json"
+    contract_sig = None
 
     if not contract_path.exists():
         # Fallback confiable: construir contrato desde snapshots locales (sin llamar APIs externas)
@@ -390,6 +464,7 @@ def get_today_bets(day: str = None):
         # NOTE: Do NOT persist fallback contracts from /bets/today.
         # The daily pipeline is the only writer of api/data/contracts/<day>/contract.json.
     else:
+        contract_sig = file_signature(contract_path)
         contract = json.loads(contract_path.read_text(encoding="utf-8"))
 
         # If a frozen contract exists but is empty (can happen after deploy/ephemeral FS),
@@ -415,9 +490,16 @@ def get_today_bets(day: str = None):
                     rebuilt["metadata"] = md
                 md["rebuilt_from_local_picks"] = True
                 contract = rebuilt
+                contract_sig = None
         except Exception as err:
             print('[contract_rebuild] failed:', err)
 
+    # DF_LIVE_OVERLAY: scores live sobre la copia en memoria (índice eventId -> picks cacheado por firma del contrato)
+    try:
+        apply_overlay(contract, day, contract_sig)
+    except Exception as err:
+        print('[live_overlay] failed:', err)
+
     # DF_ENRICH_CONTRACT_ON_READ: enriquecer en memoria (no re-escribe el contrato en disco)
     try:
         enrich_contract_inplace(contract)
@@ -573,6 +655,18 @@ def flashscore_match_url(
     if isinstance(mhit, dict) and mhit.get("exp", 0) > _flash_now():
         return mhit.get("value")
 
+    # DF_SINGLE_FLIGHT: el mismo partido pedido a la vez -> una sola resolución + verificación
+    def _leader():
+        mhit2 = _FLASH_MATCH_CACHE.get(mk)
+        if isinstance(mhit2, dict) and mhit2.get("exp", 0) > _flash_now():
+            return mhit2.get("value")
+        return _flash_resolve_match(sport_path, sport_name, home, away, expected_date, mk)
+
+    value, _shared = _FLASH_MATCH_FLIGHT.do(mk, _leader)
+    return value
+
+
+def _flash_resolve_match(sport_path: str, sport_name: str, home: str, away: str, expected_date, mk: tuple) -> dict:
     home_team = _flash_resolve_team(sport_name, home)
     away_team = _flash_resolve_team(sport_name, away)
 
@@ -625,7 +719,8 @@ def flashscore_match_url(
 # Live events snapshot (API-SPORTS) — READ-ONLY (in-memory cache)
 # ---------------------------------------------------------------------------
 
-_LIVE_EVENTS_CACHE = {}  # (sport, ids_csv) -> {"exp": float, "value": dict}
+_LIVE_EVENTS_CACHE = {}  # (sport, day) -> {"exp": float, "value": {"result": dict, "fetched_at": str}}
+_LIVE_EVENTS_FLIGHT = SingleFlight("live_events")  # misma clave que _LIVE_EVENTS_CACHE
 
 _LIVE_EVENT_BY_ID_CACHE = {}  # (sport, id) -> {"exp": float, "value": {"live": dict|None, "upstream_errors": any}}
 _SPORTS_NO_LIVE_ALL = {"handball"}  # productos donde `live=all` no existe (medido: handball)
@@ -758,18 +853,12 @@ def live_events(sport: str = "", ids: str = ""):
     if not sport or not ids_csv:
         raise HTTPException(status_code=400, detail="sport and ids are required")
 
-    # Check cache
-    ck = (sport, ids_csv)
-    now = time.time()
-    hit = _LIVE_EVENTS_CACHE.get(ck)
-    if isinstance(hit, dict) and hit.get("exp", 0) > now:
-        return hit.get("value")
-
     # Get today's date
     today = cycle_day_str()  # 06:00 Europe/Madrid cycle
-    
-    # Try multisource aggregator
-    result = LiveEventsMultiSource.get_live_events(sport, today)
+
+    # DF_SINGLE_FLIGHT: cache por deporte (no por ids) + misses concurrentes coalescidos
+    entry = _live_events_for_sport(sport, today)
+    result = entry["result"]
     live_by_id = result.get("live_by_id", {})
     
     # Filter by requested ids (if not in map, will just be missing from result)
@@ -781,17 +870,151 @@ def live_events(sport: str = "", ids: str = ""):
         "ids": ids_csv,
         "live_by_id": filtered,
         "source": result.get("source"),
-        "fetched_at": datetime.utcnow().isoformat(),
+        "fetched_at": entry["fetched_at"],
     }
     
     if result.get("error"):
         out["error"] = result.get("error")
-
-    # TTL: 5 minutes for alternatives (reasonably fresh), shorter for snapshots
-    ttl = 300 if result.get("source") in ("alternatives", "espn") else 60
-    _LIVE_EVENTS_CACHE[ck] = {"exp": now + ttl, "value": out}
     return out
 
+
+@app.post("/live/events/batch")
+def live_events_batch(payload: dict = Body(...)):
+    """
+    DF_LIVE_EVENTS_BATCH: live de todos los deportes del contrato en 1 request.
+
+    Body: {sport: [eventId, ...]}. Cada deporte se resuelve en paralelo contra el mismo
+    cache por deporte (+ single-flight) que /live/events.
+    Respuesta: live_by_id fusionado con claves "sport:eventId" + source/fetched_at/age_secs
+    (y error si lo hubo) por deporte. Como /live/events, 200 aunque falle algún proveedor.
+    """
+    wanted: dict = {}
+    for sport, ids in (payload or {}).items():
+        sport = str(sport or "").strip().lower()
+        if isinstance(ids, str):
+            ids = _ids_list_from_csv(ids)
+        if not sport or not isinstance(ids, list):
+            raise HTTPException(status_code=400, detail="body must be {sport: [ids]}")
+        eids = {str(x).strip() for x in ids if str(x).strip()}
+        if eids:
+            wanted.setdefault(sport, set()).update(eids)
+    if not wanted:
+        raise HTTPException(status_code=400, detail="at least one sport with ids is required")
+
+    today = cycle_day_str()  # 06:00 Europe/Madrid cycle
+    res = fanout({sport: (lambda sp=sport: _live_events_for_sport(sp, today)) for sport in wanted})
+
+    now = datetime.utcnow()
+    live_by_id = {}
+    sports = {}
+    for sport, eids in wanted.items():
+        entry = res.results.get(sport)
+        if not isinstance(entry, dict):
+            err = "timeout" if sport in res.timed_out else res.errors.get(sport, "unknown")
+            sports[sport] = {"source": None, "fetched_at": None, "age_secs": None, "count": 0, "error": err}
+            continue
+        result = entry["result"]
+        count = 0
+        for eid, live in (result.get("live_by_id") or {}).items():
+            if str(eid) in eids:
+                live_by_id[f"{sport}:{eid}"] = live
+                count += 1
+        try:
+            age = round((now - datetime.fromisoformat(entry["fetched_at"])).total_seconds(), 1)
+        except (TypeError, ValueError):
+            age = None
+        info = {"source": result.get("source"), "fetched_at": entry["fetched_at"], "age_secs": age, "count": count}
+        if result.get("error"):
+            info["error"] = result.get("error")
+        sports[sport] = info
+
+    return {"day": today, "live_by_id": live_by_id, "sports": sports}
+
+
+def _live_events_for_sport(sport: str, day: str) -> dict:
+    """Resultado de LiveEventsMultiSource para (sport, day), cacheado con TTL; 1 sola llamada upstream en vuelo."""
+    ck = (sport, day)
+    hit = _LIVE_EVENTS_CACHE.get(ck)
+    if isinstance(hit, dict) and hit.get("exp", 0) > time.time():
+        return hit["value"]
+
+    def _leader() -> dict:
+        hit2 = _LIVE_EVENTS_CACHE.get(ck)
+        if isinstance(hit2, dict) and hit2.get("exp", 0) > time.time():
+            return hit2["value"]
+
+        result = LiveEventsMultiSource.get_live_events(sport, day)
+        value = {"result": result, "fetched_at": datetime.utcnow().isoformat()}
+
+        # TTL: 5 minutes for alternatives (reasonably fresh), shorter for snapshots
+        ttl = 300 if result.get("source") in ("alternatives", "espn") else 60
+        _LIVE_EVENTS_CACHE[ck] = {"exp": time.time() + ttl, "value": value}
+        return value
+
+    value, _shared = _LIVE_EVENTS_FLIGHT.do(ck, _leader)
+    return value
+
+LIVE_SSE_HEARTBEAT_SECS = float(os.environ.get("LIVE_SSE_HEARTBEAT_SECS", "15"))
+
+
+def _sse(event: str, data: object) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+def _contract_event_keys(day: str) -> set:
+    """(sport, eventId) de todos los picks/legs del contrato congelado del día."""
+    contract_path = API_DATA_DIR / "contracts" / day / "contract.json"
+    try:
+        contract = json.loads(contract_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    return set(build_pick_index(contract)) if isinstance(contract, dict) else set()
+
+
+@app.get("/live/stream")
+async def live_stream(request: Request, day: str = None, ids: str = ""):
+    """
+    DF_LIVE_HUB: Server-Sent Events con los deltas live que publica el refresher del scheduler.
+
+    ids: CSV de "sport:eventId" (por defecto, todos los eventos del contrato del día).
+    Eventos: `snapshot` (último estado conocido al conectar), `live` (lista de deltas),
+    `resync` (el cliente iba lento y se descartaron deltas: recargar /live/events/batch).
+    Heartbeat como comentario SSE cada LIVE_SSE_HEARTBEAT_SECS.
+    """
+    if day is None:
+        day = cycle_day_str()  # 06:00 Europe/Madrid cycle
+    keys = set()
+    for item in _ids_list_from_csv(ids):
+        sport, sep, event_id = item.partition(":")
+        if not sep or not sport.strip() or not event_id.strip():
+            raise HTTPException(status_code=400, detail="ids must be sport:eventId")
+        keys.add(event_key(sport, event_id))
+    if not keys:
+        keys = _contract_event_keys(day)
+
+    sub = LIVE_HUB.subscribe(day, keys)
+
+    async def _events():
+        try:
+            yield _sse("snapshot", {"day": day, "events": LIVE_HUB.snapshot(day, keys)})
+            while not await request.is_disconnected():
+                batch, dropped = await sub.next_batch(LIVE_SSE_HEARTBEAT_SECS)
+                if dropped:
+                    yield _sse("resync", {"day": day, "dropped": dropped})
+                if batch:
+                    yield _sse("live", batch)
+                elif not dropped:
+                    yield b": ping\n\n"
+        finally:
+            LIVE_HUB.unsubscribe(sub)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ✅ Internal trigger: ensure today's contract exists (for external cron; avoids Render sleep issues)
 # Set env INTERNAL_ENSURE_TOKEN and call:
 #   GET /internal/ensure_today?token=...
@@ -844,6 +1067,8 @@ def internal_ensure_today(token: str = ""):
         env["PYTHONPATH"] = str(REPO_ROOT)
         cmd = [sys.executable, "-u", str(REPO_ROOT / "api" / "scripts" / "daily_pipeline.py"), day]
         subprocess.run(cmd, cwd=str(REPO_ROOT), env=env, check=True)
+        # DF_LIVE_SCHEDULE: contrato nuevo -> el scheduler recalcula kickoffs/polls ya
+        wake_scheduler()
 
         return {"ok": True, "day": day, "ran_pipeline": True, "reason": "pipeline_executed"}
     finally:
@@ -856,15 +1081,24 @@ def internal_ensure_today(token: str = ""):
 
 # ✅ Bets history endpoint (DF_BETS_HISTORY)
 try:
-    from api.services.bets_history_service import load_day_history, list_history_days
+    from api.services.bets_history_service import load_day_history, history_days_page, history_aggregate
 except ModuleNotFoundError:
-    from services.bets_history_service import load_day_history, list_history_days
+    from services.bets_history_service import load_day_history, history_days_page, history_aggregate
 
 
 @app.get("/history/days")
-def get_history_days(limit: int = 30):
-    """List recent days with archived bets"""
-    return {"days": list_history_days(limit=limit)}
+def get_history_days(limit: int = 30, offset: int = 0):
+    """List recent days with archived bets (paginated, served from the history index)"""
+    return history_days_page(limit=max(1, min(limit, 365)), offset=max(0, offset))
+
+
+@app.get("/history/summary")
+def get_history_summary(start: str | None = None, end: str | None = None, group_by: str | None = None):
+    """WIN/LOSE/PENDING totals per section over [start, end], optionally by sport or market"""
+    try:
+        return history_aggregate(start=start, end=end, group_by=group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/history/{day}")
@@ -876,6 +1110,21 @@ def get_day_history(day: str):
     return history
 
 
+# DF_ROLLING_STATS: ROI / rachas acumuladas (lectura O(1) del estado rolling)
+try:
+    from api.services.stats_service import StatsService
+except ModuleNotFoundError:
+    from services.stats_service import StatsService  # type: ignore
+
+_STATS_SERVICE = StatsService(API_DATA_DIR)
+
+
+@app.get("/stats/summary")
+def get_stats_summary(days: int | None = None):
+    """Lifetime stats, or the trailing `days` settled days"""
+    return _STATS_SERVICE.summary(days=days if days is None else max(1, days))
+
+
 # ✅ DEBUG: Test The Odds API connectivity
 @app.get("/debug/theodds/{sport}")
 def debug_theodds_api(sport: str = "basketball"):
@@ -885,7 +1134,7 @@ def debug_theodds_api(sport: str = "basketball"):
     except ModuleNotFoundError:
         from services.api_theodds_client import TheOddsAPIClient
     
-    client = TheOddsAPIClient()
+    client = TheOddsAPIClient(priority="debug")
     result = client.get_events_with_odds(sport, "2026-01-29")
     return {
         "sport": sport,
@@ -897,6 +1146,22 @@ def debug_theodds_api(sport: str = "basketball"):
     }
 
 
+# DF_QUOTA_BUDGET: ledger de cuota por proveedor + plan de reparto de The Odds API
+@app.get("/debug/quota")
+def debug_quota():
+    try:
+        from api.services.quota_budget import budget_status, plan_allocation
+        from api.services.api_theodds_cached import TheOddsAPICached
+    except ModuleNotFoundError:
+        from services.quota_budget import budget_status, plan_allocation
+        from services.api_theodds_cached import TheOddsAPICached
+
+    return {
+        "status": budget_status(),
+        "theodds_plan": plan_allocation(list(TheOddsAPICached.SPORT_TO_ODDS_ID.keys())),
+    }
+
+
 # ✅ ADMIN: Manually regenerate contract when API_KEY becomes available
 @app.post("/admin/regenerate-contract/{day}")
 def admin_regenerate_contract(day: str):
@@ -930,6 +1195,8 @@ def admin_regenerate_contract(day: str):
             timeout=300,
             env={**os.environ, "PYTHONPATH": str(repo_root)}
         )
+        # DF_LIVE_SCHEDULE: contrato nuevo -> el scheduler recalcula kickoffs/polls ya
+        wake_scheduler()
         
         # Get contract summary
         contract_path = API_DATA_DIR / "contracts" / day / "contract.json"
@@ -953,6 +1220,23 @@ def admin_regenerate_contract(day: str):
         return {"status": "error", "error": str(e), "day": day}
 
 
+# DF_DISPLAY_CACHE: contadores de los caches en memoria del proceso
+@app.get("/debug/caches")
+def debug_caches():
+    return {
+        "display_index": display_index_stats(),
+        "bets_today": BETS_TODAY_CACHE.stats(),
+        "live_hub": LIVE_HUB.stats(),
+        "single_flight": {f.name: f.stats() for f in (_LIVE_EVENTS_FLIGHT, _FLASH_TEAM_FLIGHT, _FLASH_MATCH_FLIGHT)},
+    }
+
+
+# DF_HTTP_TRANSPORT: latencia / errores por host upstream
+@app.get("/debug/http")
+def debug_http():
+    return transport_stats()
+
+
 # ✅ Operational healthcheck (no business logic)
 @app.get("/health")
 def health_check():
@@ -13,9 +13,10 @@ import json
 import time
 import logging
 import subprocess
+import threading
 from pathlib import Path
 from typing import Any, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
 logger = logging.getLogger(__name__)
@@ -116,6 +117,24 @@ def _run_daily_pipeline(day: str) -> None:
     logger.info("RUN daily_pipeline: %s", " ".join(cmd))
     subprocess.run(cmd, cwd=str(REPO_ROOT), env=env, check=True)
 
+# DF_LIVE_SCHEDULE: el loop duerme en un Event (no time.sleep fijo) hasta el próximo
+# kickoff / poll / ventana de las 6am; wake_scheduler() lo despierta antes (p.ej. contrato nuevo).
+_WAKE = threading.Event()
+PIPELINE_WINDOW_MINUTES = 10
+
+
+def wake_scheduler() -> None:
+    _WAKE.set()
+
+
+def _secs_until_pipeline_window(now: datetime) -> float:
+    """Segundos hasta el próximo inicio de la ventana de las 6am (Europe/Madrid)."""
+    nxt = now.replace(hour=6, minute=0, second=0, microsecond=0)
+    if nxt <= now:
+        nxt += timedelta(days=1)
+    return (nxt - now).total_seconds()
+
+
 def init_scheduler(app=None):
     """
     Scheduler con dos fases:
@@ -124,12 +143,11 @@ def init_scheduler(app=None):
     - Fetch odds UNA VEZ (cacheado por 6h)
     - Genera picks para 24h
     
-    FASE 2 (cada 10 min): Solo actualiza live scores con otras APIs
+    FASE 2 (según el calendario del día): Solo actualiza live scores con otras APIs
     - NO re-ejecuta pipeline
-    - Solo enriquece contratos existentes con datos live
+    - Solo consulta los deportes/eventos en juego (live_schedule.plan_live_refresh)
+    - Duerme hasta el próximo kickoff cuando no hay nada en juego
     """
-    import threading
-    from datetime import datetime
 
     def is_6am_window() -> bool:
         """Check si estamos en la ventana de 6am (6:00-6:10)"""
@@ -138,7 +156,7 @@ def init_scheduler(app=None):
         hour = now.hour
         minute = now.minute
         # Ejecuta entre 6:00 y 6:10
-        return hour == 6 and minute < 10
+        return hour == 6 and minute < PIPELINE_WINDOW_MINUTES
     
     def loop():
         last_pipeline_day = None
@@ -146,8 +164,10 @@ def init_scheduler(app=None):
         # Import live_score_update dynamically to avoid import issues
         try:
             from services.live_score_update import update_contract_with_live_scores
+            from services.live_schedule import LIVE_IDLE_MAX_SECS, plan_live_refresh
         except ImportError:
             from api.services.live_score_update import update_contract_with_live_scores
+            from api.services.live_schedule import LIVE_IDLE_MAX_SECS, plan_live_refresh
         
         while True:
             day = cycle_day_str()  # 06:00 Europe/Madrid cycle
@@ -158,9 +178,12 @@ def init_scheduler(app=None):
             until_ts = float(st.get('until_ts') or 0)
             if until_ts and time.time() < until_ts:
                 logger.info('Scheduler: backoff active for %s until_ts=%s fails=%s; skip pipeline', day, int(until_ts), st.get('fails'))
-                time.sleep(600)
+                _WAKE.wait(min(600.0, until_ts - time.time()))
+                _WAKE.clear()
                 continue
 
+            sleep_secs = float(LIVE_IDLE_MAX_SECS)
+
             try:
                 # FASE 1: Pipeline UNA SOLA VEZ a las 6am
                 if is_6am_window() and last_pipeline_day != day:
@@ -182,12 +205,19 @@ def init_scheduler(app=None):
                                 if os.path.exists(lock_file):
                                     os.unlink(lock_file)
                 
-                # FASE 2: Actualizar live scores (cada 10 min si el contrato existe)
+                # FASE 2: Actualizar live scores solo de los eventos en juego
                 if _contract_has_any_picks(day):
                     try:
-                        result = update_contract_with_live_scores(day)
-                        if result.get("updates_count", 0) > 0:
-                            logger.info(f"Updated {result['updates_count']} live scores for {day}")
+                        contract = _load_contract(day)
+                        plan = plan_live_refresh(day, contract)
+                        if plan.poll:
+                            result = update_contract_with_live_scores(day, event_ids_by_sport=plan.poll)
+                            if result.get("updates_count", 0) > 0:
+                                logger.info(f"Updated {result['updates_count']} live scores for {day}")
+                            # re-planificar: los eventos que acaban de reportar FT salen del plan
+                            plan = plan_live_refresh(day, contract)
+                        sleep_secs = plan.next_wakeup_secs
+                        logger.debug("Live schedule for %s: %s, next wakeup in %ss", day, plan.reason, int(sleep_secs))
                     except Exception as e:
                         logger.debug(f"Live score update failed (non-critical): {e}")
                 
@@ -195,8 +225,12 @@ def init_scheduler(app=None):
                 st2 = _set_backoff(day)
                 logger.exception("Scheduler loop error for day=%s: %s (backoff until_ts=%s fails=%s)", day, e, int(st2.get('until_ts') or 0), st2.get('fails'))
 
-            time.sleep(600)  # 10 min
+            # despertar también al abrirse la ventana de las 6am (y al cambiar de ciclo)
+            now_madrid = datetime.now(pytz.timezone('Europe/Madrid'))
+            sleep_secs = min(sleep_secs, _secs_until_pipeline_window(now_madrid))
+            _WAKE.wait(max(1.0, sleep_secs))
+            _WAKE.clear()
 
     t = threading.Thread(target=loop, daemon=True)
     t.start()
-    logger.info("Scheduler started (6am pipeline + 10min live updates; cycle=06:00 Europe/Madrid)")
+    logger.info("Scheduler started (6am pipeline + match-aware live updates; cycle=06:00 Europe/Madrid)")
@@ -1,43 +1,19 @@
-import os, sys, subprocess, json
+import os, sys, json
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from api.utils.cycle_day import cycle_day_str
-from api.utils.paths import data_path, ensure_dir
+from api.utils.paths import data_path
+from api.services.pipeline_engine import dir_has_nonempty_json, run_chain
 
 REPO = Path(__file__).resolve().parents[2]
 
 def ts():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def run(cmd, env):
-    print(f"[{ts()}] RUN: {' '.join(cmd)}")
-    subprocess.run(cmd, cwd=str(REPO), env=env, check=True)
-
-def dir_has_nonempty_json(dirpath: Path) -> bool:
-    if not dirpath.exists() or not dirpath.is_dir():
-        return False
-    for p in sorted(dirpath.glob("*.json")):
-        try:
-            if p.stat().st_size > 2:  # > "[]"
-                return True
-        except Exception:
-            pass
-    return False
-
-def file_nonempty(p: Path) -> bool:
-    return p.exists() and p.is_file() and p.stat().st_size > 2
-
-def json_file_has_nonempty_list_key(p: Path, key: str) -> bool:
-    if not file_nonempty(p):
-        return False
-    try:
-        obj = json.loads(p.read_text(encoding="utf-8"))
-        v = obj.get(key) if isinstance(obj, dict) else None
-        return isinstance(v, list) and len(v) > 0
-    except Exception:
-        return False
+def log(msg: str) -> None:
+    print(f"[{ts()}] {msg}", flush=True)
 
 def odds_file_has_data(p: Path) -> bool:
     """
@@ -71,103 +47,85 @@ def odds_file_has_data(p: Path) -> bool:
 
     return True
 
+def freeze_contract(day: str) -> None:
+    print(f"[{ts()}] FREEZE contract from local picks for cycle_day={day}")
+    from api.services.contract_service import create_empty_contract, populate_contract_with_day_data, freeze_and_save_contract
+    c = create_empty_contract(day)
+    c = populate_contract_with_day_data(c)
+    c = freeze_and_save_contract(c)
+
 def main():
     args = [a for a in sys.argv[1:] if a.strip()]
     force = "--force" in args
-    args = [a for a in args if a != "--force"]
+    # DF_INPROCESS_PIPELINE: los all.json intermedios son checkpoints opcionales
+    checkpoints = ("--no-checkpoints" not in args) and os.environ.get("PIPELINE_CHECKPOINTS", "1") != "0"
+    # DF_STAGE_CACHE: --force ya no recalcula etapas cuya clave de contenido no cambió;
+    # --no-cache (o PIPELINE_STAGE_CACHE=0) vuelve a forzar la cadena entera
+    use_cache = ("--no-cache" not in args) and os.environ.get("PIPELINE_STAGE_CACHE", "1") != "0"
+    # DF_ODDS_DELTA: refresh intradía, solo recalcula los eventos cuyas odds cambiaron
+    delta = "--delta" in args
+    # el contrato publicado es fijo durante el día: --delta solo lo re-congela con --refreeze
+    refreeze = "--refreeze" in args
+    args = [a for a in args if a not in ("--force", "--no-checkpoints", "--no-cache", "--delta", "--refreeze")]
 
     day = args[0] if args else cycle_day_str()
-    print(f"[{ts()}] DAILY_PIPELINE cycle_day={day} force={force}")
-
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(REPO)
+    print(f"[{ts()}] DAILY_PIPELINE cycle_day={day} force={force} checkpoints={checkpoints} stage_cache={use_cache} delta={delta}")
+
+    if delta:
+        from api.services.odds_delta_refresh import refresh_odds_delta
+        summary = refresh_odds_delta(day, checkpoints=checkpoints, log=log, use_cache=use_cache)
+        print(f"[{ts()}] DELTA {json.dumps(summary, ensure_ascii=False)}")
+        picks_rebuilt = summary.get("mode") == "full" or any(s.startswith("picks_") for s in summary.get("rebuilt") or [])
+        if not picks_rebuilt:
+            print(f"[{ts()}] SKIP freeze contract (picks untouched)")
+        elif refreeze:
+            freeze_contract(day)
+        else:
+            print(f"[{ts()}] SKIP freeze contract (picks rebuilt; published contract stays frozen, use --refreeze to republish)")
+        return
 
     # outputs (verdad única)
     events_dir      = data_path("events", day)
     odds_dir        = data_path("odds", day)
     odds_norm       = data_path("odds_normalized", day, "all.json")
-    odds_prob       = data_path("odds_probability", day, "all.json")
-    odds_est        = data_path("odds_estimated", day, "all.json")
     odds_ev         = data_path("odds_ev", day, "all.json")
     odds_risk       = data_path("odds_risk", day, "all.json")
     odds_premium    = data_path("odds_premium", day, "all.json")
     parlay_eligible = data_path("pools", day, "parlay_eligible.json")
     picks_parlay    = data_path("picks_parlay", day, "parlays.json")
-    picks_classic_d = data_path("picks_classic", day)
     contract_path   = data_path("contracts", day, "contract.json")
 
-    # 0) events
-    if dir_has_nonempty_json(events_dir) and not force:
-        print(f"[{ts()}] SKIP events_ingestion (exists): {events_dir}")
-    else:
-        ensure_dir(events_dir)
-        print(f"[{ts()}] DO   events_ingestion -> {events_dir}")
-        run([sys.executable, "-u", "api/services/events_ingestion.py", day], env)
+    # 0+1) events + odds: un único fetch de The Odds API del que salen ambos snapshots
+    # (DF_UNIFIED_INGESTION; odds solo de los deportes vacíos, evita gastar API de más)
+    from api.services.odds_ingestion_multisport import ODDS_MODE_BY_SPORT
+    from api.services.unified_ingestion import ingest_day
 
-    # 1) odds ingestion (solo deportes vacíos; evita gastar API de más)
-    from api.services.odds_ingestion_multisport import ODDS_MODE_BY_SPORT  # import local (sin requests)
+    need_events = force or not dir_has_nonempty_json(events_dir)
+    if not need_events:
+        print(f"[{ts()}] SKIP events_ingestion (exists): {events_dir}")
 
     need_sports: List[str] = []
     for sport in sorted(ODDS_MODE_BY_SPORT.keys()):
         p = odds_dir / f"{sport}.json"
         if force or (not odds_file_has_data(p)):
             need_sports.append(sport)
+    if len(need_sports) == 0:
+        print(f"[{ts()}] SKIP odds_ingestion (all sports have data): {odds_dir}")
 
     ran_odds_ingest = False
-    if len(need_sports) == 0:
-        print(f"[{ts()}] SKIP odds_ingestion_multisport (all sports have data): {odds_dir}")
-    else:
-        ensure_dir(odds_dir)
-        max_events = os.environ.get("ODDS_MAX_EVENTS_PER_SPORT", "40")
-        cmd = [sys.executable, "-u", "api/services/odds_ingestion_multisport.py", day, "--sports", ",".join(need_sports), "--max-events", str(max_events)]
-        if force:
-            cmd.append("--force")
-        print(f"[{ts()}] DO   odds_ingestion_multisport sports={need_sports} max_events={max_events} -> {odds_dir}")
-        run(cmd, env)
-        ran_odds_ingest = True
+    if need_events or need_sports:
+        print(f"[{ts()}] DO   unified_ingestion events={need_events} odds_sports={need_sports} -> {events_dir} {odds_dir}")
+        ingest = ingest_day(day, force=force, events=need_events, odds_sports=need_sports)
+        print(f"[{ts()}] unified_ingestion fetch_id={ingest.get('fetch_id')}")
+        ran_odds_ingest = any(r.get("status") == "created" for r in ingest.get("odds") or [])
 
     # If odds changed, recompute everything downstream (even if files exist)
     recompute_downstream = force or ran_odds_ingest
 
-    chain = [
-        ("odds_normalization_multisport", odds_norm, [sys.executable, "-u", "api/services/odds_normalization_multisport.py", day]),
-        ("odds_probability_multisport",   odds_prob, [sys.executable, "-u", "api/services/odds_probability_multisport.py", day]),
-        ("odds_estimation_multisport",    odds_est,  [sys.executable, "-u", "api/services/odds_estimation_multisport.py", day]),
-        ("odds_ev_multisport",            odds_ev,   [sys.executable, "-u", "api/services/odds_ev_multisport.py", day]),
-        ("odds_risk_multisport",          odds_risk, [sys.executable, "-u", "api/services/odds_risk_multisport.py", day]),
-        ("odds_premium_multisport",       odds_premium, [sys.executable, "-u", "api/services/odds_premium_multisport.py", day]),
-        ("inflated_pool_builder",         parlay_eligible, [sys.executable, "-u", "api/services/inflated_pool_builder.py", day]),
-        ("picks_parlay_premium_multisport", picks_parlay, [sys.executable, "-u", "api/services/picks_parlay_premium_multisport.py", day]),
-        ("picks_classic_multisport",      picks_classic_d, [sys.executable, "-u", "api/services/picks_classic_multisport.py", day]),
-    ]
-
-    for name, out, cmd in chain:
-        # custom "ok" checks
-        if out.is_dir():
-            ok = dir_has_nonempty_json(out)
-        else:
-            if name == "picks_parlay_premium_multisport":
-                ok = json_file_has_nonempty_list_key(out, "parlays")  # FIX: no basta con "exists"
-            else:
-                ok = file_nonempty(out) if out.suffix == ".json" else out.exists()
-
-        if ok and (not recompute_downstream):
-            print(f"[{ts()}] SKIP {name} (exists): {out}")
-            continue
+    # 2) odds chain -> pools -> picks (in-process, records en memoria)
+    run_chain(day, recompute=recompute_downstream, checkpoints=checkpoints, log=log, use_cache=use_cache)
 
-        ensure_dir(out if out.is_dir() else out.parent)
-        print(f"[{ts()}] DO   {name} -> {out}")
-        run(cmd, env)
-
-        # once we run any downstream step, keep recomputing the rest
-        recompute_downstream = True
-
-    # freeze contract
-    print(f"[{ts()}] FREEZE contract from local picks for cycle_day={day}")
-    from api.services.contract_service import create_empty_contract, populate_contract_with_day_data, freeze_and_save_contract
-    c = create_empty_contract(day)
-    c = populate_contract_with_day_data(c)
-    c = freeze_and_save_contract(c)
+    freeze_contract(day)
 
     print(f"[{ts()}] DONE contract={contract_path} exists={contract_path.exists()} size={(contract_path.stat().st_size if contract_path.exists() else None)}")
     print(f"[{ts()}] QUICK CHECK:")
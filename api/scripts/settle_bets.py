@@ -1,17 +1,26 @@
+import argparse
 import sys
 import os
 import json
 from datetime import datetime
+from pathlib import Path
 
 # Añadir raíz del proyecto al PYTHONPATH
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
-from services.settlement_service import settle_all_pending_bets
+from services.settlement_service import settle_all_pending_bets, settle_pending_bets_batched
+from services.stats_service import StatsService
 
 
 def main():
-    result = settle_all_pending_bets()
+    parser = argparse.ArgumentParser(description="Settle pending bets")
+    parser.add_argument("--per-bet", action="store_true", help="Legacy mode: one lookup and one file write per bet")
+    args = parser.parse_args()
+
+    result = settle_all_pending_bets() if args.per_bet else settle_pending_bets_batched()
+    # DF_ROLLING_STATS: días con settlement que aún no están en stats/rolling.json
+    result["stats_days_applied"] = StatsService(Path(BASE_DIR) / "data").rebuild_rolling()
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "result": result
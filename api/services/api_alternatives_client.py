@@ -9,12 +9,18 @@ Cobertura:
 - AFL: Squiggle
 """
 
-import requests
 import json
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    from api.services.http_transport import http_get
+    from api.services.live_fanout import fanout, provider_slot
+except ModuleNotFoundError:
+    from services.http_transport import http_get  # type: ignore
+    from services.live_fanout import fanout, provider_slot  # type: ignore
+
 
 class BalldontlieClient:
     """NBA live events via balldontlie API (no auth required)"""
@@ -31,7 +37,8 @@ class BalldontlieClient:
         try:
             url = f"{BalldontlieClient.BASE_URL}/games"
             params = {"date": date}
-            response = requests.get(url, params=params, timeout=BalldontlieClient.TIMEOUT)
+            with provider_slot("balldontlie"):
+                response = http_get(url, params=params, timeout=BalldontlieClient.TIMEOUT)
             response.raise_for_status()
             data = response.json()
             
@@ -81,7 +88,8 @@ class NHLStatsClient:
         try:
             url = f"{NHLStatsClient.BASE_URL}/schedule"
             params = {"startDate": date, "endDate": date}
-            response = requests.get(url, params=params, timeout=NHLStatsClient.TIMEOUT)
+            with provider_slot("nhl-stats"):
+                response = http_get(url, params=params, timeout=NHLStatsClient.TIMEOUT)
             response.raise_for_status()
             data = response.json()
             
@@ -154,7 +162,8 @@ class OpenLigaDBClient:
         try:
             url = f"{OpenLigaDBClient.BASE_URL}/getmatchinformation"
             params = {"leagueShortcut": league_code}
-            response = requests.get(url, params=params, timeout=OpenLigaDBClient.TIMEOUT)
+            with provider_slot("openligadb"):
+                response = http_get(url, params=params, timeout=OpenLigaDBClient.TIMEOUT)
             response.raise_for_status()
             matches = response.json()
             
@@ -217,7 +226,8 @@ class SquiggleClient:
         try:
             # Squiggle uses year and round, need to calculate from date
             url = f"{SquiggleClient.BASE_URL}/games"
-            response = requests.get(url, timeout=SquiggleClient.TIMEOUT)
+            with provider_slot("squiggle"):
+                response = http_get(url, timeout=SquiggleClient.TIMEOUT)
             response.raise_for_status()
             games = response.json()
             
@@ -290,10 +300,14 @@ class AlternativeApisClient:
     @staticmethod
     def get_all_sports_events(date: str) -> Dict[str, List[Dict[str, Any]]]:
         """Get live events for all supported alternative sports"""
-        result = {}
+        sports = ["basketball", "hockey", "handball", "volleyball", "afl"]
+        res = fanout({sport: (lambda s=sport: AlternativeApisClient.get_live_events(s, date)) for sport in sports})
+        for sport in res.timed_out:
+            print(f"[alternatives] {sport}: timeout")
         
-        for sport in ["basketball", "hockey", "handball", "volleyball", "afl"]:
-            events = AlternativeApisClient.get_live_events(sport, date)
+        result = {}
+        for sport in sports:
+            events = res.results.get(sport)
             if events:
                 result[sport] = events
                 print(f"[alternatives] {sport}: {len(events)} events")
@@ -7,12 +7,18 @@ Cobertura:
 - NFL: ESPN Sports API documentada
 """
 
-import requests
 import json
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    from api.services.http_transport import http_get
+    from api.services.live_fanout import fanout, provider_slot
+except ModuleNotFoundError:
+    from services.http_transport import http_get  # type: ignore
+    from services.live_fanout import fanout, provider_slot  # type: ignore
+
 
 class ESPNSoccerClient:
     """Soccer/Football live events via ESPN hidden API (no auth required)
@@ -39,7 +45,8 @@ class ESPNSoccerClient:
             url = f"{ESPNSoccerClient.BASE_URL}"
             params = {"dates": espn_date}
             
-            response = requests.get(url, params=params, timeout=ESPNSoccerClient.TIMEOUT)
+            with provider_slot("espn"):
+                response = http_get(url, params=params, timeout=ESPNSoccerClient.TIMEOUT)
             response.raise_for_status()
             data = response.json()
             
@@ -125,31 +132,40 @@ class ESPNRugbyClient:
             date_obj = datetime.fromisoformat(date)
             espn_date = date_obj.strftime("%Y%m%d")
             
-            all_games = []
-            
-            for league in ESPNRugbyClient.RUGBY_LEAGUES:
-                try:
-                    url = f"{ESPNRugbyClient.BASE_URL}/{league}/scoreboard"
-                    params = {"dates": espn_date}
-                    
-                    response = requests.get(url, params=params, timeout=ESPNRugbyClient.TIMEOUT)
-                    if response.status_code == 404:
-                        # League not available
-                        continue
-                    response.raise_for_status()
-                    
-                    data = response.json()
-                    events = data.get("events", [])
-                    all_games.extend([ESPNRugbyClient._normalize_event(e, league) for e in events])
-                except Exception as e:
-                    print(f"[espn-rugby] Error fetching {league}: {e}")
-                    continue
+            # DF_LIVE_FANOUT: ligas en paralelo (mismo orden de salida que el bucle secuencial)
+            leagues = ESPNRugbyClient.RUGBY_LEAGUES
+            res = fanout({league: (lambda lg=league: ESPNRugbyClient._get_league_games(lg, espn_date)) for league in leagues})
+            for league in res.timed_out:
+                print(f"[espn-rugby] Timeout fetching {league}")
             
+            all_games = []
+            for league in leagues:
+                all_games.extend(res.results.get(league) or [])
             return all_games
         except Exception as e:
             print(f"[espn-rugby] Error: {e}")
             return []
     
+    @staticmethod
+    def _get_league_games(league: str, espn_date: str) -> List[Dict[str, Any]]:
+        try:
+            url = f"{ESPNRugbyClient.BASE_URL}/{league}/scoreboard"
+            params = {"dates": espn_date}
+            
+            with provider_slot("espn"):
+                response = http_get(url, params=params, timeout=ESPNRugbyClient.TIMEOUT)
+            if response.status_code == 404:
+                # League not available
+                return []
+            response.raise_for_status()
+            
+            data = response.json()
+            events = data.get("events", [])
+            return [ESPNRugbyClient._normalize_event(e, league) for e in events]
+        except Exception as e:
+            print(f"[espn-rugby] Error fetching {league}: {e}")
+            return []
+    
     @staticmethod
     def _normalize_event(event: Dict[str, Any], league: str) -> Dict[str, Any]:
         """Normalize ESPN rugby event to standard format"""
@@ -207,7 +223,8 @@ class ESPNNFLClient:
             url = ESPNNFLClient.BASE_URL
             params = {"dates": espn_date}
             
-            response = requests.get(url, params=params, timeout=ESPNNFLClient.TIMEOUT)
+            with provider_slot("espn"):
+                response = http_get(url, params=params, timeout=ESPNNFLClient.TIMEOUT)
             response.raise_for_status()
             data = response.json()
             
@@ -2,14 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
-import requests
 
 try:
     from services.env import get_env
     from services.api_sports_hosts import SPORT_BASE_URL
+    from services.quota_budget import budget_get
 except ModuleNotFoundError:
     from api.services.env import get_env  # type: ignore
     from api.services.api_sports_hosts import SPORT_BASE_URL  # type: ignore
+    from api.services.quota_budget import budget_get  # type: ignore
 
 
 @dataclass(frozen=True)
@@ -20,6 +21,8 @@ class ApiSportsClient:
     """
     sport: str
     timeout: int = 30
+    # DF_QUOTA_BUDGET: clase de prioridad (ingestion | settlement | live | refresh | debug)
+    priority: str = "ingestion"
 
     def _base_url(self) -> str:
         base = SPORT_BASE_URL.get(self.sport)
@@ -33,7 +36,7 @@ class ApiSportsClient:
 
     def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         url = self._base_url() + path
-        r = requests.get(url, headers=self._headers(), params=params or {}, timeout=self.timeout)
+        r = budget_get(url, headers=self._headers(), params=params or {}, timeout=self.timeout, priority=self.priority)
         r.raise_for_status()
         data = r.json()
         if isinstance(data, dict) and data.get('errors'):
@@ -2,20 +2,56 @@
 The Odds API Client with Daily Caching - Real betting odds for 9 sports
 FREE tier: 500 requests/month (~17 requests/day available)
 Strategy: Fetch all odds ONCE per day (at 6am), cache results, reuse throughout day
+
+DF_THEODDS_WINDOW_FETCH (modo por defecto, THEODDS_FETCH_MODE=window): las requests por
+deporte/liga van en paralelo (el token bucket del host marca el ritmo), cada una limitada a
+la ventana del ciclo 06:00->06:00 Europe/Madrid con commenceTimeFrom/commenceTimeTo, y cada
+deporte se entrega a on_sport en cuanto llegan todas sus respuestas.
+THEODDS_FETCH_MODE=sequential mantiene el bucle anterior (sin ventana, máx. 50 eventos).
 """
 import requests
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import logging
 import os
 import json
 from pathlib import Path
 import time
+import uuid
 from datetime import datetime, timedelta
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+try:
+    from api.services.http_transport import configure_host
+    from api.services.quota_budget import BudgetExhausted, budget_get, plan_allocation
+    from api.utils.time_window import get_daily_window_utc
+except ModuleNotFoundError:
+    from services.http_transport import configure_host  # type: ignore
+    from services.quota_budget import BudgetExhausted, budget_get, plan_allocation  # type: ignore
+    from utils.time_window import get_daily_window_utc  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+THEODDS_FETCH_MODE = os.environ.get("THEODDS_FETCH_MODE", "window")  # window | sequential
+THEODDS_FETCH_WORKERS = int(os.environ.get("THEODDS_FETCH_WORKERS", "4"))
+# ligas extra por deporte: "football:soccer_spain_la_liga,soccer_italy_serie_a;basketball:basketball_euroleague"
+THEODDS_EXTRA_LEAGUES = os.environ.get("THEODDS_EXTRA_LEAGUES", "")
+
+OnSport = Callable[[str, List[Dict[str, Any]]], None]
+
+
+def _parse_extra_leagues(spec: str) -> Dict[str, List[str]]:
+    out: Dict[str, List[str]] = {}
+    for part in spec.split(";"):
+        sport, _, keys = part.partition(":")
+        sport = sport.strip().lower()
+        if sport and keys:
+            out[sport] = [k.strip() for k in keys.split(",") if k.strip()]
+    return out
+
+
+def _iso_z(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
 
 class TheOddsAPICached:
     """Client for The Odds API with daily caching to reduce quota consumption"""
@@ -43,26 +79,16 @@ class TheOddsAPICached:
         "betrivers",
     ]
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, priority: str = "ingestion"):
         self.api_key = os.environ.get("ODDS_API_KEY")
         if not self.api_key:
             logger.warning("ODDS_API_KEY not set in environment")
         
-        self.session = requests.Session()
-        
-        # Add retry strategy for rate limits
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # DF_HTTP_TRANSPORT: sesión keep-alive compartida del host; retry propio para rate limits
+        configure_host(self.BASE_URL, retries=3, backoff=2)
         
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # 2 seconds between requests
+        # DF_QUOTA_BUDGET: clase de prioridad de las llamadas (ingestion | settlement | live | refresh | debug)
+        self.priority = priority
         
         # Cache directory
         if cache_dir is None:
@@ -71,12 +97,16 @@ class TheOddsAPICached:
         
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # DF_UNIFIED_INGESTION: id del fetch que produjo el último resultado de fetch_all_odds
+        # (nuevo por cada fetch real; el del fichero de cache cuando se reutiliza)
+        self.last_fetch_id: Optional[str] = None
     
     def get_cached_path(self, day: str) -> Path:
         """Get path to cached odds file for a specific day"""
         return self.cache_dir / f"{day}_odds.json"
     
-    def is_cache_fresh(self, day: str, max_age_hours: int = 6) -> bool:
+    def is_cache_fresh(self, day: str, max_age_hours: float = 6) -> bool:
         """Check if cache exists and is fresh"""
         cache_file = self.get_cached_path(day)
         if not cache_file.exists():
@@ -109,46 +139,60 @@ class TheOddsAPICached:
         except Exception as e:
             logger.error(f"Error saving cache to {cache_file}: {e}")
     
-    def fetch_all_odds(self, day: str, force_refresh: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    def odds_keys_for(self, sport: str) -> List[str]:
+        """Claves de The Odds API (liga principal + THEODDS_EXTRA_LEAGUES) de un deporte."""
+        sport_lower = sport.lower()
+        main = self.SPORT_TO_ODDS_ID.get(sport_lower)
+        keys = [main] if main else []
+        for extra in _parse_extra_leagues(THEODDS_EXTRA_LEAGUES).get(sport_lower, []):
+            if extra not in keys:
+                keys.append(extra)
+        return keys
+    
+    def fetch_all_odds(
+        self,
+        day: str,
+        force_refresh: bool = False,
+        max_age_hours: float = 6,
+        mode: Optional[str] = None,
+        on_sport: Optional[OnSport] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Fetch odds for all sports, using cache when available.
+        max_age_hours: edad máxima del cache (el refresh intradía usa refresh_sports).
+        mode: "window" (paralelo, ventana del ciclo) | "sequential"; por defecto THEODDS_FETCH_MODE.
+        on_sport(sport, events): se llama (en este thread) en cuanto un deporte está completo.
         Returns: {sport: [events]}
         """
+        mode = mode or THEODDS_FETCH_MODE
         
         # Try cache first (unless force_refresh)
-        if not force_refresh and self.is_cache_fresh(day, max_age_hours=6):
+        if not force_refresh and self.is_cache_fresh(day, max_age_hours=max_age_hours):
             logger.info(f"Using cached odds for {day}")
             cached = self.load_from_cache(day)
             if cached:
-                return cached
+                # el fichero de cache guarda {day, fetched_at, fetch_id, sports, errors}
+                self.last_fetch_id = self._cached_fetch_id(cached)
+                return cached.get("sports") or {}
         
         if not self.api_key:
             logger.warning("ODDS_API_KEY not configured, attempting to use cache")
             cached = self.load_from_cache(day)
-            return cached if cached else {}
+            self.last_fetch_id = self._cached_fetch_id(cached) if cached else None
+            return (cached.get("sports") or {}) if cached else {}
         
         logger.info(f"Fetching fresh odds for {day} (using {len(self.SPORT_TO_ODDS_ID)} sports)")
         
-        all_odds = {}
-        errors = []
-        
-        for sport in self.SPORT_TO_ODDS_ID.keys():
-            result = self.get_events_with_odds(sport, day)
-            events = result.get("events", [])
-            
-            if events:
-                all_odds[sport] = events
-                logger.info(f"  {sport}: {len(events)} events")
-            else:
-                error = result.get("error")
-                if error:
-                    errors.append(f"{sport}: {error}")
-                    logger.warning(f"  {sport}: {error}")
+        fetch_id = f"{day}-{uuid.uuid4().hex[:12]}"
+        self.last_fetch_id = fetch_id
+        all_odds, errors = self._fetch_planned(day, list(self.SPORT_TO_ODDS_ID.keys()), mode, on_sport)
         
         # Save to cache even if some sports failed
         cache_data = {
             "day": day,
             "fetched_at": datetime.now().isoformat(),
+            "fetch_id": fetch_id,
+            "mode": mode,
             "sports": all_odds,
             "errors": errors,
         }
@@ -156,27 +200,230 @@ class TheOddsAPICached:
         
         return all_odds
     
-    def get_events_with_odds(self, sport: str, day: Optional[str] = None) -> Dict[str, Any]:
+    def _fetch_planned(
+        self,
+        day: str,
+        sports: List[str],
+        mode: str,
+        on_sport: Optional[OnSport] = None,
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+        """Fetch de los deportes que permite el plan de cuota. Returns: ({sport: [events]}, errors)"""
+        all_odds: Dict[str, List[Dict[str, Any]]] = {}
+        errors: List[str] = []
+        
+        # DF_QUOTA_BUDGET: la cuota mensual restante se reparte por eventos esperados;
+        # si no alcanza para todos, se piden primero los deportes con más eventos
+        # (en modo window una llamada por clave de liga, THEODDS_EXTRA_LEAGUES incluidas)
+        league_keys = {s: self.odds_keys_for(s) for s in sports} if mode == "window" else None
+        plan = plan_allocation(list(sports), league_keys=league_keys)
+        planned = []
+        for sport, calls in plan["allocation"].items():
+            if league_keys is not None:
+                # sin claves propias: no soportado (lo reporta el fetch); con claves: alguna asignada
+                if league_keys.get(sport) and not plan["keys"].get(sport):
+                    errors.append(f"{sport}: skipped by quota plan (allowance_today={plan['allowance_today']})")
+                    continue
+                dropped = len(league_keys.get(sport) or []) - len(plan["keys"].get(sport) or [])
+                if dropped > 0:
+                    errors.append(f"{sport}: {dropped} league(s) skipped by quota plan")
+            elif calls < 1:
+                errors.append(f"{sport}: skipped by quota plan (allowance_today={plan['allowance_today']})")
+                continue
+            planned.append(sport)
+        
+        if mode == "window":
+            self._fetch_window_parallel(day, planned, all_odds, errors, on_sport, keys_by_sport=plan.get("keys"))
+        else:
+            for sport in planned:
+                result = self.get_events_with_odds(sport, day)
+                events = result.get("events", [])
+                
+                if events:
+                    all_odds[sport] = events
+                    logger.info(f"  {sport}: {len(events)} events")
+                else:
+                    error = result.get("error")
+                    if error:
+                        errors.append(f"{sport}: {error}")
+                        logger.warning(f"  {sport}: {error}")
+                if on_sport is not None:
+                    on_sport(sport, events)
+        return all_odds, errors
+    
+    def get_refresh_path(self, day: str) -> Path:
+        """Sidecar de los refresh intradía (el cache diario <day>_odds.json no se toca)"""
+        return self.cache_dir / f"{day}_odds_refresh.json"
+    
+    def refresh_sports(
+        self,
+        day: str,
+        sports: Optional[List[str]] = None,
+        max_age_hours: float = 1,
+        mode: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        DF_ODDS_DELTA: refresh intradía de un subconjunto de deportes (None = todos).
+        Solo se piden los deportes cuyo dato más reciente (refresh anterior o cache diario)
+        tiene más de max_age_hours, y solo sus claves de liga. El resultado va al sidecar
+        <day>_odds_refresh.json con un fetch_id por deporte: el envelope del fetch de las 06:00
+        (y su fetch_id, compartido por events/ y odds/) se queda como está.
+        Returns: {sport: {"events": [...], "fetch_id": ...}}
+        """
+        mode = mode or THEODDS_FETCH_MODE
+        wanted = sorted({s.lower() for s in sports}) if sports else list(self.SPORT_TO_ODDS_ID.keys())
+        now = datetime.now()
+        
+        daily = self.load_from_cache(day) or {}
+        daily_fresh = bool(daily) and self.is_cache_fresh(day, max_age_hours=max_age_hours)
+        refresh_path = self.get_refresh_path(day)
+        try:
+            refreshed = json.loads(refresh_path.read_text()) if refresh_path.exists() else {}
+        except Exception as e:
+            logger.error(f"Error loading refresh cache from {refresh_path}: {e}")
+            refreshed = {}
+        entries: Dict[str, Dict[str, Any]] = refreshed.setdefault("sports", {})
+        
+        def _current(sport: str) -> Optional[Dict[str, Any]]:
+            entry = entries.get(sport)
+            if entry:
+                return entry
+            if daily and sport in (daily.get("sports") or {}):
+                return {"events": daily["sports"][sport], "fetch_id": self._cached_fetch_id(daily), "fetched_at": daily.get("fetched_at")}
+            return None
+        
+        def _fresh(sport: str) -> bool:
+            entry = entries.get(sport)
+            if entry:
+                try:
+                    return now - datetime.fromisoformat(entry["fetched_at"]) < timedelta(hours=max_age_hours)
+                except (KeyError, TypeError, ValueError):
+                    return False
+            return daily_fresh
+        
+        stale = [s for s in wanted if not _fresh(s)]
+        if stale and self.api_key:
+            logger.info(f"Refreshing odds for {day}: {stale}")
+            fetch_id = f"{day}-{uuid.uuid4().hex[:12]}"
+            all_odds, errors = self._fetch_planned(day, stale, mode)
+            for sport in stale:
+                prefixes = tuple(f"{k}:" for k in [sport] + self.odds_keys_for(sport))
+                sport_errors = [e for e in errors if e.startswith(prefixes)]
+                events = all_odds.get(sport) or []
+                # sin respuesta (cuota, plan, error): se queda el dato anterior
+                if events or not sport_errors:
+                    entries[sport] = {
+                        "fetched_at": now.isoformat(),
+                        "fetch_id": fetch_id,
+                        "events": events,
+                        "errors": sport_errors,
+                    }
+            refreshed["day"] = day
+            tmp = refresh_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(refreshed, ensure_ascii=False, indent=2))
+            os.replace(tmp, refresh_path)
+        elif stale:
+            logger.warning("ODDS_API_KEY not configured, using cached odds for refresh")
+        
+        out: Dict[str, Dict[str, Any]] = {}
+        for sport in wanted:
+            current = _current(sport)
+            if current is not None:
+                out[sport] = current
+        return out
+    
+    @staticmethod
+    def _cached_fetch_id(cached: Dict[str, Any]) -> Optional[str]:
+        # caches anteriores a fetch_id: derivarlo de fetched_at (estable para el mismo fichero)
+        return cached.get("fetch_id") or (f"{cached.get('day')}-{cached.get('fetched_at')}" if cached.get("fetched_at") else None)
+    
+    def _fetch_window_parallel(
+        self,
+        day: str,
+        sports: List[str],
+        all_odds: Dict[str, List[Dict[str, Any]]],
+        errors: List[str],
+        on_sport: Optional[OnSport] = None,
+        keys_by_sport: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        """
+        Una request por clave de liga distinta (soccer/football comparten soccer_epl), en paralelo
+        y limitada a la ventana del ciclo. Cada deporte se cierra al llegar su última liga.
+        keys_by_sport: claves permitidas por el plan de cuota (por defecto, todas).
+        """
+        window = get_daily_window_utc(day)
+        sports_by_key: Dict[str, List[str]] = {}
+        pending: Dict[str, int] = {}
+        for sport in sports:
+            keys = self.odds_keys_for(sport)
+            if keys_by_sport is not None and keys:
+                allowed = keys_by_sport.get(sport) or []
+                keys = [k for k in keys if k in allowed]
+            pending[sport] = len(keys)
+            for key in keys:
+                sports_by_key.setdefault(key, []).append(sport)
+        collected: Dict[str, List[Dict[str, Any]]] = {sport: [] for sport in sports}
+        
+        def _done(sport: str) -> None:
+            events = collected[sport]
+            if events:
+                all_odds[sport] = events
+                logger.info(f"  {sport}: {len(events)} events")
+            if on_sport is not None:
+                on_sport(sport, events)
+        
+        for sport in sports:
+            if pending[sport] == 0:
+                errors.append(f"{sport}: Sport {sport} not supported")
+                _done(sport)
+        if not sports_by_key:
+            return
+        
+        workers = max(1, min(THEODDS_FETCH_WORKERS, len(sports_by_key)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="theodds-fetch") as ex:
+            futures = {
+                ex.submit(self.get_events_with_odds, owners[0], day, window, key): key
+                for key, owners in sports_by_key.items()
+            }
+            for fut in as_completed(futures):
+                key = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = {"events": [], "error": str(e)}
+                events = result.get("events", [])
+                if not events and result.get("error"):
+                    errors.append(f"{key}: {result.get('error')}")
+                    logger.warning(f"  {key}: {result.get('error')}")
+                for sport in sports_by_key[key]:
+                    # mismo evento para varios alias (soccer/football): copia con su sport
+                    collected[sport].extend(events if sport == result.get("sport") else [dict(e, sport=sport) for e in events])
+                    pending[sport] -= 1
+                    if pending[sport] == 0:
+                        _done(sport)
+    
+    def get_events_with_odds(
+        self,
+        sport: str,
+        day: Optional[str] = None,
+        window: Optional[Tuple[datetime, datetime]] = None,
+        odds_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Get events with real betting odds for a sport
+        window: (start_utc, end_utc) -> commenceTimeFrom/commenceTimeTo y sin tope de 50 eventos.
+        odds_key: liga concreta de The Odds API (por defecto la principal del deporte).
         Returns: {sport, events: [...]}
         """
         if not self.api_key:
             return {"sport": sport, "events": [], "error": "ODDS_API_KEY not configured"}
         
         sport_lower = sport.lower()
-        odds_sport_id = self.SPORT_TO_ODDS_ID.get(sport_lower)
+        odds_sport_id = odds_key or self.SPORT_TO_ODDS_ID.get(sport_lower)
         
         if not odds_sport_id:
             return {"sport": sport, "events": [], "error": f"Sport {sport} not supported"}
         
         try:
-            # Rate limit: ensure minimum interval between requests
-            now = time.time()
-            elapsed = now - self.last_request_time
-            if elapsed < self.min_request_interval:
-                time.sleep(self.min_request_interval - elapsed)
-            
             # Use /odds endpoint to get actual betting odds with all bookmakers
             url = f"{self.BASE_URL}/sports/{odds_sport_id}/odds"
             params = {
@@ -185,9 +432,12 @@ class TheOddsAPICached:
                 "markets": "h2h",
                 "oddsFormat": "decimal",
             }
+            if window is not None:
+                params["commenceTimeFrom"] = _iso_z(window[0])
+                params["commenceTimeTo"] = _iso_z(window[1])
             
-            response = self.session.get(url, params=params, timeout=10)
-            self.last_request_time = time.time()
+            # DF_QUOTA_BUDGET: cuota mensual + token bucket del host (sustituye el sleep entre requests)
+            response = budget_get(url, params=params, timeout=10, priority=self.priority)
             
             response.raise_for_status()
             data = response.json()
@@ -202,7 +452,8 @@ class TheOddsAPICached:
             
             # Normalize events
             normalized_events = []
-            for event in events[:50]:
+            # con ventana la API ya devuelve solo el ciclo: sin tope
+            for event in (events if window is not None else events[:50]):
                 try:
                     normalized = self._normalize_event(event, sport)
                     if normalized:
@@ -218,6 +469,9 @@ class TheOddsAPICached:
                 "count": len(normalized_events),
             }
         
+        except BudgetExhausted as e:
+            logger.warning(f"TheOddsAPI budget exhausted for {sport}: {e.reason} (remaining={e.remaining})")
+            return {"sport": sport, "events": [], "error": f"Budget exhausted ({e.reason})", "source": "theodds_api"}
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 429:
                 logger.warning(f"TheOddsAPI rate limit (429) for {sport}")
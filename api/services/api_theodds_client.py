@@ -8,9 +8,13 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 import logging
 import os
-import time
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+try:
+    from api.services.http_transport import configure_host
+    from api.services.quota_budget import BudgetExhausted, budget_get
+except ModuleNotFoundError:
+    from services.http_transport import configure_host  # type: ignore
+    from services.quota_budget import BudgetExhausted, budget_get  # type: ignore
 
 logger = logging.getLogger(__name__)
 
@@ -45,25 +49,15 @@ class TheOddsAPIClient:
         "betrivers",
     ]
     
-    def __init__(self):
+    def __init__(self, priority: str = "ingestion"):
         self.api_key = os.environ.get("ODDS_API_KEY")
         if not self.api_key:
             logger.warning("ODDS_API_KEY not set in environment")
-        self.session = requests.Session()
-        
-        # Add retry strategy for rate limits
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=2,  # Exponential backoff: 1s, 2s, 4s
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # DF_HTTP_TRANSPORT: sesión keep-alive compartida del host; retry propio para rate limits
+        configure_host(self.BASE_URL, retries=3, backoff=2)
         
-        self.last_request_time = 0
-        self.min_request_interval = 1.0  # Min 1 second between requests
+        # DF_QUOTA_BUDGET: clase de prioridad de las llamadas (ingestion | settlement | live | refresh | debug)
+        self.priority = priority
     
     def get_events_with_odds(self, sport: str, date: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -82,12 +76,6 @@ class TheOddsAPIClient:
             return {"sport": sport, "events": [], "error": f"Sport {sport} not supported"}
         
         try:
-            # Rate limit: ensure minimum interval between requests
-            now = time.time()
-            elapsed = now - self.last_request_time
-            if elapsed < self.min_request_interval:
-                time.sleep(self.min_request_interval - elapsed)
-            
             # Get events for this sport
             url = f"{self.BASE_URL}/sports/{odds_sport_id}/events"
             params = {
@@ -95,8 +83,8 @@ class TheOddsAPIClient:
                 "markets": "h2h",  # Head to head (moneyline)
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            self.last_request_time = time.time()
+            # DF_QUOTA_BUDGET: cuota mensual + token bucket del host (sustituye el sleep entre requests)
+            response = budget_get(url, params=params, timeout=10, priority=self.priority)
             
             response.raise_for_status()
             data = response.json()
@@ -123,6 +111,9 @@ class TheOddsAPIClient:
                 "requested_date": date,
             }
         
+        except BudgetExhausted as e:
+            logger.warning(f"TheOddsAPI budget exhausted for {sport}: {e.reason} (remaining={e.remaining})")
+            return {"sport": sport, "events": [], "error": f"Budget exhausted ({e.reason})", "source": "theodds_api"}
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 429:
                 logger.warning(f"TheOddsAPI rate limit (429) for {sport}. Remaining quota exceeded.")
@@ -0,0 +1,540 @@
+"""
+DF_BACKTEST: replay histórico de la capa de picks bajo una rejilla de constantes.
+
+Por cada día con api/data/odds_premium/<day>/all.json:
+1. Se parsea UNA vez (cache en proceso + pickle en api/data/.backtest_cache/<day>.pickle,
+   invalidado por mtime/size de los inputs): grupos de pools (no dependen de THRESHOLDS),
+   selecciones dentro de la ventana del contrato y resultados archivados.
+2. Para cada combinación de la rejilla se parchean las constantes de los módulos
+   (SHRINK_W, P_SAFE_MIN_PRIMARY, PARLAY_GUARDRAILS, THRESHOLDS, ...) y se re-ejecutan
+   en memoria picks_classic_multisport, picks_parlay_premium_multisport e
+   inflated_pool_builder + picks_parlay, sin escribir nada en api/data.
+   Cada producto solo se recalcula si cambia alguna constante de la que depende.
+3. ROI con los resultados archivados: contracts/<day>/archive.json, settlements/<day>,
+   y marcadores finales (display.live) del contrato o de los snapshots de eventos.
+
+Los días se reparten entre procesos (ProcessPoolExecutor).
+
+Uso:
+    python -m api.services.backtest_engine --grid SHRINK_W=0.3,0.35,0.4 \\
+        --grid PARLAY_GUARDRAILS.principal_2_legs.value_margin=0.02,0.03
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from api.services import (
+    display_enrichment,
+    inflated_pool_builder,
+    picks_classic_multisport,
+    picks_parlay,
+    picks_parlay_premium_multisport,
+)
+from api.services.bets_history_service import outcome_for_pick
+from api.services.live_overlay import apply_overlay, overlay_signature, pick_live
+from api.utils.paths import data_path, ensure_dir
+
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", "0"))  # 0 -> os.cpu_count()
+CACHE_VERSION = 1
+
+# constante -> (módulo donde vive, producto que depende de ella)
+TUNABLES: Dict[str, Tuple[ModuleType, str]] = {
+    "SHRINK_W": (picks_classic_multisport, "classic"),
+    "P_SAFE_MIN_PRIMARY": (picks_classic_multisport, "classic"),
+    "P_SAFE_MIN_FALLBACK": (picks_classic_multisport, "classic"),
+    "MAX_PICKS": (picks_classic_multisport, "classic"),
+    "SAFE_P_MIN": (picks_parlay_premium_multisport, "parlay_premium"),
+    "SAFE_EV_MIN": (picks_parlay_premium_multisport, "parlay_premium"),
+    "BOOM_P_MIN": (picks_parlay_premium_multisport, "parlay_premium"),
+    "BOOM_EV_MIN": (picks_parlay_premium_multisport, "parlay_premium"),
+    "THRESHOLDS": (inflated_pool_builder, "pools"),
+    "PARLAY_RULES": (picks_parlay, "picks_parlay"),
+    "PARLAY_GUARDRAILS": (picks_parlay, "picks_parlay"),
+}
+
+# picks_parlay sale de los pools y, si no hay pools, de los picks classic
+_PRODUCT_DEPS: Dict[str, Tuple[str, ...]] = {
+    "classic": ("classic",),
+    "parlay_premium": ("parlay_premium",),
+    "pools": ("pools",),
+    "picks_parlay": ("pools", "picks_parlay", "classic"),
+}
+
+PRODUCTS = ("classic", "parlay_premium", "parlay_marketing", "parlay_principal")
+
+Params = Dict[str, Any]
+PickKey = Tuple[str, str, str, str]
+EventKey = Tuple[str, str]
+
+
+@dataclass
+class DayInputs:
+    day: str
+    signature: Tuple[Any, ...]
+    groups: List[Any]                      # inflated_pool_builder._GroupAcc (todas las filas premium)
+    window: List[Dict[str, Any]]           # filas premium dentro de la ventana del contrato
+    outcomes: Dict[PickKey, str] = field(default_factory=dict)      # WIN / LOSE / VOID archivados
+    finals: Dict[EventKey, Dict[str, Any]] = field(default_factory=dict)  # display.live finales
+
+
+# -------------------------
+# Inputs (parse una vez + cache)
+# -------------------------
+def _file_sig(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _premium_path(day: str) -> Path:
+    return data_path("odds_premium", day, "all.json")
+
+
+def _outcome_paths(day: str) -> List[Path]:
+    return [
+        data_path("contracts", day, "contract.json"),
+        data_path("contracts", day, "archive.json"),
+        data_path("settlements", day, "settlement.json"),
+    ]
+
+
+def input_signature(day: str) -> Tuple[Any, ...]:
+    return (
+        CACHE_VERSION,
+        _file_sig(_premium_path(day)),
+        tuple(_file_sig(p) for p in _outcome_paths(day)),
+        # marcadores finales del refresh live (sidecar, no contract.json)
+        overlay_signature(day),
+        display_enrichment.display_index_signature(day),
+    )
+
+
+def list_days() -> List[str]:
+    base = data_path("odds_premium")
+    if not base.exists():
+        return []
+    return sorted(p.name for p in base.iterdir() if p.is_dir() and (p / "all.json").exists())
+
+
+def _read_json(path: Path) -> Any:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _pick_key(p: Dict[str, Any]) -> PickKey:
+    return (
+        str(p.get("sport") or ""),
+        str(p.get("eventId") or p.get("event_id") or ""),
+        str(p.get("market") or ""),
+        str(p.get("selection") or ""),
+    )
+
+
+def _is_final(live: Any) -> bool:
+    if not isinstance(live, dict):
+        return False
+    status = str(live.get("statusShort", "") or live.get("status", "")).upper()
+    return status in ("FT", "AET", "PEN", "FINAL")
+
+
+def _contract_legs(contract: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for item in contract.get("picks_classic") or []:
+        for p in item if isinstance(item, list) else [item]:
+            if isinstance(p, dict):
+                yield p
+    parlays = list(contract.get("picks_parlay_premium") or [])
+    if isinstance(contract.get("daily_featured_parlay"), dict):
+        parlays.append(contract["daily_featured_parlay"])
+    for parlay in parlays:
+        if not isinstance(parlay, dict):
+            continue
+        legs = parlay.get("legs") or []
+        outcomes = parlay.get("leg_outcomes") or []
+        for i, leg in enumerate(legs):
+            if not isinstance(leg, dict):
+                continue
+            if i < len(outcomes) and outcomes[i] and "outcome" not in leg:
+                leg = dict(leg, outcome=outcomes[i])
+            yield leg
+
+
+def _load_outcomes(day: str) -> Tuple[Dict[PickKey, str], Dict[EventKey, Dict[str, Any]]]:
+    """Resultados archivados del día: outcomes por pick y marcadores finales por evento."""
+    outcomes: Dict[PickKey, str] = {}
+    finals: Dict[EventKey, Dict[str, Any]] = {}
+
+    # snapshots de eventos (el refresh de live los deja con marcador final)
+    for (sport, eid), disp in display_enrichment.build_display_index(day).items():
+        if _is_final(disp.get("live")):
+            finals[(sport, eid)] = disp["live"]
+
+    contract_path, archive_path, settlement_path = _outcome_paths(day)
+    for path in (contract_path, archive_path):
+        doc = _read_json(path)
+        if not isinstance(doc, dict):
+            continue
+        if path == contract_path:
+            apply_overlay(doc, day)
+        for leg in _contract_legs(doc):
+            live = pick_live(leg)
+            if _is_final(live):
+                finals[(str(leg.get("sport") or ""), str(leg.get("eventId") or ""))] = live
+            if leg.get("outcome") in ("WIN", "LOSE"):
+                outcomes[_pick_key(leg)] = leg["outcome"]
+
+    settlement = _read_json(settlement_path)
+    if isinstance(settlement, dict):
+        for p in settlement.get("picks") or []:
+            res = {"WIN": "WIN", "LOSS": "LOSE", "VOID": "VOID"}.get(str(p.get("result")))
+            if res:
+                outcomes.setdefault(_pick_key(p), res)
+
+    return outcomes, finals
+
+
+def _build_inputs(day: str, signature: Tuple[Any, ...]) -> DayInputs:
+    rows = _read_json(_premium_path(day))
+    if not isinstance(rows, list):
+        raise ValueError(f"odds_premium/{day}/all.json no es una lista")
+    outcomes, finals = _load_outcomes(day)
+    return DayInputs(
+        day=day,
+        signature=signature,
+        groups=inflated_pool_builder.pool_groups(rows),
+        window=picks_classic_multisport.filter_cycle_window(day, rows),
+        outcomes=outcomes,
+        finals=finals,
+    )
+
+
+_INPUTS_CACHE: Dict[str, DayInputs] = {}
+
+
+def _cache_path(day: str) -> Path:
+    return ensure_dir(data_path(".backtest_cache")) / f"{day}.pickle"
+
+
+def load_day_inputs(day: str, use_cache: bool = True) -> DayInputs:
+    sig = input_signature(day)
+    hit = _INPUTS_CACHE.get(day)
+    if use_cache and hit is not None and hit.signature == sig:
+        return hit
+
+    path = _cache_path(day)
+    inputs: Optional[DayInputs] = None
+    if use_cache and path.exists():
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            if isinstance(cached, DayInputs) and cached.signature == sig:
+                inputs = cached
+        except Exception:
+            inputs = None
+
+    if inputs is None:
+        inputs = _build_inputs(day, sig)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(inputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    _INPUTS_CACHE[day] = inputs
+    return inputs
+
+
+# -------------------------
+# Rejilla de constantes
+# -------------------------
+def _root(name: str) -> str:
+    root = name.split(".", 1)[0]
+    if root not in TUNABLES:
+        raise KeyError(f"Constante no soportada: {root} (opciones: {', '.join(sorted(TUNABLES))})")
+    return root
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Params]:
+    """{nombre: [valores]} -> lista de combinaciones; siempre empieza por el baseline ({})."""
+    for name in grid:
+        _root(name)
+    names = list(grid)
+    combos: List[Params] = [{}]
+    for values in itertools.product(*(grid[n] for n in names)):
+        combos.append(dict(zip(names, values)))
+    return combos
+
+
+@contextmanager
+def override_constants(params: Params) -> Iterator[None]:
+    """
+    Parchea las constantes del grid en sus módulos y las restaura al salir.
+    "PARLAY_GUARDRAILS.principal_2_legs.value_margin" modifica una copia del dict.
+    """
+    saved: Dict[str, Any] = {}
+    try:
+        for name, value in params.items():
+            root = _root(name)
+            module = TUNABLES[root][0]
+            if root not in saved:
+                saved[root] = getattr(module, root)
+                setattr(module, root, copy.deepcopy(saved[root]))
+            path = name.split(".")[1:]
+            if not path:
+                setattr(module, root, value)
+                continue
+            target = getattr(module, root)
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = value
+        yield
+    finally:
+        for root, value in saved.items():
+            setattr(TUNABLES[root][0], root, value)
+
+
+def _product_key(params: Params, product: str) -> Tuple[Tuple[str, str], ...]:
+    deps = _PRODUCT_DEPS[product]
+    return tuple(sorted((n, repr(v)) for n, v in params.items() if TUNABLES[_root(n)][1] in deps))
+
+
+# -------------------------
+# Scoring
+# -------------------------
+def _empty_stats() -> Dict[str, float]:
+    return {"bets": 0, "settled": 0, "wins": 0, "staked": 0.0, "returned": 0.0}
+
+
+def _pick_outcome(inputs: DayInputs, p: Dict[str, Any]) -> Optional[str]:
+    key = _pick_key(p)
+    hit = inputs.outcomes.get(key)
+    if hit is not None:
+        return hit
+    live = inputs.finals.get((key[0], key[1]))
+    return outcome_for_pick(live, key[2], key[3]) if live else None
+
+
+def _settle(stats: Dict[str, float], stake: float, odds: float, outcome: Optional[str]) -> None:
+    stats["bets"] += 1
+    if outcome not in ("WIN", "LOSE"):
+        return  # pendiente o VOID: no cuenta para ROI
+    stats["settled"] += 1
+    stats["staked"] += stake
+    if outcome == "WIN":
+        stats["wins"] += 1
+        stats["returned"] += stake * odds
+
+
+def _parlay_outcome(inputs: DayInputs, legs: List[Dict[str, Any]]) -> Tuple[Optional[str], float]:
+    """(outcome, cuota efectiva): LOSE si falla una pierna; las VOID salen de la cuota."""
+    odds = 1.0
+    pending = False
+    won = 0
+    for leg in legs:
+        outcome = _pick_outcome(inputs, leg)
+        if outcome == "LOSE":
+            return "LOSE", 0.0
+        if outcome == "WIN":
+            won += 1
+            odds *= float(leg.get("odds") or 1.0)
+        elif outcome != "VOID":
+            pending = True
+    if pending:
+        return None, 0.0
+    return ("WIN", odds) if won else ("VOID", 1.0)
+
+
+def _score_picks(inputs: DayInputs, picks: List[Dict[str, Any]]) -> Dict[str, float]:
+    stats = _empty_stats()
+    for p in picks:
+        _settle(stats, float(p.get("stake") or picks_parlay.STAKE), float(p.get("odds") or 0.0), _pick_outcome(inputs, p))
+    return stats
+
+
+def _score_parlays(inputs: DayInputs, parlays: List[Dict[str, Any]], legs_key: str) -> Dict[str, float]:
+    stats = _empty_stats()
+    for parlay in parlays:
+        outcome, odds = _parlay_outcome(inputs, parlay.get(legs_key) or [])
+        _settle(stats, picks_parlay.STAKE, odds, outcome)
+    return stats
+
+
+def _premium_outputs(all_picks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Los mismos parlays que escribe picks_parlay_premium_multisport.run_for_day (SAFE_2 x2, SAFE_4, BOOM_3)."""
+    safe = picks_parlay_premium_multisport.build_safe_parlays(all_picks)
+    out = [x for x in safe if x.get("kind") == "SAFE_2"][:2] + [x for x in safe if x.get("kind") == "SAFE_4"][:1]
+    boom = picks_parlay_premium_multisport.build_boom_parlay(all_picks)
+    if boom is not None:
+        out.append(boom)
+    return out
+
+
+def replay_day(inputs: DayInputs, combos: List[Params]) -> List[Dict[str, Dict[str, float]]]:
+    """Stats por producto para cada combinación, en el orden de combos."""
+    memo: Dict[Tuple[str, Any], Any] = {}
+
+    def cached(product: str, params: Params, fn):
+        key = (product, _product_key(params, product))
+        if key not in memo:
+            memo[key] = fn()
+        return memo[key]
+
+    def _replay_classic():
+        picks = picks_classic_multisport.select_picks(inputs.window)[0]
+        return picks, _score_picks(inputs, picks)
+
+    results: List[Dict[str, Dict[str, float]]] = []
+    for params in combos:
+        with override_constants(params):
+            classic, classic_stats = cached("classic", params, _replay_classic)
+            pools = cached("pools", params, lambda: inflated_pool_builder.evaluate_pools(inputs.groups))
+
+            def _picks_parlay():
+                marketing, principal = picks_parlay.build_parlays(inputs.day, pools=pools, classic=classic)
+                return (
+                    _score_parlays(inputs, marketing, "picks"),
+                    _score_parlays(inputs, [principal] if principal else [], "picks"),
+                )
+
+            marketing_stats, principal_stats = cached("picks_parlay", params, _picks_parlay)
+            results.append({
+                "classic": classic_stats,
+                "parlay_premium": cached(
+                    "parlay_premium", params,
+                    lambda: _score_parlays(inputs, _premium_outputs(inputs.window), "legs"),
+                ),
+                "parlay_marketing": marketing_stats,
+                "parlay_principal": principal_stats,
+            })
+    return results
+
+
+def _replay_worker(day: str, combos: List[Params], use_cache: bool) -> Tuple[str, Any]:
+    try:
+        return day, replay_day(load_day_inputs(day, use_cache=use_cache), combos)
+    except (OSError, ValueError) as err:
+        return day, {"error": str(err)}
+
+
+# -------------------------
+# Agregado
+# -------------------------
+def _finish(stats: Dict[str, float]) -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(stats)
+    out["staked"] = round(stats["staked"], 2)
+    out["returned"] = round(stats["returned"], 2)
+    out["profit"] = round(stats["returned"] - stats["staked"], 2)
+    out["roi"] = round((stats["returned"] - stats["staked"]) / stats["staked"], 4) if stats["staked"] else None
+    out["hit_rate"] = round(stats["wins"] / stats["settled"], 4) if stats["settled"] else None
+    return out
+
+
+def _add(acc: Dict[str, float], stats: Dict[str, float]) -> None:
+    for k, v in stats.items():
+        acc[k] += v
+
+
+def run_backtest(
+    grid: Optional[Dict[str, List[Any]]] = None,
+    days: Optional[List[str]] = None,
+    workers: int = BACKTEST_WORKERS,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    t0 = time.time()
+    combos = expand_grid(grid or {})
+    days = list(days) if days else list_days()
+    workers = min(workers or os.cpu_count() or 1, max(1, len(days)))
+
+    if workers <= 1:
+        per_day = [_replay_worker(day, combos, use_cache) for day in days]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_day = list(pool.map(_replay_worker, days, [combos] * len(days), [use_cache] * len(days)))
+
+    errors = {day: res["error"] for day, res in per_day if isinstance(res, dict)}
+    ok = [(day, res) for day, res in per_day if not isinstance(res, dict)]
+
+    results: List[Dict[str, Any]] = []
+    for i, params in enumerate(combos):
+        products = {name: _empty_stats() for name in PRODUCTS}
+        total = _empty_stats()
+        by_day: Dict[str, Any] = {}
+        for day, res in ok:
+            day_total = _empty_stats()
+            for name in PRODUCTS:
+                _add(products[name], res[i][name])
+                _add(day_total, res[i][name])
+            _add(total, day_total)
+            by_day[day] = _finish(day_total)
+        results.append({
+            "params": params,
+            "total": _finish(total),
+            "products": {name: _finish(s) for name, s in products.items()},
+            "by_day": by_day,
+        })
+
+    baseline = results[0]
+    ranked = sorted(results, key=lambda r: (r["total"]["roi"] is not None, r["total"]["roi"] or 0.0), reverse=True)
+    return {
+        "days": [day for day, _ in ok],
+        "errors": errors,
+        "combos": len(combos),
+        "workers": workers,
+        "elapsed_s": round(time.time() - t0, 3),
+        "baseline": baseline,
+        "results": ranked,
+    }
+
+
+def _parse_grid_arg(raw: str) -> Tuple[str, List[Any]]:
+    """NAME=v1,v2,... (cada valor se lee como JSON si se puede) o NAME=[...] en JSON."""
+    name, _, values = raw.partition("=")
+    name = name.strip()
+    values = values.strip()
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"--grid espera NAME=v1,v2: {raw}")
+    if values.startswith("["):
+        parsed = json.loads(values)
+        return name, parsed if isinstance(parsed, list) else [parsed]
+    out: List[Any] = []
+    for v in values.split(","):
+        v = v.strip()
+        try:
+            out.append(json.loads(v))
+        except ValueError:
+            out.append(v)
+    return name, out
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Replay the pick pipeline over stored days under a grid of constants")
+    p.add_argument("--grid", action="append", default=[], type=_parse_grid_arg, help="NAME=v1,v2 (repeatable; dotted paths into dicts)")
+    p.add_argument("--days", default=None, help="Comma-separated days (default: every day with odds_premium)")
+    p.add_argument("--workers", type=int, default=BACKTEST_WORKERS, help="Worker processes (0 = cpu count)")
+    p.add_argument("--no-cache", action="store_true", help="Re-parse inputs instead of using .backtest_cache")
+    p.add_argument("--top", type=int, default=10, help="Combinations to print")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    days = [d.strip() for d in args.days.split(",") if d.strip()] if args.days else None
+    report = run_backtest(dict(args.grid), days=days, workers=args.workers, use_cache=not args.no_cache)
+    report["results"] = report["results"][: max(1, args.top)]
+    print(json.dumps(report, ensure_ascii=False, indent=2))
@@ -7,19 +7,30 @@ Each day, after bets are finalized, store the contract snapshot with:
 - timestamps and final scores
 """
 
+import copy
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from api.utils.cycle_day import cycle_day_str
+    from api.utils.paths import data_path
+    from api.services import history_index
+    from api.services.live_overlay import apply_overlay, pick_live
 except ModuleNotFoundError:
     from utils.cycle_day import cycle_day_str
+    from utils.paths import data_path  # type: ignore
+    from services import history_index  # type: ignore
+    from services.live_overlay import apply_overlay, pick_live  # type: ignore
 
+# DF_HISTORY_INDEX: archive.json ya parseados, por (mtime_ns, size)
+_ARCHIVE_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_ARCHIVE_CACHE_MAX = 32
 
-def _outcome_for_pick(live: Dict[str, Any], market: Optional[str], selection: Optional[str]) -> Optional[str]:
-    """Determine WIN/LOSE from final score and market selection"""
+
+def outcome_for_pick(live: Dict[str, Any], market: Optional[str], selection: Optional[str]) -> Optional[str]:
+    """Determine WIN/LOSE from final score and market selection (shared with backtest_engine)"""
     if not isinstance(live, dict):
         return None
     
@@ -87,7 +98,10 @@ def archive_day_bets(contract: Dict[str, Any], day: str = None) -> None:
     if day is None:
         day = cycle_day_str()
     
-    archived = dict(contract)
+    # DF_LIVE_OVERLAY: los marcadores finales viven en contracts/<day>/live_overlay.json,
+    # no en contract.json; se mezclan sobre una copia antes de evaluar
+    archived = copy.deepcopy(contract)
+    apply_overlay(archived, day)
     archived["archived_at"] = datetime.utcnow().isoformat()
     archived["archive_day"] = day
     
@@ -99,14 +113,14 @@ def archive_day_bets(contract: Dict[str, Any], day: str = None) -> None:
             if isinstance(container, list):
                 for pick in container:
                     if isinstance(pick, dict):
-                        live = pick.get("display", {}).get("live")
-                        outcome = _outcome_for_pick(live, pick.get("market"), pick.get("selection"))
+                        live = pick_live(pick)
+                        outcome = outcome_for_pick(live, pick.get("market"), pick.get("selection"))
                         pick_with_outcome = dict(pick)
                         pick_with_outcome["outcome"] = outcome
                         evaluated_classic.append(pick_with_outcome)
             elif isinstance(container, dict):
-                live = container.get("display", {}).get("live")
-                outcome = _outcome_for_pick(live, container.get("market"), container.get("selection"))
+                live = pick_live(container)
+                outcome = outcome_for_pick(live, container.get("market"), container.get("selection"))
                 pick_with_outcome = dict(container)
                 pick_with_outcome["outcome"] = outcome
                 evaluated_classic.append(pick_with_outcome)
@@ -124,8 +138,8 @@ def archive_day_bets(contract: Dict[str, Any], day: str = None) -> None:
                     outcomes = []
                     for leg in legs:
                         if isinstance(leg, dict):
-                            live = leg.get("display", {}).get("live")
-                            outcome = _outcome_for_pick(live, leg.get("market"), leg.get("selection"))
+                            live = pick_live(leg)
+                            outcome = outcome_for_pick(live, leg.get("market"), leg.get("selection"))
                             outcomes.append(outcome)
                     
                     # Parlay outcome: WIN if all legs WIN, LOSE if any LOSE, PENDING otherwise
@@ -151,8 +165,8 @@ def archive_day_bets(contract: Dict[str, Any], day: str = None) -> None:
             outcomes = []
             for leg in legs:
                 if isinstance(leg, dict):
-                    live = leg.get("display", {}).get("live")
-                    outcome = _outcome_for_pick(live, leg.get("market"), leg.get("selection"))
+                    live = pick_live(leg)
+                    outcome = outcome_for_pick(live, leg.get("market"), leg.get("selection"))
                     outcomes.append(outcome)
             
             if outcomes and all(o == "WIN" for o in outcomes):
@@ -168,63 +182,51 @@ def archive_day_bets(contract: Dict[str, Any], day: str = None) -> None:
         archived["daily_featured_parlay"] = featured_with_outcomes
     
     # Persist archive
-    archive_path = Path(f"api/data/contracts/{day}/archive.json")
+    archive_path = data_path("contracts", day, "archive.json")
     archive_path.parent.mkdir(parents=True, exist_ok=True)
     with open(archive_path, "w", encoding="utf-8") as f:
         json.dump(archived, f, ensure_ascii=False, indent=2)
 
+    # DF_HISTORY_INDEX: resumen del día al índice (lo sirve /history/days sin releer archives)
+    history_index.index_day(day, archived)
+
 
 def load_day_history(day: str) -> Optional[Dict[str, Any]]:
     """Load archived bets for a specific day"""
-    archive_path = Path(f"api/data/contracts/{day}/archive.json")
-    if not archive_path.exists():
+    archive_path = data_path("contracts", day, "archive.json")
+    try:
+        st = archive_path.stat()
+    except OSError:
         return None
-    
+    sig = (st.st_mtime_ns, st.st_size)
+
+    hit = _ARCHIVE_CACHE.get(day)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+
     try:
         with open(archive_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            data = json.load(f)
     except Exception:
         return None
 
+    if len(_ARCHIVE_CACHE) >= _ARCHIVE_CACHE_MAX:
+        _ARCHIVE_CACHE.pop(next(iter(_ARCHIVE_CACHE)))
+    _ARCHIVE_CACHE[day] = (sig, data)
+    return data
+
 
-def list_history_days(limit: int = 30) -> List[Dict[str, Any]]:
+def list_history_days(limit: int = 30, offset: int = 0) -> List[Dict[str, Any]]:
     """List recent days with archived bets (most recent first)"""
-    contracts_dir = Path("api/data/contracts")
-    if not contracts_dir.exists():
-        return []
-    
-    days_with_archives = []
-    for day_dir in sorted(contracts_dir.iterdir(), reverse=True):
-        if not day_dir.is_dir():
-            continue
-        archive_file = day_dir / "archive.json"
-        if archive_file.exists():
-            try:
-                with open(archive_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    day_str = day_dir.name
-                    
-                    # Count outcomes
-                    classic = data.get("picks_classic", [])
-                    classic_wins = sum(1 for p in classic if isinstance(p, dict) and p.get("outcome") == "WIN")
-                    classic_total = len([p for p in classic if isinstance(p, dict)])
-                    
-                    parlays = data.get("picks_parlay_premium", [])
-                    parlay_wins = sum(1 for p in parlays if isinstance(p, dict) and p.get("outcome") == "WIN")
-                    parlay_total = len([p for p in parlays if isinstance(p, dict)])
-                    
-                    days_with_archives.append({
-                        "day": day_str,
-                        "archived_at": data.get("archived_at"),
-                        "classic_wins": classic_wins,
-                        "classic_total": classic_total,
-                        "parlay_wins": parlay_wins,
-                        "parlay_total": parlay_total,
-                    })
-            except Exception:
-                pass
-            
-            if len(days_with_archives) >= limit:
-                break
-    
-    return days_with_archives
+    days, _total = history_index.list_days(limit=limit, offset=offset)
+    return days
+
+
+def history_days_page(limit: int = 30, offset: int = 0) -> Dict[str, Any]:
+    days, total = history_index.list_days(limit=limit, offset=offset)
+    return {"days": days, "total": total, "limit": limit, "offset": offset}
+
+
+def history_aggregate(start: Optional[str] = None, end: Optional[str] = None, group_by: Optional[str] = None) -> Dict[str, Any]:
+    """Totales WIN/LOSE/PENDING por sección en un rango de días, desde el índice."""
+    return history_index.aggregate(start=start, end=end, group_by=group_by)
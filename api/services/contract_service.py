@@ -1,6 +1,7 @@
 from typing import Dict, List, Optional
 from datetime import date, datetime
 import json
+import os
 from pathlib import Path
 
 # Import robusto: funciona si ejecutas desde repo root o desde /api
@@ -9,6 +10,11 @@ try:
 except ModuleNotFoundError:  # ejecución desde repo root
     from api.services.display_enrichment import enrich_contract_inplace  # type: ignore
 
+try:
+    from services.response_cache import invalidate_bets_today
+except ModuleNotFoundError:
+    from api.services.response_cache import invalidate_bets_today  # type: ignore
+
 CONTRACT_VERSION = "1.0"
 
 # Repo root: .../bot-ultimate-prediction
@@ -85,7 +91,13 @@ def freeze_and_save_contract(contract: Dict) -> Dict:
     base_path.mkdir(parents=True, exist_ok=True)
 
     file_path = base_path / "contract.json"
-    with open(file_path, "w", encoding="utf-8") as f:
+    # tmp + os.replace: /bets/today lee este fichero y nunca debe verlo a medio escribir
+    tmp_path = file_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(contract, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, file_path)
+
+    # DF_RESPONSE_CACHE: /bets/today del día se re-renderiza en el próximo request
+    invalidate_bets_today(day)
 
     return contract
@@ -5,13 +5,23 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 import json
-from collections import Counter
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
 
 import hashlib
-import urllib.request
 from functools import lru_cache
 
 import os
+import threading
+
+try:
+    from api.services.http_transport import http_get
+    from api.services.snapshot_store import get_record as get_snapshot_record
+    from api.services.snapshot_store import load_json as load_snapshot_json
+except ModuleNotFoundError:
+    from services.http_transport import http_get  # type: ignore
+    from services.snapshot_store import get_record as get_snapshot_record  # type: ignore
+    from services.snapshot_store import load_json as load_snapshot_json  # type: ignore
 
 # API-SPORTS a veces devuelve una imagen 'image not available' con HTTP 200.
 # La detectamos por hash y devolvemos None para que el frontend haga fallback.
@@ -23,9 +33,9 @@ def _is_api_sports_placeholder_image(url: str) -> bool:
     if not url or API_SPORTS_MEDIA_HOST not in url:
         return False
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(req, timeout=6) as r:
-            data = r.read()
+        r = http_get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=6)
+        r.raise_for_status()
+        data = r.content
         h = hashlib.sha256(data).hexdigest()
         return h == PLACEHOLDER_LOGO_SHA256
     except Exception:
@@ -117,204 +127,341 @@ def _safe_read_json(path: Path) -> Optional[Any]:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def _build_football_index(day: str) -> Dict[str, Dict[str, Any]]:
-    """
-    Indexa api/data/events/<day>/football.json (raw API-SPORTS) por eventId(str).
-    Devuelve: eventId -> {home:{name,logo}, away:{name,logo}, league, startTime}
-    """
-    raw_path = _events_dir(day) / "football.json"
-    data = _safe_read_json(raw_path)
-    if not data:
-        return {}
-
+def _response_items(data: Any) -> list:
     response = data.get("response") if isinstance(data, dict) else None
-    if not isinstance(response, list):
-        return {}
+    return response if isinstance(response, list) else []
 
-    idx: Dict[str, Dict[str, Any]] = {}
-    for item in response:
-        if not isinstance(item, dict):
-            continue
-        fixture = item.get("fixture") if isinstance(item.get("fixture"), dict) else {}
-        event_id = fixture.get("id")
-        if event_id is None:
-            continue
-
-        teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
-        home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
-        away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
-
-        league = item.get("league") if isinstance(item.get("league"), dict) else {}
-
-        status = fixture.get("status") if isinstance(fixture.get("status"), dict) else {}
-        goals = item.get("goals") if isinstance(item.get("goals"), dict) else {}
-        live = {
-            "statusLong": status.get("long"),
-            "statusShort": status.get("short"),
-            "elapsed": status.get("elapsed"),
-            "extra": status.get("extra"),
-            "homeScore": goals.get("home"),
-            "awayScore": goals.get("away"),
-        }
-
-        idx[str(event_id)] = {
-            "sport": "football",
-            "eventId": str(event_id),
-            "league": league.get("name"),
-            "leagueLogo": league.get("logo"),
-            "startTime": fixture.get("date"),
-            "live": live,
-            "home": {"name": home.get("name"), "logo": home.get("logo")},
-            "away": {"name": away.get("name"), "logo": away.get("logo")},
-        }
 
-    return idx
+def _football_display(item: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Item raw API-SPORTS football -> (eventId, {home:{name,logo}, away:{name,logo}, league, startTime})."""
+    if not isinstance(item, dict):
+        return None
+    fixture = item.get("fixture") if isinstance(item.get("fixture"), dict) else {}
+    event_id = fixture.get("id")
+    if event_id is None:
+        return None
 
+    teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
+    home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
+    away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
+
+    league = item.get("league") if isinstance(item.get("league"), dict) else {}
+
+    status = fixture.get("status") if isinstance(fixture.get("status"), dict) else {}
+    goals = item.get("goals") if isinstance(item.get("goals"), dict) else {}
+    live = {
+        "statusLong": status.get("long"),
+        "statusShort": status.get("short"),
+        "elapsed": status.get("elapsed"),
+        "extra": status.get("extra"),
+        "homeScore": goals.get("home"),
+        "awayScore": goals.get("away"),
+    }
 
-def _build_generic_games_index(day: str, sport: str) -> Dict[str, Dict[str, Any]]:
+    return str(event_id), {
+        "sport": "football",
+        "eventId": str(event_id),
+        "league": league.get("name"),
+        "leagueLogo": league.get("logo"),
+        "startTime": fixture.get("date"),
+        "live": live,
+        "home": {"name": home.get("name"), "logo": home.get("logo")},
+        "away": {"name": away.get("name"), "logo": away.get("logo")},
+    }
+
+
+def _generic_game_display(item: Any, sport: str) -> Optional[Tuple[str, Dict[str, Any]]]:
     """
-    Builder genérico para deportes donde response[] tiene:
+    Deportes donde response[] tiene:
       { id, date, league:{name,logo}, teams:{home:{name,logo}, away:{...}} }
     (handball/hockey/basketball/rugby/volleyball/baseball/afl suelen venir así)
     """
-    raw_path = _events_dir(day) / f"{sport}.json"
-    data = _safe_read_json(raw_path)
-    if not data:
-        return {}
-
-    response = data.get("response") if isinstance(data, dict) else None
-    if not isinstance(response, list):
-        return {}
+    if not isinstance(item, dict):
+        return None
 
-    idx: Dict[str, Dict[str, Any]] = {}
-    for item in response:
-        if not isinstance(item, dict):
-            continue
-
-        event_id = item.get("id")
-        if event_id is None:
-            continue
-
-        league = item.get("league") if isinstance(item.get("league"), dict) else {}
-        teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
-        home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
-        away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
-
-        start_time = item.get("date")
-
-        status = item.get("status") if isinstance(item.get("status"), dict) else {}
-        scores = item.get("scores") if isinstance(item.get("scores"), dict) else {}
-        home_scores = scores.get("home")
-        away_scores = scores.get("away")
-        home_total = home_scores.get("total") if isinstance(home_scores, dict) else home_scores
-        away_total = away_scores.get("total") if isinstance(away_scores, dict) else away_scores
-        live = {
-            "statusLong": status.get("long"),
-            "statusShort": status.get("short"),
-            "timer": status.get("timer") or item.get("timer"),
-            "time": item.get("time"),
-            "homeScore": home_total,
-            "awayScore": away_total,
-            "periods": item.get("periods"),
-        }
-        if isinstance(start_time, dict):
-            d = start_time.get("date")
-            t = start_time.get("time")
-            start_time = f"{d}T{t}:00+00:00" if d and t else None
-
-        idx[str(event_id)] = {
-            "sport": sport,
-            "eventId": str(event_id),
-            "league": league.get("name"),
-            "leagueLogo": league.get("logo"),
-            "startTime": start_time,
-            "live": live,
-            "home": {"name": home.get("name"), "logo": home.get("logo")},
-            "away": {"name": away.get("name"), "logo": away.get("logo")},
-        }
+    event_id = item.get("id")
+    if event_id is None:
+        return None
 
-    return idx
+    league = item.get("league") if isinstance(item.get("league"), dict) else {}
+    teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
+    home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
+    away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
+
+    start_time = item.get("date")
+
+    status = item.get("status") if isinstance(item.get("status"), dict) else {}
+    scores = item.get("scores") if isinstance(item.get("scores"), dict) else {}
+    home_scores = scores.get("home")
+    away_scores = scores.get("away")
+    home_total = home_scores.get("total") if isinstance(home_scores, dict) else home_scores
+    away_total = away_scores.get("total") if isinstance(away_scores, dict) else away_scores
+    live = {
+        "statusLong": status.get("long"),
+        "statusShort": status.get("short"),
+        "timer": status.get("timer") or item.get("timer"),
+        "time": item.get("time"),
+        "homeScore": home_total,
+        "awayScore": away_total,
+        "periods": item.get("periods"),
+    }
+    if isinstance(start_time, dict):
+        d = start_time.get("date")
+        t = start_time.get("time")
+        start_time = f"{d}T{t}:00+00:00" if d and t else None
+
+    return str(event_id), {
+        "sport": sport,
+        "eventId": str(event_id),
+        "league": league.get("name"),
+        "leagueLogo": league.get("logo"),
+        "startTime": start_time,
+        "live": live,
+        "home": {"name": home.get("name"), "logo": home.get("logo")},
+        "away": {"name": away.get("name"), "logo": away.get("logo")},
+    }
 
 
-def _build_nfl_index(day: str) -> Dict[str, Dict[str, Any]]:
+def _nfl_display(item: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
     """
     NFL (american-football) viene como:
       { game:{id, date:{timestamp|date|time}}, league:{name,logo}, teams:{home,away} }
     """
-    raw_path = _events_dir(day) / "nfl.json"
-    data = _safe_read_json(raw_path)
-    if not data:
-        return {}
+    if not isinstance(item, dict):
+        return None
 
-    response = data.get("response") if isinstance(data, dict) else None
-    if not isinstance(response, list):
+    game = item.get("game") if isinstance(item.get("game"), dict) else {}
+    event_id = game.get("id")
+    if event_id is None:
+        return None
+
+    league = item.get("league") if isinstance(item.get("league"), dict) else {}
+    teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
+    home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
+    away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
+
+    start_time = None
+    date_info = game.get("date") if isinstance(game.get("date"), dict) else {}
+    ts = date_info.get("timestamp")
+    if ts is not None:
+        try:
+            start_time = datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat()
+        except Exception:
+            start_time = None
+    if not start_time:
+        d = date_info.get("date")
+        t = date_info.get("time")
+        if d and t:
+            start_time = f"{d}T{t}:00+00:00"
+
+    return str(event_id), {
+        "sport": "nfl",
+        "eventId": str(event_id),
+        "league": league.get("name"),
+        "leagueLogo": league.get("logo"),
+        "startTime": start_time,
+        "home": {"name": home.get("name"), "logo": home.get("logo")},
+        "away": {"name": away.get("name"), "logo": away.get("logo")},
+    }
+
+
+GENERIC_DISPLAY_SPORTS = ["handball", "hockey", "basketball", "rugby", "volleyball", "baseball", "afl"]
+# orden de construcción del índice: football, nfl, genéricos
+DISPLAY_SPORTS = ["football", "nfl"] + GENERIC_DISPLAY_SPORTS
+
+
+def _display_for(sport: str, item: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    if sport == "football":
+        return _football_display(item)
+    if sport == "nfl":
+        return _nfl_display(item)
+    return _generic_game_display(item, sport)
+
+
+def _build_sport_index(day: str, sport: str) -> Dict[str, Dict[str, Any]]:
+    """eventId(str) -> display payload para api/data/events/<day>/<sport>.json."""
+    raw_path = _events_dir(day) / f"{sport}.json"
+    if not raw_path.exists():
+        return {}
+    data = load_snapshot_json(raw_path)
+    if not data:
         return {}
 
     idx: Dict[str, Dict[str, Any]] = {}
-    for item in response:
-        if not isinstance(item, dict):
-            continue
-
-        game = item.get("game") if isinstance(item.get("game"), dict) else {}
-        event_id = game.get("id")
-        if event_id is None:
-            continue
-
-        league = item.get("league") if isinstance(item.get("league"), dict) else {}
-        teams = item.get("teams") if isinstance(item.get("teams"), dict) else {}
-        home = teams.get("home") if isinstance(teams.get("home"), dict) else {}
-        away = teams.get("away") if isinstance(teams.get("away"), dict) else {}
-
-        start_time = None
-        date_info = game.get("date") if isinstance(game.get("date"), dict) else {}
-        ts = date_info.get("timestamp")
-        if ts is not None:
-            try:
-                start_time = datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat()
-            except Exception:
-                start_time = None
-        if not start_time:
-            d = date_info.get("date")
-            t = date_info.get("time")
-            if d and t:
-                start_time = f"{d}T{t}:00+00:00"
-
-        idx[str(event_id)] = {
-            "sport": "nfl",
-            "eventId": str(event_id),
-            "league": league.get("name"),
-            "leagueLogo": league.get("logo"),
-            "startTime": start_time,
-            "home": {"name": home.get("name"), "logo": home.get("logo")},
-            "away": {"name": away.get("name"), "logo": away.get("logo")},
-        }
-
+    for item in _response_items(data):
+        res = _display_for(sport, item)
+        if res is not None:
+            idx[res[0]] = res[1]
     return idx
 
 
-def build_display_index(day: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
-    """
-    Índice genérico multi-deporte:
-      (sport, eventId) -> display_payload
-    """
-    out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+def _build_football_index(day: str) -> Dict[str, Dict[str, Any]]:
+    return _build_sport_index(day, "football")
+
+
+def _build_generic_games_index(day: str, sport: str) -> Dict[str, Dict[str, Any]]:
+    return _build_sport_index(day, sport)
+
+
+def _build_nfl_index(day: str) -> Dict[str, Dict[str, Any]]:
+    return _build_sport_index(day, "nfl")
+
+
+# -------------------------
+# DF_DISPLAY_CACHE: índice por deporte compartido por todo el proceso
+# -------------------------
+DISPLAY_CACHE_MAX_DAYS = int(os.environ.get("DISPLAY_INDEX_CACHE_DAYS", "4"))
 
-    football = _build_football_index(day)
-    for event_id, disp in football.items():
-        out[("football", str(event_id))] = disp
+SportSignature = Optional[Tuple[int, int]]  # (mtime_ns, size) del events/<day>/<sport>.json
 
-    nfl = _build_nfl_index(day)
-    for event_id, disp in nfl.items():
-        out[("nfl", str(event_id))] = disp
+_DISPLAY_CACHE: "OrderedDict[str, Dict[str, Tuple[SportSignature, Dict[str, Dict[str, Any]]]]]" = OrderedDict()
+_DISPLAY_CACHE_LOCK = threading.Lock()
+_DISPLAY_CACHE_STATS = {"hits": 0, "misses": 0, "rebuilt_sports": 0, "evicted_days": 0, "record_lookups": 0}
 
-    for sport in ["handball", "hockey", "basketball", "rugby", "volleyball", "baseball", "afl"]:
-        idx = _build_generic_games_index(day, sport)
-        for event_id, disp in idx.items():
-            out[(sport, str(event_id))] = disp
 
+def _sport_signature(day: str, sport: str) -> SportSignature:
+    try:
+        st = (_events_dir(day) / f"{sport}.json").stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _peek_sport_index(day: str, sport: str, sig: SportSignature) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Índice cacheado de un deporte si sigue al día; None si habría que reconstruirlo."""
+    with _DISPLAY_CACHE_LOCK:
+        entry = _DISPLAY_CACHE.get(day, {}).get(sport)
+        if entry is not None and entry[0] == sig:
+            _DISPLAY_CACHE_STATS["hits"] += 1
+            _DISPLAY_CACHE.move_to_end(day)
+            return entry[1]
+    return None
+
+
+def _cached_sport_index(day: str, sport: str, sig: SportSignature) -> Dict[str, Dict[str, Any]]:
+    """Índice de un deporte; solo se reconstruye si cambió su (mtime, size)."""
+    cached = _peek_sport_index(day, sport, sig)
+    if cached is not None:
+        return cached
+    with _DISPLAY_CACHE_LOCK:
+        _DISPLAY_CACHE_STATS["misses"] += 1
+
+    idx = _build_sport_index(day, sport) if sig is not None else {}
+
+    with _DISPLAY_CACHE_LOCK:
+        _DISPLAY_CACHE.setdefault(day, {})[sport] = (sig, idx)
+        _DISPLAY_CACHE.move_to_end(day)
+        _DISPLAY_CACHE_STATS["rebuilt_sports"] += 1
+        while len(_DISPLAY_CACHE) > max(1, DISPLAY_CACHE_MAX_DAYS):
+            _DISPLAY_CACHE.popitem(last=False)
+            _DISPLAY_CACHE_STATS["evicted_days"] += 1
+    return idx
+
+
+def display_index_signature(day: str) -> Tuple[Tuple[str, SportSignature], ...]:
+    """Firma (sport, mtime_ns, size) de los snapshots que alimentan el índice del día."""
+    return tuple((sport, _sport_signature(day, sport)) for sport in DISPLAY_SPORTS)
+
+
+def display_index_stats() -> Dict[str, Any]:
+    with _DISPLAY_CACHE_LOCK:
+        out: Dict[str, Any] = dict(_DISPLAY_CACHE_STATS)
+        out["days"] = list(_DISPLAY_CACHE.keys())
     return out
 
 
+def clear_display_index_cache() -> None:
+    with _DISPLAY_CACHE_LOCK:
+        _DISPLAY_CACHE.clear()
+
+
+class DisplayIndex(Mapping):
+    """
+    Índice (sport, eventId) -> display_payload resuelto bajo demanda.
+
+    Cada deporte se pide una vez por instancia al cache del proceso (un stat() del
+    events/<day>/<sport>.json). Si el cache no está al día, un lookup suelto lee solo
+    ese evento del .bsnap (mmap, get_record) en vez de decodificar el fichero entero;
+    sin .bsnap válido se reindexa ese deporte. Iterar / len() materializa todos los
+    deportes, en el mismo orden que el dict que se construía antes.
+    """
+
+    def __init__(self, day: str):
+        self.day = day
+        self._sports: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._records: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        self._full: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+
+    def _sport_index(self, sport: str) -> Dict[str, Dict[str, Any]]:
+        idx = self._sports.get(sport)
+        if idx is None:
+            idx = _cached_sport_index(self.day, sport, _sport_signature(self.day, sport))
+            self._sports[sport] = idx
+        return idx
+
+    def __getitem__(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        try:
+            sport, eid = key
+        except (TypeError, ValueError):
+            raise KeyError(key)
+        sport = str(sport)
+        disp = self._lookup(sport, str(eid)) if sport in DISPLAY_SPORTS else None
+        if disp is None:
+            raise KeyError(key)
+        return disp
+
+    def _lookup(self, sport: str, eid: str) -> Optional[Dict[str, Any]]:
+        idx = self._sports.get(sport)
+        if idx is not None:
+            return idx.get(eid)
+        if (sport, eid) in self._records:
+            return self._records[(sport, eid)]
+
+        sig = _sport_signature(self.day, sport)
+        if sig is None:
+            self._sports[sport] = {}
+            return None
+        idx = _peek_sport_index(self.day, sport, sig)
+        if idx is not None:
+            self._sports[sport] = idx
+            return idx.get(eid)
+
+        # cache frío: un solo record vía mmap
+        found, item = get_snapshot_record(_events_dir(self.day) / f"{sport}.json", sport, eid)
+        if not found:
+            return self._sport_index(sport).get(eid)
+        with _DISPLAY_CACHE_LOCK:
+            _DISPLAY_CACHE_STATS["record_lookups"] += 1
+        res = _display_for(sport, item) if item is not None else None
+        disp = res[1] if res is not None and res[0] == eid else None
+        self._records[(sport, eid)] = disp
+        return disp
+
+    def _materialize(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        if self._full is None:
+            out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            for sport in DISPLAY_SPORTS:
+                for event_id, disp in self._sport_index(sport).items():
+                    out[(sport, str(event_id))] = disp
+            self._full = out
+        return self._full
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self) -> int:
+        return len(self._materialize())
+
+
+def build_display_index(day: str) -> DisplayIndex:
+    """
+    Índice genérico multi-deporte:
+      (sport, eventId) -> display_payload
+    Los payloads vienen del cache del proceso: tratarlos como solo lectura.
+    """
+    return DisplayIndex(day)
+
+
 def enrich_pick_inplace(pick: Dict[str, Any], display_index: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
     """
     Inyecta pick["display"] si se puede resolver por (sport,eventId).
@@ -338,7 +485,8 @@ def enrich_pick_inplace(pick: Dict[str, Any], display_index: Dict[Tuple[str, str
         "league": disp.get("league"),
         "leagueLogo": sanitize_logo_url(disp.get("leagueLogo")),
         "startTime": disp.get("startTime"),
-        "live": disp.get("live"),
+        # copia: el payload del índice es compartido (cache del proceso)
+        "live": dict(disp["live"]) if isinstance(disp.get("live"), dict) else disp.get("live"),
         "home": {"name": home.get("name"), "logo": sanitize_logo_url(home.get("logo"))},
         "away": {"name": away.get("name"), "logo": sanitize_logo_url(away.get("logo"))},
     }
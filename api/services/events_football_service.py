@@ -1,9 +1,9 @@
-import requests
 from pathlib import Path
 from datetime import datetime
 
 from utils.time_window import get_daily_window_utc
 from services.env import get_env
+from services.http_transport import http_get
 
 API_BASE_URL = "https://v3.football.api-sports.io"
 
@@ -24,7 +24,7 @@ def fetch_football_events():
         "x-apisports-key": api_key
     }
 
-    response = requests.get(
+    response = http_get(
         f"{API_BASE_URL}/fixtures",
         headers=headers,
         params=params,
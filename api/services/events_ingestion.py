@@ -5,12 +5,14 @@ import logging
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 try:
     from services.api_theodds_client import TheOddsAPIClient
+    from services.snapshot_store import write_json_artifact
 except ImportError:
     from api.services.api_theodds_client import TheOddsAPIClient
+    from api.services.snapshot_store import write_json_artifact
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +46,19 @@ class IngestResult:
     results: Optional[int] = None
 
 
+def build_events_payload(events: List[Dict[str, Any]], fetch_id: Optional[str] = None) -> Dict[str, Any]:
+    """Payload de api/data/events/<day>/<sport>.json a partir de eventos normalizados de The Odds API."""
+    payload: Dict[str, Any] = {
+        "results": len(events),
+        "response": events,
+        "source": "theodds_api_primary",
+        "status": "success" if events else "no_events",
+    }
+    if fetch_id:
+        payload["fetch_id"] = fetch_id
+    return payload
+
+
 def ingest_events_for_day(day: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
     """
     Ingest events for a day using The Odds API (primary source for betting odds).
@@ -72,28 +87,16 @@ def ingest_events_for_day(day: Optional[str] = None, force: bool = False) -> Dic
             odds_events = theodds.get_events_with_odds(sport, day)
             odds_list = odds_events.get("events", [])
             
+            payload = build_events_payload(odds_list)
+            results = len(odds_list)
             if odds_list:
                 # Use The Odds API as primary source
-                payload = {
-                    "results": len(odds_list),
-                    "response": odds_list,
-                    "source": "theodds_api_primary",
-                    "status": "success"
-                }
-                results = len(odds_list)
                 logger.info(f"✓ The Odds API: {results} events for {sport}")
             else:
                 # No events found - this is normal for some sports/dates
                 logger.info(f"ℹ No events found for {sport} on {day}")
-                payload = {
-                    "results": 0,
-                    "response": [],
-                    "source": "theodds_api_primary",
-                    "status": "no_events"
-                }
-                results = 0
             
-            out_file.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            write_json_artifact(out_file, payload, sport=sport)
             
             summary["sports"].append(
                 IngestResult(
@@ -109,7 +112,7 @@ def ingest_events_for_day(day: Optional[str] = None, force: bool = False) -> Dic
             msg = str(err)
             payload = {"results": 0, "response": [], "errors": {"message": msg}, "source": "theodds_api_primary"}
             try:
-                out_file.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                write_json_artifact(out_file, payload, sport=sport)
             except Exception:
                 pass
             summary["sports"].append(IngestResult(sport, day, "error", str(out_file), 0).__dict__)
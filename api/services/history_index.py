@@ -0,0 +1,317 @@
+"""
+DF_HISTORY_INDEX: índice SQLite del histórico de apuestas (api/data/history/index.sqlite3).
+
+archive_day_bets escribe aquí el resumen del día al archivar (una fila en `days` y
+el desglose por sección/deporte/mercado en `breakdown`), así que /history/days y los
+agregados por rango se sirven con una query indexada, sin recorrer
+contracts/<day>/archive.json ni volver a contar outcomes en cada request.
+
+Cada fila de `days` guarda el (mtime_ns, size) del archive.json del que sale: antes de
+servir /history/* se comparan con los ficheros actuales y se reindexan los días nuevos o
+editados a mano (y se quitan los que ya no tienen archive.json). Con
+`python -m api.services.history_index --rebuild` se reimporta todo.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from api.utils.paths import data_path, ensure_dir
+except ModuleNotFoundError:
+    from utils.paths import data_path, ensure_dir  # type: ignore
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    archived_at TEXT,
+    classic_wins INTEGER NOT NULL,
+    classic_total INTEGER NOT NULL,
+    parlay_wins INTEGER NOT NULL,
+    parlay_total INTEGER NOT NULL,
+    featured_outcome TEXT,
+    archive_mtime_ns INTEGER,
+    archive_size INTEGER
+);
+CREATE TABLE IF NOT EXISTS breakdown (
+    day TEXT NOT NULL,
+    section TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    market TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    pending INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (day, section, sport, market)
+);
+CREATE INDEX IF NOT EXISTS breakdown_section_day ON breakdown (section, day);
+"""
+
+_init_lock = threading.Lock()
+_initialized: set = set()
+
+
+def index_path() -> Path:
+    return data_path("history", "index.sqlite3")
+
+
+def _contracts_dir() -> Path:
+    return data_path("contracts")
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    path = index_path()
+    _ensure_schema(path)
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _ensure_schema(path: Path) -> None:
+    key = str(path)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key in _initialized:
+            return
+        ensure_dir(path.parent)
+        conn = sqlite3.connect(key, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # índice de otra versión: se recrea (los archive.json se importan en _sync_archives)
+                with conn:
+                    conn.execute("DROP TABLE IF EXISTS days")
+                    conn.execute("DROP TABLE IF EXISTS breakdown")
+            with conn:
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        finally:
+            conn.close()
+        _initialized.add(key)
+
+
+def _archive_stats() -> Dict[str, Tuple[int, int]]:
+    """{day: (mtime_ns, size)} de cada contracts/<day>/archive.json."""
+    base = _contracts_dir()
+    if not base.exists():
+        return {}
+    stats: Dict[str, Tuple[int, int]] = {}
+    for day_dir in sorted(base.iterdir()):
+        try:
+            st = (day_dir / "archive.json").stat()
+        except OSError:
+            continue
+        stats[day_dir.name] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+
+def _load_archive(day: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_contracts_dir() / day / "archive.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _sync_archives(conn: sqlite3.Connection) -> int:
+    """
+    Reindexa los días cuyo archive.json no coincide (mtime_ns, size) con lo indexado,
+    y borra los que ya no tienen archive.json. Devuelve nº de días reindexados.
+    """
+    stats = _archive_stats()
+    indexed = {
+        r[0]: (r[1], r[2])
+        for r in conn.execute("SELECT day, archive_mtime_ns, archive_size FROM days").fetchall()
+    }
+    n = 0
+    for day, sig in stats.items():
+        if indexed.get(day) == sig:
+            continue
+        archived = _load_archive(day)
+        if archived is not None:
+            _write_day(conn, day, archived, sig)
+            n += 1
+    gone = [(day,) for day in indexed if day not in stats]
+    if gone:
+        conn.executemany("DELETE FROM days WHERE day = ?", gone)
+        conn.executemany("DELETE FROM breakdown WHERE day = ?", gone)
+    return n
+
+
+def _one_or_multi(values: Iterable[Any]) -> str:
+    distinct = {str(v or "") for v in values}
+    return distinct.pop() if len(distinct) == 1 else "multi"
+
+
+def _summarize(archived: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[Tuple[str, str, str], List[int]]]:
+    """(fila de `days`, {(section, sport, market): [wins, losses, pending, total]})."""
+    breakdown: Dict[Tuple[str, str, str], List[int]] = {}
+
+    def count(section: str, sport: Any, market: Any, outcome: Any) -> None:
+        acc = breakdown.setdefault((section, str(sport or ""), str(market or "")), [0, 0, 0, 0])
+        if outcome == "WIN":
+            acc[0] += 1
+        elif outcome == "LOSE":
+            acc[1] += 1
+        else:
+            acc[2] += 1
+        acc[3] += 1
+
+    classic = [p for p in archived.get("picks_classic") or [] if isinstance(p, dict)]
+    for p in classic:
+        count("classic", p.get("sport"), p.get("market"), p.get("outcome"))
+
+    parlays = [p for p in archived.get("picks_parlay_premium") or [] if isinstance(p, dict)]
+    for p in parlays:
+        legs = [leg for leg in p.get("legs") or [] if isinstance(leg, dict)]
+        count("parlay_premium", _one_or_multi(l.get("sport") for l in legs), _one_or_multi(l.get("market") for l in legs), p.get("outcome"))
+
+    featured = archived.get("daily_featured_parlay")
+    featured_outcome = None
+    if isinstance(featured, dict):
+        legs = [leg for leg in featured.get("legs") or [] if isinstance(leg, dict)]
+        featured_outcome = featured.get("outcome")
+        count("featured", _one_or_multi(l.get("sport") for l in legs), _one_or_multi(l.get("market") for l in legs), featured_outcome)
+
+    row = {
+        "archived_at": archived.get("archived_at"),
+        "classic_wins": sum(1 for p in classic if p.get("outcome") == "WIN"),
+        "classic_total": len(classic),
+        "parlay_wins": sum(1 for p in parlays if p.get("outcome") == "WIN"),
+        "parlay_total": len(parlays),
+        "featured_outcome": featured_outcome,
+    }
+    return row, breakdown
+
+
+def _write_day(conn: sqlite3.Connection, day: str, archived: Dict[str, Any], sig: Optional[Tuple[int, int]] = None) -> None:
+    row, breakdown = _summarize(archived)
+    mtime_ns, size = sig if sig is not None else (None, None)
+    conn.execute(
+        "INSERT OR REPLACE INTO days (day, archived_at, classic_wins, classic_total, parlay_wins, parlay_total, featured_outcome, "
+        "archive_mtime_ns, archive_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (day, row["archived_at"], row["classic_wins"], row["classic_total"], row["parlay_wins"], row["parlay_total"], row["featured_outcome"],
+         mtime_ns, size),
+    )
+    conn.execute("DELETE FROM breakdown WHERE day = ?", (day,))
+    conn.executemany(
+        "INSERT INTO breakdown (day, section, sport, market, wins, losses, pending, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(day, section, sport, market, *counts) for (section, sport, market), counts in breakdown.items()],
+    )
+
+
+def index_day(day: str, archived: Dict[str, Any]) -> None:
+    """Upsert del resumen de un día (lo llama archive_day_bets, con el archive.json ya escrito)."""
+    try:
+        st = (_contracts_dir() / day / "archive.json").stat()
+        sig: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    with _connect() as conn:
+        _write_day(conn, day, archived, sig)
+
+
+def list_days(limit: int = 30, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """(días más recientes primero, total de días archivados)."""
+    with _connect() as conn:
+        _sync_archives(conn)
+        total = conn.execute("SELECT COUNT(*) FROM days").fetchone()[0]
+        rows = conn.execute(
+            "SELECT day, archived_at, classic_wins, classic_total, parlay_wins, parlay_total "
+            "FROM days ORDER BY day DESC LIMIT ? OFFSET ?",
+            (max(0, int(limit)), max(0, int(offset))),
+        ).fetchall()
+    return [dict(r) for r in rows], total
+
+
+def aggregate(start: Optional[str] = None, end: Optional[str] = None, group_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Totales de [start, end] (días YYYY-MM-DD, ambos incluidos) por sección y,
+    con group_by="sport"|"market", desglosados también por esa columna.
+    """
+    if group_by not in (None, "sport", "market"):
+        raise ValueError("group_by debe ser 'sport' o 'market'")
+    where = []
+    params: List[Any] = []
+    if start:
+        where.append("day >= ?")
+        params.append(start)
+    if end:
+        where.append("day <= ?")
+        params.append(end)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    cols = "section" + (f", {group_by}" if group_by else "")
+
+    with _connect() as conn:
+        _sync_archives(conn)
+        days = conn.execute(f"SELECT COUNT(*), MIN(day), MAX(day) FROM days {clause}", params).fetchone()
+        rows = conn.execute(
+            f"SELECT {cols}, SUM(wins) AS wins, SUM(losses) AS losses, SUM(pending) AS pending, SUM(total) AS total "
+            f"FROM breakdown {clause} GROUP BY {cols} ORDER BY {cols}",
+            params,
+        ).fetchall()
+
+    sections: Dict[str, Any] = {}
+    for r in rows:
+        stats = {k: r[k] for k in ("wins", "losses", "pending", "total")}
+        settled = stats["wins"] + stats["losses"]
+        stats["hit_rate"] = round(stats["wins"] / settled, 4) if settled else None
+        if group_by:
+            sec = sections.setdefault(r["section"], {"wins": 0, "losses": 0, "pending": 0, "total": 0, group_by: {}})
+            sec[group_by][r[group_by]] = stats
+            for k in ("wins", "losses", "pending", "total"):
+                sec[k] += stats[k]
+        else:
+            sections[r["section"]] = stats
+    if group_by:
+        for sec in sections.values():
+            settled = sec["wins"] + sec["losses"]
+            sec["hit_rate"] = round(sec["wins"] / settled, 4) if settled else None
+
+    return {
+        "start": start,
+        "end": end,
+        "days": days[0],
+        "first_day": days[1],
+        "last_day": days[2],
+        "sections": sections,
+    }
+
+
+def rebuild_index() -> int:
+    """Reimporta todos los archive.json (p.ej. si se editaron a mano). Devuelve nº de días."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM days")
+        conn.execute("DELETE FROM breakdown")
+        return _sync_archives(conn)
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Bets history index (SQLite)")
+    p.add_argument("--rebuild", action="store_true", help="Re-import every contracts/<day>/archive.json")
+    p.add_argument("--start", default=None)
+    p.add_argument("--end", default=None)
+    p.add_argument("--group-by", default=None, choices=["sport", "market"])
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.rebuild:
+        print(json.dumps({"indexed_days": rebuild_index()}))
+    print(json.dumps(aggregate(args.start, args.end, args.group_by), ensure_ascii=False, indent=2))
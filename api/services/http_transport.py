@@ -0,0 +1,164 @@
+"""
+DF_HTTP_TRANSPORT: transporte HTTP compartido para todos los clientes upstream.
+
+- Una requests.Session por host (keep-alive: la conexión TLS se reutiliza entre
+  llamadas y entre threads; el pool de urllib3 es thread-safe).
+- Política de retry/backoff común (5xx y errores de conexión), configurable por host
+  con configure_host() (p.ej. The Odds API: más reintentos y backoff más largo).
+  Los 429 NO se reintentan salvo opt-in por host (configure_host(..., retry_429=True),
+  respeta Retry-After): reintentar bloquea el thread del request y gasta cuota del
+  proveedor; por defecto el 429 llega al caller (y al ledger de cuota).
+- Timeout por defecto si el caller no pasa uno.
+- gzip: Accept-Encoding gzip por defecto (gzip=False pide identity).
+- Métricas por host: requests, errores, latencia media/máxima, último status.
+
+Uso:
+    from api.services.http_transport import http_get
+    r = http_get(url, params={...}, headers={...}, timeout=15)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = float(os.environ.get("HTTP_DEFAULT_TIMEOUT", "15"))
+DEFAULT_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+DEFAULT_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    retries: int = DEFAULT_RETRIES
+    backoff: float = DEFAULT_BACKOFF
+    pool_maxsize: int = POOL_MAXSIZE
+    retry_429: bool = False
+
+
+_POLICIES: Dict[str, HostPolicy] = {}
+_SESSIONS: Dict[str, requests.Session] = {}
+_METRICS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def configure_host(
+    base_url: str,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    pool_maxsize: Optional[int] = None,
+    retry_429: Optional[bool] = None,
+) -> None:
+    """Política propia para un host. Se aplica a la sesión en el próximo uso."""
+    host = _host(base_url)
+    cur = _POLICIES.get(host, HostPolicy())
+    policy = HostPolicy(
+        retries=cur.retries if retries is None else retries,
+        backoff=cur.backoff if backoff is None else backoff,
+        pool_maxsize=cur.pool_maxsize if pool_maxsize is None else pool_maxsize,
+        retry_429=cur.retry_429 if retry_429 is None else retry_429,
+    )
+    with _LOCK:
+        if _POLICIES.get(host) != policy:
+            _POLICIES[host] = policy
+            old = _SESSIONS.pop(host, None)
+            if old is not None:
+                old.close()
+
+
+def _new_session(policy: HostPolicy) -> requests.Session:
+    retry = Retry(
+        total=policy.retries,
+        backoff_factor=policy.backoff,
+        status_forcelist=RETRY_STATUSES + ((429,) if policy.retry_429 else ()),
+        allowed_methods=["GET", "HEAD"],
+        # urllib3 reintenta 413/429/503 con Retry-After aunque no estén en status_forcelist
+        respect_retry_after_header=policy.retry_429,
+        raise_on_status=False,  # se devuelve la última respuesta; el caller decide (raise_for_status)
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_maxsize, max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def session_for(url: str) -> requests.Session:
+    """Sesión keep-alive compartida del host de url."""
+    host = _host(url)
+    with _LOCK:
+        s = _SESSIONS.get(host)
+        if s is None:
+            s = _new_session(_POLICIES.get(host, HostPolicy()))
+            _SESSIONS[host] = s
+        return s
+
+
+def _record(host: str, elapsed_ms: float, status: Optional[int], error: Optional[str]) -> None:
+    with _LOCK:
+        m = _METRICS.get(host)
+        if m is None:
+            m = {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_status": None, "last_error": None}
+            _METRICS[host] = m
+        m["requests"] += 1
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+        if status is not None:
+            m["last_status"] = status
+        if error is not None or (status is not None and status >= 400):
+            m["errors"] += 1
+            m["last_error"] = error or f"HTTP {status}"
+
+
+def http_request(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    gzip: bool = True,
+    **kwargs: Any,
+) -> requests.Response:
+    """requests.request() sobre la sesión compartida del host. Misma semántica de errores que requests."""
+    hdrs = {"Accept-Encoding": "gzip, deflate" if gzip else "identity"}
+    if headers:
+        hdrs.update(headers)
+
+    host = _host(url)
+    t0 = time.perf_counter()
+    try:
+        resp = session_for(url).request(method, url, params=params, headers=hdrs, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    except Exception as err:
+        _record(host, (time.perf_counter() - t0) * 1000, None, f"{type(err).__name__}: {err}")
+        raise
+    _record(host, (time.perf_counter() - t0) * 1000, resp.status_code, None)
+    return resp
+
+
+def http_get(url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+    return http_request("GET", url, params=params, headers=headers, timeout=timeout, **kwargs)
+
+
+def transport_stats() -> Dict[str, Any]:
+    with _LOCK:
+        out: Dict[str, Any] = {}
+        for host, m in _METRICS.items():
+            row = dict(m)
+            row["avg_ms"] = round(m["total_ms"] / m["requests"], 1) if m["requests"] else 0.0
+            row["total_ms"] = round(m["total_ms"], 1)
+            row["max_ms"] = round(m["max_ms"], 1)
+            out[host] = row
+        return {"hosts": out, "sessions": sorted(_SESSIONS)}
@@ -1,8 +1,7 @@
 import json
 import os
 import statistics
-from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from api.utils.paths import data_path, ensure_dir
 
 
@@ -97,145 +96,297 @@ def _classify_market(market: str) -> Dict[str, str]:
     return {"marketType": "other", "marketRisk": "high"}
 
 
-def build_pools(day: str) -> Dict[str, Any]:
-    src = f"api/data/odds_premium/{day}/all.json"
-    if not os.path.exists(src):
-        raise FileNotFoundError(src)
+GroupKey = Tuple[str, str, str, str]
 
-    with open(src, "r") as f:
-        rows = json.load(f)
 
-    grouped: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = defaultdict(list)
-    for r in rows:
-        sport = _norm_str(r.get("sport"))
-        event_id = _norm_str(r.get("eventId"))
-        market = _norm_str(r.get("market"))
-        selection = _norm_str(r.get("selection"))
-        if not (sport and event_id and market and selection):
-            continue
-        grouped[(sport, event_id, market, selection)].append(r)
+def _group_key(r: Dict[str, Any]) -> Optional[GroupKey]:
+    sport = _norm_str(r.get("sport"))
+    event_id = _norm_str(r.get("eventId"))
+    market = _norm_str(r.get("market"))
+    selection = _norm_str(r.get("selection"))
+    if not (sport and event_id and market and selection):
+        return None
+    return (sport, event_id, market, selection)
 
-    inflated: List[Dict[str, Any]] = []
-    parlay_eligible: List[Dict[str, Any]] = []
 
-    for (sport, event_id, market, selection), items in grouped.items():
-        # odds list
-        odds_list: List[float] = []
-        for i in items:
-            try:
-                odds_list.append(float(i.get("odds")))
-            except Exception:
-                pass
-        odds_list.sort(reverse=True)
-        if len(odds_list) < 2:
-            continue
+class _GroupAcc:
+    """
+    DF_STREAMING_POOLS: estado de un grupo (sport, eventId, market, selection) mientras
+    se recorren sus filas. Solo guarda best/2nd, el item de la mejor cuota y las cuotas
+    (floats) para la mediana; no la lista de dicts del grupo.
+    """
+    __slots__ = ("key", "odds", "best", "second", "best_item", "best_item_odds")
 
-        # best/2nd/median
-        best = odds_list[0]
-        second = odds_list[1]
-        median = statistics.median(odds_list)
+    def __init__(self, key: GroupKey):
+        self.key = key
+        self.odds: List[float] = []
+        self.best = float("-inf")
+        self.second = float("-inf")
+        self.best_item: Optional[Dict[str, Any]] = None
+        self.best_item_odds = -1.0
 
-        # best item (para p_est asociado)
-        best_item = None
-        best_odds_seen = -1.0
-        for it in items:
-            try:
-                o = float(it.get("odds"))
-            except Exception:
-                continue
-            if o > best_odds_seen:
-                best_odds_seen = o
-                best_item = it
-        if not best_item:
-            continue
+    def add(self, item: Dict[str, Any]) -> None:
+        try:
+            o = float(item.get("odds"))
+        except Exception:
+            return
+        self.odds.append(o)
+        if o > self.best:
+            self.second = self.best
+            self.best = o
+        elif o > self.second:
+            self.second = o
+        # primer item con la cuota máxima (para p_est asociado)
+        if o > self.best_item_odds:
+            self.best_item_odds = o
+            self.best_item = item
 
-        p_est = _get_p_est(best_item)
-        if p_est is None:
-            continue
 
-        # Clasificación del market (para TODOS)
-        meta = _classify_market(market)
-        mrisk = meta["marketRisk"]
-        thr = THRESHOLDS.get(mrisk, THRESHOLDS["high"])
-
-        # Baseline para ser "parlay_eligible": datos suficientes + estabilidad mínima
-        # (esto es fallback: más amplio que inflated)
-        # Nota: NO exige edge > 0
-        if len(odds_list) >= max(4, int(thr["min_books"]) - 2) and second > 0 and median > 0:
-            parlay_eligible.append({
-                "sport": sport,
-                "eventId": event_id,
-                "market": market,
-                "selection": selection,
-                "odds": round(best, 2),
-                "probability": round(float(p_est), 4),
-                "edge": round(float(p_est - _p_implied(best)), 4),
-                "n_books": int(len(odds_list)),
-                "best_vs_2nd": round(float(best / second), 4) if second > 0 else None,
-                "best_vs_median": round(float(best / median), 4) if median > 0 else None,
-                "consensus": "high" if len(odds_list) >= 10 else ("medium" if len(odds_list) >= 7 else "low"),
-                "marketType": meta["marketType"],
-                "marketRisk": meta["marketRisk"],
-                "inflated": False,
-            })
-
-        # Regla de Inflada (más estricta) - contempla TODOS los markets
-        if best < ODDS_MIN:
-            continue
-        if len(odds_list) < int(thr["min_books"]):
-            continue
-        if second <= 0 or median <= 0:
-            continue
+class _UnsortedRows(Exception):
+    pass
 
-        best_vs_2nd = best / second
-        best_vs_median = best / median
 
-        if best_vs_2nd > float(thr["max_best_vs_2nd"]):
-            continue
-        if best_vs_median < float(thr["min_best_vs_median"]):
+def _iter_groups(rows: Iterable[Dict[str, Any]]) -> Iterator[_GroupAcc]:
+    """
+    Agrupa filas que llegan ordenadas por (sport, eventId, market, selection), como las
+    emite odds_normalization_multisport. Cada grupo se entrega en cuanto termina.
+    Si un grupo ya cerrado reaparece, el input no venía ordenado -> _UnsortedRows.
+    """
+    closed: set = set()
+    cur: Optional[_GroupAcc] = None
+    for r in rows:
+        key = _group_key(r)
+        if key is None:
             continue
-
-        edge = float(p_est) - _p_implied(best)
-        if edge <= 0:
+        if cur is None or key != cur.key:
+            if key in closed:
+                raise _UnsortedRows(key)
+            if cur is not None:
+                closed.add(cur.key)
+                yield cur
+            cur = _GroupAcc(key)
+        cur.add(r)
+    if cur is not None:
+        yield cur
+
+
+def _contiguous(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reordena (estable) para dejar cada grupo contiguo, en orden de primera aparición."""
+    first: Dict[GroupKey, int] = {}
+    keyed = []
+    for r in rows:
+        key = _group_key(r)
+        if key is None:
             continue
-
-        consensus = "high" if len(odds_list) >= (int(thr["min_books"]) + 2) else "medium"
-
-        inflated.append({
+        keyed.append((first.setdefault(key, len(first)), r))
+    keyed.sort(key=lambda x: x[0])
+    return [r for _, r in keyed]
+
+
+def _evaluate_group(g: _GroupAcc) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(fila parlay_eligible | None, fila inflated | None) de un grupo."""
+    sport, event_id, market, selection = g.key
+    n_books = len(g.odds)
+    if n_books < 2:
+        return None, None
+
+    # best/2nd/median
+    best = g.best
+    second = g.second
+    median = statistics.median(g.odds)
+
+    if not g.best_item:
+        return None, None
+
+    p_est = _get_p_est(g.best_item)
+    if p_est is None:
+        return None, None
+
+    # Clasificación del market (para TODOS)
+    meta = _classify_market(market)
+    mrisk = meta["marketRisk"]
+    thr = THRESHOLDS.get(mrisk, THRESHOLDS["high"])
+
+    eligible: Optional[Dict[str, Any]] = None
+
+    # Baseline para ser "parlay_eligible": datos suficientes + estabilidad mínima
+    # (esto es fallback: más amplio que inflated)
+    # Nota: NO exige edge > 0
+    if n_books >= max(4, int(thr["min_books"]) - 2) and second > 0 and median > 0:
+        eligible = {
             "sport": sport,
             "eventId": event_id,
             "market": market,
             "selection": selection,
             "odds": round(best, 2),
             "probability": round(float(p_est), 4),
-            "edge": round(float(edge), 4),
-
-            "n_books": int(len(odds_list)),
-            "best_vs_2nd": round(float(best_vs_2nd), 4),
-            "best_vs_median": round(float(best_vs_median), 4),
-
-            # 4 variables explícitas
-            "consensus": consensus,
+            "edge": round(float(p_est - _p_implied(best)), 4),
+            "n_books": int(n_books),
+            "best_vs_2nd": round(float(best / second), 4) if second > 0 else None,
+            "best_vs_median": round(float(best / median), 4) if median > 0 else None,
+            "consensus": "high" if n_books >= 10 else ("medium" if n_books >= 7 else "low"),
             "marketType": meta["marketType"],
             "marketRisk": meta["marketRisk"],
-            "inflated": True,
-        })
+            "inflated": False,
+        }
+
+    # Regla de Inflada (más estricta) - contempla TODOS los markets
+    if best < ODDS_MIN:
+        return eligible, None
+    if n_books < int(thr["min_books"]):
+        return eligible, None
+    if second <= 0 or median <= 0:
+        return eligible, None
+
+    best_vs_2nd = best / second
+    best_vs_median = best / median
+
+    if best_vs_2nd > float(thr["max_best_vs_2nd"]):
+        return eligible, None
+    if best_vs_median < float(thr["min_best_vs_median"]):
+        return eligible, None
+
+    edge = float(p_est) - _p_implied(best)
+    if edge <= 0:
+        return eligible, None
+
+    consensus = "high" if n_books >= (int(thr["min_books"]) + 2) else "medium"
+
+    return eligible, {
+        "sport": sport,
+        "eventId": event_id,
+        "market": market,
+        "selection": selection,
+        "odds": round(best, 2),
+        "probability": round(float(p_est), 4),
+        "edge": round(float(edge), 4),
+
+        "n_books": int(n_books),
+        "best_vs_2nd": round(float(best_vs_2nd), 4),
+        "best_vs_median": round(float(best_vs_median), 4),
+
+        # 4 variables explícitas
+        "consensus": consensus,
+        "marketType": meta["marketType"],
+        "marketRisk": meta["marketRisk"],
+        "inflated": True,
+    }
+
+
+def pool_groups(rows: List[Dict[str, Any]]) -> List[_GroupAcc]:
+    """Grupos (sport, eventId, market, selection) de rows; no dependen de THRESHOLDS/ODDS_MIN."""
+    return list(_iter_groups(_contiguous(rows)))
+
+
+def evaluate_pools(groups: Iterable[_GroupAcc]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(inflated, parlay_eligible) en memoria, mismas filas que escribe build_pools."""
+    inflated: List[Dict[str, Any]] = []
+    eligible: List[Dict[str, Any]] = []
+    for g in groups:
+        eligible_row, inflated_row = _evaluate_group(g)
+        if eligible_row is not None:
+            eligible.append(eligible_row)
+        if inflated_row is not None:
+            inflated.append(inflated_row)
+    return inflated, eligible
+
+
+def pool_events(rows: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+    """(sport, eventId) de los grupos de rows que entran en algún pool (inflated o parlay_eligible)."""
+    out: Set[Tuple[str, str]] = set()
+    for g in _iter_groups(_contiguous(rows)):
+        eligible_row, inflated_row = _evaluate_group(g)
+        if eligible_row is not None or inflated_row is not None:
+            out.add((g.key[0], g.key[1]))
+    return out
+
+
+class _JsonArrayWriter:
+    """
+    Escribe una lista JSON item a item (mismo texto que json.dump(lista, f, indent=2))
+    en un .tmp que solo reemplaza al fichero final si todo fue bien.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp = f"{path}.tmp"
+        self.count = 0
+        self.first: Optional[Dict[str, Any]] = None
+        self._f = None
+
+    def __enter__(self) -> "_JsonArrayWriter":
+        self._f = open(self.tmp, "w")
+        return self
+
+    def write(self, item: Dict[str, Any]) -> None:
+        body = json.dumps(item, indent=2).replace("\n", "\n  ")
+        self._f.write(("[\n  " if self.count == 0 else ",\n  ") + body)
+        if self.count == 0:
+            self.first = item
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._f.write("\n]" if self.count else "[]")
+        self._f.close()
+        if exc_type is None:
+            os.replace(self.tmp, self.path)
+        else:
+            try:
+                os.remove(self.tmp)
+            except OSError:
+                pass
+
+
+def _write_pools(out_dir: str, groups: Iterable[_GroupAcc]) -> Dict[str, Any]:
+    n_groups = 0
+    with _JsonArrayWriter(f"{out_dir}/inflated.json") as inflated, \
+            _JsonArrayWriter(f"{out_dir}/parlay_eligible.json") as parlay_eligible:
+        for g in groups:
+            n_groups += 1
+            eligible_row, inflated_row = _evaluate_group(g)
+            if eligible_row is not None:
+                parlay_eligible.write(eligible_row)
+            if inflated_row is not None:
+                inflated.write(inflated_row)
+    return {
+        "groups_total": n_groups,
+        "inflated_count": inflated.count,
+        "parlay_eligible_count": parlay_eligible.count,
+        "sample_inflated": inflated.first,
+    }
+
+
+def build_pools(day: str, rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    rows: odds premium ya en memoria (pipeline in-process). Si es None se lee
+    api/data/odds_premium/<day>/all.json.
+
+    Las filas llegan ordenadas por (sport, eventId, market, selection) desde la
+    normalización, así que los grupos se procesan en streaming y los pools se
+    escriben según se cierran. Si el input no viene ordenado se reagrupa antes.
+    """
+    src = f"api/data/odds_premium/{day}/all.json"
+    if rows is None:
+        if not os.path.exists(src):
+            raise FileNotFoundError(src)
+
+        with open(src, "r") as f:
+            rows = json.load(f)
+    else:
+        src = "memory"
 
     out_dir = str(ensure_dir(data_path("pools", day)))
     os.makedirs(out_dir, exist_ok=True)
 
-    with open(f"{out_dir}/inflated.json", "w") as f:
-        json.dump(inflated, f, indent=2)
-
-    with open(f"{out_dir}/parlay_eligible.json", "w") as f:
-        json.dump(parlay_eligible, f, indent=2)
+    try:
+        counts = _write_pools(out_dir, _iter_groups(rows))
+    except _UnsortedRows:
+        counts = _write_pools(out_dir, _iter_groups(_contiguous(rows)))
 
     return {
         "day": day,
-        "groups_total": len(grouped),
-        "inflated_count": len(inflated),
-        "parlay_eligible_count": len(parlay_eligible),
-        "sample_inflated": inflated[0] if inflated else None,
+        **counts,
         "src": src,
         "out_dir": out_dir,
     }
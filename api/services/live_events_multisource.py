@@ -6,10 +6,14 @@ Soporta:
 - Alternativas (NBA, NHL, Handball, Volleyball, AFL) - sin autenticación
 - SofaScore (Odds para TODOS los deportes) - sin autenticación, completamente gratis
 - Fallback a snapshots estáticos
+
+DF_LIVE_FANOUT: get_live_events_many() / get_live_events_for_sports() piden todos los
+deportes en paralelo (ver live_fanout.py): el tiempo total es el del proveedor más lento,
+con deadline global y resultados parciales si alguno no responde a tiempo.
 """
 
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime
 from pathlib import Path
 
@@ -17,10 +21,12 @@ try:
     from api.services.api_alternatives_client import AlternativeApisClient
     from api.services.api_espn_client import ESPNClient
     from api.services.api_sofascore_client import SofaScoreClient
+    from api.services.live_fanout import fanout
 except ModuleNotFoundError:
     from services.api_alternatives_client import AlternativeApisClient
     from services.api_espn_client import ESPNClient
     from services.api_sofascore_client import SofaScoreClient
+    from services.live_fanout import fanout
 
 
 class LiveEventsMultiSource:
@@ -69,6 +75,29 @@ class LiveEventsMultiSource:
         else:
             return LiveEventsMultiSource._get_from_snapshot(sport_lower, date)
     
+    @staticmethod
+    def get_live_events_many(sports: Iterable[str], date: str, deadline_secs: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        get_live_events() para varios deportes en paralelo.
+        Un deporte que no termina antes del deadline devuelve live_by_id vacío + error "timeout".
+        """
+        wanted = list(dict.fromkeys(s.lower() for s in sports if s))
+        res = fanout(
+            {s: (lambda sp=s: LiveEventsMultiSource.get_live_events(sp, date)) for s in wanted},
+            deadline_secs=deadline_secs,
+        )
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for s in wanted:
+            if s in res.results:
+                out[s] = res.results[s]
+                continue
+            source = LiveEventsMultiSource.SPORT_SOURCES.get(s, "snapshot")
+            err = "timeout" if s in res.timed_out else res.errors.get(s, "unknown")
+            print(f"[multisource] {s} failed: {err}")
+            out[s] = {"live_by_id": {}, "source": source, "error": err}
+        return out
+    
     @staticmethod
     def get_events_with_odds(sport: str, date: str) -> Dict[str, Any]:
         """
@@ -208,6 +237,42 @@ class LiveEventsMultiSource:
             }
 
 
+def _live_row(event_id: str, live: Dict[str, Any], fetched_at: str) -> Dict[str, Any]:
+    """Fila en el formato que consume live_score_update (liveScore/liveStatus/liveTime)."""
+    live = live if isinstance(live, dict) else {}
+    home, away = live.get("homeScore"), live.get("awayScore")
+    return {
+        "eventId": event_id,
+        "liveScore": f"{home}-{away}" if home is not None and away is not None else None,
+        "liveStatus": live.get("statusShort"),
+        "liveTime": live.get("timer"),
+        "timestamp": fetched_at,
+        "live": live,
+    }
+
+
+def get_live_events_for_sports(
+    ids_by_sport: Dict[str, List[Any]],
+    date: Optional[str] = None,
+    deadline_secs: Optional[float] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """{sport: [eventIds]} -> {sport: [filas live de esos eventIds]}, todos los deportes en paralelo."""
+    date = date or datetime.utcnow().date().isoformat()
+    fetched_at = datetime.utcnow().isoformat()
+    results = LiveEventsMultiSource.get_live_events_many(ids_by_sport.keys(), date, deadline_secs=deadline_secs)
+
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for sport, event_ids in ids_by_sport.items():
+        live_by_id = (results.get(sport.lower()) or {}).get("live_by_id") or {}
+        wanted = {str(e) for e in event_ids}
+        out[sport] = [_live_row(eid, live, fetched_at) for eid, live in live_by_id.items() if str(eid) in wanted]
+    return out
+
+
+def get_live_events_for_sport(sport: str, event_ids: List[Any], date: Optional[str] = None) -> List[Dict[str, Any]]:
+    return get_live_events_for_sports({sport: event_ids}, date).get(sport, [])
+
+
 def test_multisource():
     """Test the multisource aggregator"""
     from datetime import datetime
@@ -0,0 +1,137 @@
+"""
+DF_LIVE_FANOUT: fan-out concurrente (pool de threads acotado) para las APIs live.
+
+- fanout(calls): ejecuta {key: fn} en paralelo con un deadline global. Devuelve lo que
+  haya terminado a tiempo (resultados parciales) + errores + keys que no llegaron.
+- provider_slot(provider): límite de concurrencia por proveedor (ESPN, balldontlie,
+  NHL Stats, OpenLigaDB, Squiggle, SofaScore). Se toma alrededor de cada request HTTP,
+  no de la tarea, para que un fan-out anidado (p.ej. ligas de rugby dentro de un
+  fan-out por deporte) no se bloquee a sí mismo. La espera por el slot está acotada por
+  el deadline del fanout() en curso: si vence, ProviderBusy (los clientes lo tratan
+  igual que un fallo del proveedor: lista vacía).
+
+Cada llamada a fanout() usa su propio executor y no espera a las tareas lentas
+(shutdown(wait=False)): terminan solas cuando vence el timeout del request HTTP.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional
+
+FANOUT_MAX_WORKERS = int(os.environ.get("LIVE_FANOUT_WORKERS", "8"))
+FANOUT_DEADLINE_SECS = float(os.environ.get("LIVE_FANOUT_DEADLINE_SECS", "20"))
+DEFAULT_PROVIDER_LIMIT = int(os.environ.get("LIVE_PROVIDER_CONCURRENCY", "4"))
+
+# requests simultáneos por proveedor (APIs públicas sin auth: ser conservadores)
+PROVIDER_LIMITS = {
+    "espn": 4,
+    "balldontlie": 2,
+    "nhl-stats": 2,
+    "openligadb": 2,
+    "squiggle": 1,
+    "sofascore": 2,
+}
+
+_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_SLOTS_LOCK = threading.Lock()
+
+# deadline absoluto (time.monotonic) del fanout() que ejecuta la tarea del thread actual
+_CTX = threading.local()
+
+
+class ProviderBusy(RuntimeError):
+    """No se consiguió slot del proveedor antes del deadline del fan-out."""
+
+
+def _slot(provider: str) -> threading.BoundedSemaphore:
+    with _SLOTS_LOCK:
+        sem = _SLOTS.get(provider)
+        if sem is None:
+            sem = threading.BoundedSemaphore(max(1, PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMIT)))
+            _SLOTS[provider] = sem
+        return sem
+
+
+def _current_deadline() -> Optional[float]:
+    return getattr(_CTX, "deadline", None)
+
+
+@contextmanager
+def provider_slot(provider: str) -> Iterator[None]:
+    sem = _slot(provider)
+    deadline = _current_deadline()
+    # fuera de un fanout() (llamada directa) se espera como mucho FANOUT_DEADLINE_SECS
+    timeout = FANOUT_DEADLINE_SECS if deadline is None else deadline - time.monotonic()
+    if timeout <= 0 or not sem.acquire(timeout=timeout):
+        raise ProviderBusy(f"{provider}: no slot before fan-out deadline")
+    try:
+        yield
+    finally:
+        sem.release()
+
+
+@dataclass
+class FanoutResult:
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    errors: Dict[Hashable, str] = field(default_factory=dict)
+    timed_out: List[Hashable] = field(default_factory=list)
+    elapsed_ms: int = 0
+
+
+def fanout(
+    calls: Mapping[Hashable, Callable[[], Any]],
+    deadline_secs: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> FanoutResult:
+    """Ejecuta calls en paralelo. Nunca lanza: los fallos quedan en errors/timed_out."""
+    out = FanoutResult()
+    if not calls:
+        return out
+
+    t0 = time.monotonic()
+    deadline = FANOUT_DEADLINE_SECS if deadline_secs is None else deadline_secs
+    workers = max(1, min(len(calls), max_workers or FANOUT_MAX_WORKERS))
+
+    # un fanout anidado no puede durar más que el que lo contiene
+    abs_deadline = t0 + deadline
+    outer = _current_deadline()
+    if outer is not None:
+        abs_deadline = min(abs_deadline, outer)
+
+    def _run(fn: Callable[[], Any]) -> Any:
+        _CTX.deadline = abs_deadline
+        try:
+            return fn()
+        finally:
+            _CTX.deadline = None
+
+    ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="live-fanout")
+    try:
+        futures = {ex.submit(_run, fn): key for key, fn in calls.items()}
+        pending = set(futures)
+        while pending:
+            remaining = abs_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_EXCEPTION)
+            for fut in done:
+                key = futures[fut]
+                err = fut.exception()
+                if err is not None:
+                    out.errors[key] = str(err)
+                else:
+                    out.results[key] = fut.result()
+
+        for fut in pending:
+            fut.cancel()
+            out.timed_out.append(futures[fut])
+    finally:
+        ex.shutdown(wait=False)
+
+    out.elapsed_ms = int((time.monotonic() - t0) * 1000)
+    return out
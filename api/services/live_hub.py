@@ -0,0 +1,132 @@
+"""
+DF_LIVE_HUB: broadcast in-process de deltas live (sport, eventId) hacia los clientes SSE.
+
+El refresher del scheduler (hilo) publica una vez cada cambio de marcador/estado; cada
+cliente conectado a /live/stream tiene una Subscription en el event loop de la app con
+las claves (sport, eventId) de su contrato.
+
+Backpressure: la cola de cada suscripción está coalescida por clave (solo se guarda el
+último estado de cada evento), así que un cliente lento nunca acumula más de una entrada
+por evento; por encima de LIVE_HUB_QUEUE_MAX se descartan las más antiguas y el cliente
+recibe un aviso "resync" para recargar /bets/today.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+LIVE_HUB_QUEUE_MAX = int(os.environ.get("LIVE_HUB_QUEUE_MAX", "256"))
+
+EventKey = Tuple[str, str]  # (sport, eventId)
+
+
+def event_key(sport: Any, event_id: Any) -> EventKey:
+    return (str(sport or "").strip().lower(), str(event_id).strip())
+
+
+class Subscription:
+    def __init__(self, day: str, keys: Optional[Set[EventKey]], loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.day = day
+        self.keys = keys  # None = todos los eventos del día
+        self.loop = loop
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: Dict[EventKey, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def wants(self, day: str, key: EventKey) -> bool:
+        return day == self.day and (self.keys is None or key in self.keys)
+
+    def _offer(self, key: EventKey, delta: Dict[str, Any]) -> None:
+        # corre en el event loop (call_soon_threadsafe): sin locks
+        self._pending.pop(key, None)
+        self._pending[key] = delta
+        while len(self._pending) > max(1, self.max_pending):
+            self._pending.pop(next(iter(self._pending)))
+            self.dropped += 1
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> Tuple[List[Dict[str, Any]], int]:
+        """(deltas pendientes, nº descartados desde el último batch); ([], 0) si vence timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return [], 0
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        dropped, self.dropped = self.dropped, 0
+        return batch, dropped
+
+
+class LiveHub:
+    def __init__(self, max_pending: int = LIVE_HUB_QUEUE_MAX):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subs: Set[Subscription] = set()
+        # último delta por (day, sport, eventId): snapshot inicial de cada cliente nuevo
+        self._last: Dict[str, Dict[EventKey, Dict[str, Any]]] = {}
+        self._stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, day: str, keys: Optional[Iterable[EventKey]] = None) -> Subscription:
+        """Llamar desde el event loop (handler async)."""
+        sub = Subscription(day, set(keys) if keys is not None else None, asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    def snapshot(self, day: str, keys: Optional[Set[EventKey]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            last = dict(self._last.get(day) or {})
+        return [d for k, d in last.items() if keys is None or k in keys]
+
+    def publish(self, day: str, deltas: Iterable[Dict[str, Any]]) -> int:
+        """
+        Thread-safe (lo llama el refresher del scheduler). Cada delta lleva sport y eventId.
+        Devuelve nº de entregas encoladas.
+        """
+        deltas = [d for d in deltas if isinstance(d, dict) and d.get("sport") and d.get("eventId") is not None]
+        if not deltas:
+            return 0
+        with self._lock:
+            last = self._last.setdefault(day, {})
+            # solo el ciclo actual y el anterior
+            while len(self._last) > 2:
+                self._last.pop(min(self._last))
+            for d in deltas:
+                last[event_key(d["sport"], d["eventId"])] = d
+            subs = list(self._subs)
+            self._stats["published"] += len(deltas)
+
+        delivered = 0
+        for sub in subs:
+            for d in deltas:
+                key = event_key(d["sport"], d["eventId"])
+                if not sub.wants(day, key):
+                    continue
+                try:
+                    sub.loop.call_soon_threadsafe(sub._offer, key, d)
+                except RuntimeError:
+                    # loop cerrado (cliente/servidor apagándose)
+                    self.unsubscribe(sub)
+                    break
+                delivered += 1
+        with self._lock:
+            self._stats["delivered"] += delivered
+        return delivered
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["subscribers"] = len(self._subs)
+            out["days"] = {day: len(v) for day, v in self._last.items()}
+        return out
+
+
+LIVE_HUB = LiveHub()
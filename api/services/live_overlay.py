@@ -0,0 +1,283 @@
+"""
+DF_LIVE_OVERLAY: estado live de los picks del día, separado del contrato congelado.
+
+El refresh de live scores (cada 10 min, hilo del scheduler) ya no reescribe
+contracts/<day>/contract.json: guarda {(sport, eventId): liveScore/liveStatus/liveTime/lastUpdate}
+en memoria y lo refleja en un sidecar pequeño (contracts/<day>/live_overlay.json, tmp + os.replace)
+solo cuando algún marcador cambia. /bets/today lo mezcla al leer, sobre la copia en memoria
+del contrato, usando un índice (sport, eventId) -> rutas de picks/legs precalculado por
+firma del contrato. Un lector nunca ve un fichero a medio escribir.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from api.services.response_cache import file_signature
+    from api.utils.paths import data_path, ensure_dir
+except ModuleNotFoundError:
+    from services.response_cache import file_signature  # type: ignore
+    from utils.paths import data_path, ensure_dir  # type: ignore
+
+LIVE_FIELDS = ("liveScore", "liveStatus", "liveTime")
+INDEX_CACHE_MAX = int(os.environ.get("LIVE_OVERLAY_INDEX_CACHE_MAX", "8"))
+
+OverlayKey = Tuple[str, str]  # (sport, eventId)
+PickPath = Tuple[Any, ...]  # ("picks_parlay_premium", 2, "legs", 0)
+
+
+def overlay_path(day: str) -> Path:
+    return data_path("contracts", day, "live_overlay.json")
+
+
+def _key(sport: Any, event_id: Any) -> OverlayKey:
+    return (str(sport or "").lower(), str(event_id))
+
+
+# ---------------------------------------------------------------------------
+# Índice (sport, eventId) -> rutas de picks dentro del contrato
+# ---------------------------------------------------------------------------
+
+def _legs(parlay: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    legs = parlay.get("legs")
+    if isinstance(legs, list):
+        return "legs", legs
+    picks = parlay.get("picks")
+    return "picks", picks if isinstance(picks, list) else []
+
+
+def iter_pick_paths(contract: Dict[str, Any]) -> Iterator[Tuple[PickPath, Dict[str, Any]]]:
+    """(ruta, pick) de cada pick simple y de cada leg de parlay del contrato."""
+    for section in ("picks_classic", "picks_value"):
+        items = contract.get(section)
+        if not isinstance(items, list):
+            continue
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                yield (section, i), item
+            elif isinstance(item, list):
+                for j, pick in enumerate(item):
+                    if isinstance(pick, dict):
+                        yield (section, i, j), pick
+
+    parlays = contract.get("picks_parlay_premium")
+    if isinstance(parlays, list):
+        for i, parlay in enumerate(parlays):
+            if not isinstance(parlay, dict):
+                continue
+            name, legs = _legs(parlay)
+            for j, leg in enumerate(legs):
+                if isinstance(leg, dict):
+                    yield ("picks_parlay_premium", i, name, j), leg
+
+    featured = contract.get("daily_featured_parlay")
+    if isinstance(featured, dict):
+        name, legs = _legs(featured)
+        for j, leg in enumerate(legs):
+            if isinstance(leg, dict):
+                yield ("daily_featured_parlay", name, j), leg
+
+
+def build_pick_index(contract: Dict[str, Any]) -> Dict[OverlayKey, List[PickPath]]:
+    index: Dict[OverlayKey, List[PickPath]] = {}
+    for path, pick in iter_pick_paths(contract):
+        sport = pick.get("sport")
+        event_id = pick.get("eventId")
+        if not sport or event_id is None:
+            continue
+        index.setdefault(_key(sport, event_id), []).append(path)
+    return index
+
+
+def _resolve(contract: Dict[str, Any], path: PickPath) -> Optional[Dict[str, Any]]:
+    node: Any = contract
+    for part in path:
+        try:
+            node = node[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return node if isinstance(node, dict) else None
+
+
+_index_lock = threading.Lock()
+_index_cache: Dict[Tuple[str, Any], Dict[OverlayKey, List[PickPath]]] = {}
+
+
+def pick_index_for(day: str, contract: Dict[str, Any], contract_sig: Any = None) -> Dict[OverlayKey, List[PickPath]]:
+    """
+    Índice del contrato del día, cacheado por firma (mtime_ns, size) de contract.json.
+    Sin firma (contrato fallback construido en memoria) se calcula sin cachear.
+    """
+    if contract_sig is None:
+        return build_pick_index(contract)
+    key = (day, contract_sig)
+    with _index_lock:
+        cached = _index_cache.get(key)
+    if cached is not None:
+        return cached
+    index = build_pick_index(contract)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > max(1, INDEX_CACHE_MAX):
+            _index_cache.pop(next(iter(_index_cache)))
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Overlay por día (memoria + sidecar)
+# ---------------------------------------------------------------------------
+
+class LiveOverlay:
+    def __init__(self, day: str, path: Optional[Path] = None):
+        self.day = day
+        self.path = path or overlay_path(day)
+        self._lock = threading.Lock()
+        self._entries: Dict[OverlayKey, Dict[str, Any]] = {}
+        self._sig: Any = None
+        self._loaded = False
+
+    def _load_locked(self) -> None:
+        # recarga si otro proceso (pipeline/CLI) reescribió el sidecar
+        sig = file_signature(self.path)
+        if self._loaded and sig == self._sig:
+            return
+        entries: Dict[OverlayKey, Dict[str, Any]] = {}
+        if sig is not None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            for sport, events in (data.get("events") or {}).items():
+                if isinstance(events, dict):
+                    for event_id, state in events.items():
+                        if isinstance(state, dict):
+                            entries[_key(sport, event_id)] = state
+        self._entries = entries
+        self._sig = sig
+        self._loaded = True
+
+    def _save_locked(self) -> None:
+        events: Dict[str, Dict[str, Any]] = {}
+        for (sport, event_id), state in sorted(self._entries.items()):
+            events.setdefault(sport, {})[event_id] = state
+        ensure_dir(self.path.parent)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"day": self.day, "events": events}, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._sig = file_signature(self.path)
+
+    def update(self, sport: str, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Mezcla filas de live_events_multisource ({eventId, liveScore, liveStatus, liveTime, timestamp}).
+        Solo persiste los eventos cuyo marcador/estado cambió; lastUpdate es el
+        timestamp del último cambio. Devuelve las filas que cambiaron.
+        """
+        changed: List[Dict[str, Any]] = []
+        with self._lock:
+            self._load_locked()
+            for row in rows:
+                if not isinstance(row, dict) or row.get("eventId") in (None, ""):
+                    continue
+                key = _key(sport, row.get("eventId"))
+                state = {f: row.get(f) for f in LIVE_FIELDS}
+                prev = self._entries.get(key)
+                if prev is not None and all(prev.get(f) == state[f] for f in LIVE_FIELDS):
+                    continue
+                state["lastUpdate"] = row.get("timestamp")
+                self._entries[key] = state
+                changed.append(row)
+            if changed:
+                self._save_locked()
+        return changed
+
+    def snapshot(self) -> Dict[OverlayKey, Dict[str, Any]]:
+        with self._lock:
+            self._load_locked()
+            return dict(self._entries)
+
+    def signature(self) -> Any:
+        """Versión del overlay para la cache de /bets/today (firma del sidecar)."""
+        return file_signature(self.path)
+
+
+_overlays_lock = threading.Lock()
+_overlays: Dict[str, LiveOverlay] = {}
+
+
+def get_overlay(day: str) -> LiveOverlay:
+    with _overlays_lock:
+        overlay = _overlays.get(day)
+        if overlay is None:
+            overlay = _overlays[day] = LiveOverlay(day)
+            # solo se mantienen los días recientes (el ciclo actual y el anterior)
+            while len(_overlays) > 2:
+                _overlays.pop(min(_overlays))
+        return overlay
+
+
+def overlay_signature(day: str) -> Any:
+    return file_signature(overlay_path(day))
+
+
+def _score_part(value: str) -> Any:
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
+def pick_live(pick: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Estado live de un pick en el formato de display.live (statusShort/homeScore/awayScore).
+    Con el overlay aplicado (apply_overlay) manda liveStatus/liveScore del pick; si no,
+    display.live del snapshot congelado.
+    """
+    disp = pick.get("display")
+    live = disp.get("live") if isinstance(disp, dict) else None
+    status = pick.get("liveStatus")
+    if not status:
+        return live if isinstance(live, dict) else None
+    home = away = None
+    score = pick.get("liveScore")
+    if isinstance(score, str) and "-" in score:
+        h, a = score.split("-", 1)
+        home, away = _score_part(h), _score_part(a)
+    # el resto de campos del snapshot solo valen si describen el mismo estado
+    same = isinstance(live, dict) and str(live.get("statusShort") or "").upper() == str(status).upper()
+    out = dict(live) if same else {}
+    out.update({"statusShort": status, "homeScore": home, "awayScore": away})
+    if pick.get("liveTime") is not None:
+        out["timer"] = pick.get("liveTime")
+    return out
+
+
+def apply_overlay(contract: Dict[str, Any], day: str, contract_sig: Any = None) -> int:
+    """
+    Copia el estado live sobre los picks/legs del contrato (en memoria; el contrato en disco
+    no se toca). Devuelve nº de picks actualizados.
+    """
+    entries = get_overlay(day).snapshot()
+    if not entries:
+        return 0
+    index = pick_index_for(day, contract, contract_sig)
+    applied = 0
+    for key, paths in index.items():
+        state = entries.get(key)
+        if state is None:
+            continue
+        for path in paths:
+            pick = _resolve(contract, path)
+            # la ruta viene de un índice cacheado: comprobar que sigue apuntando al mismo evento
+            if pick is None or _key(pick.get("sport"), pick.get("eventId")) != key:
+                continue
+            pick.update(state)
+            applied += 1
+    return applied
@@ -0,0 +1,185 @@
+"""
+DF_LIVE_SCHEDULE: plan del refresh de live scores a partir del calendario del día.
+
+En vez de despertar cada 10 min pase lo que pase, el scheduler construye una línea de
+tiempo de kickoffs (startTime del índice de display, o del propio pick) para los eventos
+con picks del contrato y decide:
+
+- qué pedir: solo los deportes/eventos en juego (kickoff <= ahora < kickoff + duración
+  típica + margen) que todavía no reportan un estado final (FT/AET/PEN...);
+- cuándo despertar: LIVE_POLL_FAST_SECS cerca del kickoff y del final típico,
+  LIVE_POLL_SLOW_SECS durante el resto del partido, y si no hay nada en juego,
+  justo antes del próximo kickoff (con LIVE_IDLE_MAX_SECS como tope).
+
+Los eventos sin kickoff resoluble (día sin snapshot de events, p.ej.) no se descartan:
+se consultan a LIVE_POLL_SLOW_SECS hasta que reportan un estado final.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from api.services.display_enrichment import build_display_index
+    from api.services.live_overlay import get_overlay, iter_pick_paths
+except ModuleNotFoundError:
+    from services.display_enrichment import build_display_index  # type: ignore
+    from services.live_overlay import get_overlay, iter_pick_paths  # type: ignore
+
+LIVE_POLL_FAST_SECS = int(os.environ.get("LIVE_POLL_FAST_SECS", "60"))
+LIVE_POLL_SLOW_SECS = int(os.environ.get("LIVE_POLL_SLOW_SECS", "180"))
+LIVE_IDLE_MAX_SECS = int(os.environ.get("LIVE_IDLE_MAX_SECS", "3600"))
+# margen antes del kickoff para la primera consulta
+LIVE_PRE_KICKOFF_SECS = int(os.environ.get("LIVE_PRE_KICKOFF_SECS", "120"))
+# ventanas de polling rápido alrededor del kickoff y del final típico
+LIVE_KICKOFF_WINDOW_MIN = int(os.environ.get("LIVE_KICKOFF_WINDOW_MIN", "15"))
+LIVE_FULLTIME_WINDOW_MIN = int(os.environ.get("LIVE_FULLTIME_WINDOW_MIN", "20"))
+# si pasado el final típico + este margen no llega estado final, se deja de consultar
+LIVE_OVERTIME_GRACE_MIN = int(os.environ.get("LIVE_OVERTIME_GRACE_MIN", "60"))
+
+# duración típica (min) desde el kickoff hasta el final, descansos incluidos
+SPORT_DURATION_MIN: Dict[str, int] = {
+    "football": 115,
+    "basketball": 150,
+    "nba": 150,
+    "nfl": 200,
+    "hockey": 160,
+    "handball": 95,
+    "volleyball": 120,
+    "rugby": 105,
+    "baseball": 190,
+    "afl": 150,
+    "tennis": 150,
+}
+DEFAULT_DURATION_MIN = 150
+
+# estados en los que el evento ya no va a cambiar (finales, cancelados, aplazados)
+FINAL_STATUSES = {"FT", "AET", "PEN", "AOT", "AP", "FINAL", "CANC", "PST", "ABD", "AWD", "WO"}
+
+
+def is_final_status(status: Any) -> bool:
+    return str(status or "").upper() in FINAL_STATUSES
+
+
+def parse_start_time(value: Any) -> Optional[datetime]:
+    """startTime ISO (con Z u offset) o epoch en segundos -> datetime UTC."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class TimelineEvent:
+    sport: str
+    event_id: str
+    kickoff: datetime
+
+    @property
+    def expected_end(self) -> datetime:
+        return self.kickoff + timedelta(minutes=SPORT_DURATION_MIN.get(self.sport, DEFAULT_DURATION_MIN))
+
+
+@dataclass
+class LivePlan:
+    poll: Dict[str, List[str]] = field(default_factory=dict)
+    next_wakeup_secs: float = LIVE_IDLE_MAX_SECS
+    reason: str = "idle"
+
+
+def build_timeline(
+    day: str, contract: Dict[str, Any]
+) -> Tuple[List[TimelineEvent], Set[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    (eventos con kickoff ordenados por hora, eventos ya finalizados según los snapshots,
+    eventos sin startTime resoluble). El kickoff sale del índice de display, del
+    display congelado en el pick o del propio pick.
+    """
+    display = build_display_index(day)
+    kickoffs: Dict[Tuple[str, str], Optional[datetime]] = {}
+    finished: Set[Tuple[str, str]] = set()
+    for _path, pick in iter_pick_paths(contract):
+        sport = str(pick.get("sport") or "").lower()
+        event_id = pick.get("eventId")
+        if not sport or event_id is None:
+            continue
+        key = (sport, str(event_id))
+        if kickoffs.get(key) is not None:
+            continue
+        disp = display.get(key)
+        disp = disp if isinstance(disp, dict) else {}
+        pick_disp = pick.get("display") if isinstance(pick.get("display"), dict) else {}
+        kickoffs[key] = (
+            parse_start_time(disp.get("startTime"))
+            or parse_start_time(pick_disp.get("startTime"))
+            or parse_start_time(pick.get("startTime"))
+        )
+        live = disp.get("live")
+        if isinstance(live, dict) and is_final_status(live.get("statusShort")):
+            finished.add(key)
+
+    timeline = [TimelineEvent(sport, eid, ko) for (sport, eid), ko in kickoffs.items() if ko is not None]
+    timeline.sort(key=lambda e: (e.kickoff, e.sport, e.event_id))
+    unresolved = sorted(key for key, ko in kickoffs.items() if ko is None)
+    return timeline, finished, unresolved
+
+
+def plan_refresh(
+    timeline: List[TimelineEvent],
+    finished: Set[Tuple[str, str]],
+    now: Optional[datetime] = None,
+    unresolved: Optional[List[Tuple[str, str]]] = None,
+) -> LivePlan:
+    """
+    Qué eventos consultar ahora y cuántos segundos dormir hasta la próxima consulta.
+    unresolved: eventos sin kickoff conocido; se consultan siempre (ritmo lento) salvo finalizados.
+    """
+    now = now or datetime.now(timezone.utc)
+    kickoff_window = timedelta(minutes=LIVE_KICKOFF_WINDOW_MIN)
+    fulltime_window = timedelta(minutes=LIVE_FULLTIME_WINDOW_MIN)
+    grace = timedelta(minutes=LIVE_OVERTIME_GRACE_MIN)
+    lead = timedelta(seconds=LIVE_PRE_KICKOFF_SECS)
+
+    poll: Dict[str, List[str]] = {}
+    near_edge = False
+    next_kickoff: Optional[datetime] = None
+    for ev in timeline:
+        if (ev.sport, ev.event_id) in finished:
+            continue
+        if now < ev.kickoff - lead:
+            next_kickoff = ev.kickoff - lead if next_kickoff is None else min(next_kickoff, ev.kickoff - lead)
+            continue
+        if now >= ev.expected_end + grace:
+            continue
+        poll.setdefault(ev.sport, []).append(ev.event_id)
+        if abs(now - ev.kickoff) <= kickoff_window or abs(now - ev.expected_end) <= fulltime_window:
+            near_edge = True
+    for sport, event_id in unresolved or ():
+        if (sport, event_id) not in finished and event_id not in poll.get(sport, []):
+            poll.setdefault(sport, []).append(event_id)
+
+    until_kickoff = (next_kickoff - now).total_seconds() if next_kickoff is not None else None
+    if poll:
+        interval = float(LIVE_POLL_FAST_SECS if near_edge else LIVE_POLL_SLOW_SECS)
+        if until_kickoff is not None:
+            interval = min(interval, until_kickoff)
+        return LivePlan(poll=poll, next_wakeup_secs=max(1.0, interval), reason="fast" if near_edge else "live")
+    if until_kickoff is not None:
+        return LivePlan(next_wakeup_secs=max(1.0, min(until_kickoff, LIVE_IDLE_MAX_SECS)), reason="next_kickoff")
+    return LivePlan(next_wakeup_secs=float(LIVE_IDLE_MAX_SECS), reason="idle")
+
+
+def plan_live_refresh(day: str, contract: Dict[str, Any], now: Optional[datetime] = None) -> LivePlan:
+    """Plan del día: la línea de tiempo + los finales ya vistos en el overlay live."""
+    timeline, finished, unresolved = build_timeline(day, contract)
+    for (sport, event_id), state in get_overlay(day).snapshot().items():
+        if is_final_status(state.get("liveStatus")):
+            finished.add((sport, event_id))
+    return plan_refresh(timeline, finished, now=now, unresolved=unresolved)
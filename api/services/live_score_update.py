@@ -1,7 +1,7 @@
 """
 Live Score Update Service
-Updates existing contracts with live scores from alternative APIs (ESPN, etc)
-Called every 10 minutes to keep scores fresh without regenerating picks
+Updates the live overlay of existing contracts with live scores from alternative APIs (ESPN, etc)
+Called every 10 minutes to keep scores fresh without regenerating picks or rewriting the contract
 """
 
 import json
@@ -13,24 +13,40 @@ from datetime import date as date_type
 logger = logging.getLogger(__name__)
 
 try:
-    from services.live_events_multisource import get_live_events_for_sport
+    from services.live_events_multisource import get_live_events_for_sports
 except ImportError:
-    from api.services.live_events_multisource import get_live_events_for_sport
+    from api.services.live_events_multisource import get_live_events_for_sports
+
+try:
+    from services.response_cache import invalidate_bets_today
+except ImportError:
+    from api.services.response_cache import invalidate_bets_today
+
+try:
+    from services.live_overlay import build_pick_index, get_overlay
+except ImportError:
+    from api.services.live_overlay import build_pick_index, get_overlay
+
+try:
+    from services.live_hub import LIVE_HUB
+except ImportError:
+    from api.services.live_hub import LIVE_HUB
 
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 API_DATA_DIR = REPO_ROOT / "api" / "data"
 
 
-def update_contract_with_live_scores(day: str) -> Dict[str, Any]:
+def update_contract_with_live_scores(day: str, event_ids_by_sport: Optional[Dict[str, List[Any]]] = None) -> Dict[str, Any]:
     """
-    Update existing contract with live scores
-    
-    1. Load contract from disk
-    2. For each pick, fetch live score from alternative APIs
-    3. Update contract with live data
-    4. Save back to disk
-    
+    Update the live overlay of the day's contract with live scores
+
+    1. Load contract from disk (read-only; the frozen contract is never rewritten)
+    2. Fetch live scores for its picks/legs from alternative APIs
+    3. DF_LIVE_OVERLAY: store changed scores in the overlay (memory + live_overlay.json sidecar)
+
+    /bets/today merges the overlay at read time.
+    event_ids_by_sport: DF_LIVE_SCHEDULE subset (only sports/events in play); None = every pick.
     Returns summary of updates
     """
     contract_file = API_DATA_DIR / "contracts" / day / "contract.json"
@@ -47,53 +63,49 @@ def update_contract_with_live_scores(day: str) -> Dict[str, Any]:
     
     # Recolectar todos los IDs por deporte
     picks_by_sport = _group_picks_by_sport(contract)
+    if event_ids_by_sport is not None:
+        wanted = {(str(s).lower(), str(e)) for s, ids in event_ids_by_sport.items() for e in ids}
+        picks_by_sport = {
+            sport: [e for e in ids if (sport, str(e)) in wanted]
+            for sport, ids in picks_by_sport.items()
+        }
+        picks_by_sport = {sport: ids for sport, ids in picks_by_sport.items() if ids}
+        if not picks_by_sport:
+            return {"status": "skipped", "reason": "nothing_in_play", "day": day, "updates_count": 0, "errors": []}
     
     updates_count = 0
     errors = []
     
-    # Para cada deporte, actualizar scores
-    for sport, event_ids in picks_by_sport.items():
+    # DF_LIVE_FANOUT: todos los deportes en paralelo (tarda lo que el proveedor más lento)
+    try:
+        live_by_sport = get_live_events_for_sports(picks_by_sport, day)
+    except Exception as e:
+        logger.error(f"Error fetching live events for {day}: {e}")
+        live_by_sport = {}
+    
+    overlay = get_overlay(day)
+    for sport in picks_by_sport:
         try:
-            # Fetch live events from alternative APIs
-            live_events = get_live_events_for_sport(sport, event_ids)
+            live_events = live_by_sport.get(sport)
             
             if not live_events:
                 logger.debug(f"No live events found for {sport}")
                 continue
             
-            # Build lookup: eventId -> live_data
-            live_by_id = {str(e.get("eventId", "")): e for e in live_events}
-            
-            # Update picks with live data
-            for section in ["picks_classic", "picks_parlay_premium", "picks_value"]:
-                if section not in contract or not isinstance(contract[section], list):
-                    continue
-                
-                for pick in contract[section]:
-                    event_id = str(pick.get("eventId", ""))
-                    if event_id in live_by_id:
-                        live_data = live_by_id[event_id]
-                        
-                        # Update live fields
-                        pick["liveScore"] = live_data.get("liveScore")
-                        pick["liveStatus"] = live_data.get("liveStatus")
-                        pick["liveTime"] = live_data.get("liveTime")
-                        pick["lastUpdate"] = live_data.get("timestamp")
-                        
-                        updates_count += 1
+            # solo los eventos cuyo marcador/estado cambió se escriben en el sidecar
+            changed = overlay.update(sport, live_events)
+            updates_count += len(changed)
+            # DF_LIVE_HUB: push una sola vez a todos los clientes SSE conectados
+            LIVE_HUB.publish(day, [_live_delta(sport, row) for row in changed])
         
         except Exception as e:
             msg = f"Error updating {sport}: {e}"
             logger.error(msg)
             errors.append(msg)
     
-    # Save updated contract
-    try:
-        contract_file.write_text(json.dumps(contract, ensure_ascii=False, indent=2), encoding="utf-8")
-        logger.info(f"Updated contract for {day} with {updates_count} live scores")
-    except Exception as e:
-        logger.error(f"Error saving contract for {day}: {e}")
-        return {"status": "error", "reason": f"save_failed: {e}"}
+    if updates_count:
+        invalidate_bets_today(day)
+        logger.info(f"Updated live overlay for {day} with {updates_count} changed scores")
     
     return {
         "status": "success",
@@ -103,30 +115,25 @@ def update_contract_with_live_scores(day: str) -> Dict[str, Any]:
     }
 
 
-def _group_picks_by_sport(contract: Dict[str, Any]) -> Dict[str, List[int]]:
-    """Extract event IDs grouped by sport from all pick sections"""
-    picks_by_sport: Dict[str, List[int]] = {}
+def _live_delta(sport: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Delta para /live/stream: campos del overlay + el dict `live` que pinta el cliente."""
+    return {
+        "sport": sport,
+        "eventId": str(row.get("eventId")),
+        "liveScore": row.get("liveScore"),
+        "liveStatus": row.get("liveStatus"),
+        "liveTime": row.get("liveTime"),
+        "lastUpdate": row.get("timestamp"),
+        "live": row.get("live"),
+    }
+
+
+def _group_picks_by_sport(contract: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Extract event IDs grouped by sport from all picks and parlay legs"""
+    picks_by_sport: Dict[str, List[Any]] = {}
     
-    for section in ["picks_classic", "picks_parlay_premium", "picks_value"]:
-        picks = contract.get(section) or []
-        if not isinstance(picks, list):
-            continue
-        
-        for pick in picks:
-            if not isinstance(pick, dict):
-                continue
-            
-            sport = pick.get("sport", "").lower()
-            event_id = pick.get("eventId")
-            
-            if not sport or event_id is None:
-                continue
-            
-            if sport not in picks_by_sport:
-                picks_by_sport[sport] = []
-            
-            if event_id not in picks_by_sport[sport]:
-                picks_by_sport[sport].append(event_id)
+    for sport, event_id in build_pick_index(contract):
+        picks_by_sport.setdefault(sport, []).append(event_id)
     
     return picks_by_sport
 
@@ -0,0 +1,181 @@
+"""
+DF_ODDS_COLUMNS: store columnar para los records de la cadena de odds.
+
+Una fila = (sport, eventId, bookmaker, market, selection) + columnas numéricas.
+  - Los campos de texto se internan en tablas (valor -> código) y cada fila guarda
+    solo el código en un array('i'): miles de filas comparten unos pocos cientos de
+    strings (bookmakers, markets, selections).
+  - odds, p_implied, p_estimated, stake, ev y los campos de risk son array('d');
+    risk.level se guarda como código en array('b').
+
+Las etapas de probabilidad / estimación / EV / risk AÑADEN columnas en vez de copiar
+la lista de dicts. to_records()/iter_records() reconstruyen los dicts con el mismo
+orden de claves que escribían las etapas, así que los all.json no cambian.
+"""
+from __future__ import annotations
+
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    from api.services.odds_kernel import RISK_LEVELS
+except ModuleNotFoundError:
+    from services.odds_kernel import RISK_LEVELS  # type: ignore
+
+# orden de claves de un record en los all.json de la cadena
+FLOAT_COLUMNS = ("odds", "p_implied", "p_estimated", "stake", "ev")
+_RISK_CODE = {lvl: i for i, lvl in enumerate(RISK_LEVELS)}
+_RISK_FLOATS = ("p_est", "delta_p", "ev_margin")
+
+
+class StringTable:
+    """Interning valor -> código (int). Conserva el tipo original del valor (str/int/None)."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value: Hashable) -> int:
+        # (type, value): 1 y "1" no deben compartir código
+        k = (type(value), value)
+        c = self._codes.get(k)
+        if c is None:
+            c = len(self.values)
+            self._codes[k] = c
+            self.values.append(value)
+        return c
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class OddsColumns:
+    """Filas de odds en columnas. Las columnas numéricas se añaden etapa a etapa."""
+
+    KEY_FIELDS = ("sport", "eventId", "bookmaker", "market", "selection")
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, StringTable] = {f: StringTable() for f in self.KEY_FIELDS}
+        self.codes: Dict[str, array] = {f: array("i") for f in self.KEY_FIELDS}
+        self.floats: Dict[str, array] = {}
+        # risk: level (código, -1 = sin risk) + p_est/delta_p/ev_margin
+        self.risk_level: Optional[array] = None
+        self.risk: Dict[str, array] = {}
+
+    # -------------------------
+    # construcción
+    # -------------------------
+    def __len__(self) -> int:
+        return len(self.codes["sport"])
+
+    def append_row(self, sport: Any, event_id: Any, bookmaker: Any, market: Any, selection: Any, odds: float) -> None:
+        for f, v in zip(self.KEY_FIELDS, (sport, event_id, bookmaker, market, selection)):
+            self.codes[f].append(self.tables[f].code(v))
+        self.floats.setdefault("odds", array("d")).append(odds)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "OddsColumns":
+        """Carga records (p.ej. un checkpoint all.json). Solo se guardan las columnas presentes en todas las filas."""
+        cols = cls()
+        rows = records if isinstance(records, list) else list(records)
+        present = [c for c in FLOAT_COLUMNS if rows and all(c in r for r in rows)]
+        has_risk = bool(rows) and all(isinstance(r.get("risk"), dict) for r in rows)
+
+        for c in present:
+            cols.floats[c] = array("d")
+        if has_risk:
+            cols.risk_level = array("b")
+            cols.risk = {k: array("d") for k in _RISK_FLOATS}
+
+        for r in rows:
+            for f in cls.KEY_FIELDS:
+                cols.codes[f].append(cols.tables[f].code(r.get(f)))
+            for c in present:
+                cols.floats[c].append(float(r[c]))
+            if has_risk:
+                rk = r["risk"]
+                cols.risk_level.append(_RISK_CODE.get(rk.get("level"), -1))
+                for k in _RISK_FLOATS:
+                    v = rk.get(k)
+                    cols.risk[k].append(0.0 if v is None else float(v))
+        return cols
+
+    def take(self, idx: Sequence[int]) -> "OddsColumns":
+        """Nuevo store con las filas idx (mismas tablas de strings)."""
+        out = OddsColumns()
+        out.tables = self.tables
+        for f, arr in self.codes.items():
+            out.codes[f] = array("i", (arr[i] for i in idx))
+        for c, arr in self.floats.items():
+            out.floats[c] = array("d", (arr[i] for i in idx))
+        if self.risk_level is not None:
+            out.risk_level = array("b", (self.risk_level[i] for i in idx))
+            out.risk = {k: array("d", (a[i] for i in idx)) for k, a in self.risk.items()}
+        return out
+
+    # -------------------------
+    # acceso
+    # -------------------------
+    def column(self, name: str) -> array:
+        return self.floats[name]
+
+    def has(self, name: str) -> bool:
+        return name in self.floats
+
+    def set_column(self, name: str, values: Iterable[float]) -> None:
+        arr = values if isinstance(values, array) and values.typecode == "d" else array("d", values)
+        if len(arr) != len(self):
+            raise ValueError(f"Columna {name}: {len(arr)} filas, esperadas {len(self)}")
+        self.floats[name] = arr
+
+    def decoded(self, field: str) -> List[Any]:
+        """Valores (no códigos) de un campo de texto, fila a fila."""
+        vals = self.tables[field].values
+        return [vals[c] for c in self.codes[field]]
+
+    def set_risk(self, levels: array, p_est: array, delta_p: array, ev_margin: array) -> None:
+        self.risk_level = levels
+        self.risk = {"p_est": p_est, "delta_p": delta_p, "ev_margin": ev_margin}
+
+    # -------------------------
+    # salida
+    # -------------------------
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        fields = [(f, self.tables[f].values, self.codes[f]) for f in self.KEY_FIELDS]
+        floats = [(c, self.floats[c]) for c in FLOAT_COLUMNS if c in self.floats]
+        risk_level = self.risk_level
+        risk = [(k, self.risk[k]) for k in _RISK_FLOATS] if risk_level is not None else []
+
+        for i in range(len(self)):
+            rec: Dict[str, Any] = {f: vals[codes[i]] for f, vals, codes in fields}
+            for c, arr in floats:
+                rec[c] = arr[i]
+            if risk_level is not None and risk_level[i] >= 0:
+                rk: Dict[str, Any] = {"level": RISK_LEVELS[risk_level[i]]}
+                for k, arr in risk:
+                    rk[k] = arr[i]
+                rec["risk"] = rk
+            yield rec
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self.iter_records())
+
+
+def write_records_json(path: Path, records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Escribe records como json.dumps(records, ensure_ascii=False, indent=2) pero fila a
+    fila, sin materializar la lista completa ni el string entero en memoria.
+    Devuelve el nº de records escritos.
+    """
+    n = 0
+    with path.open("w", encoding="utf-8") as fh:
+        for rec in records:
+            body = json.dumps(rec, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            fh.write(("[\n  " if n == 0 else ",\n  ") + body)
+            n += 1
+        fh.write("\n]" if n else "[]")
+    return n
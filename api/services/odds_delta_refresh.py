@@ -0,0 +1,111 @@
+"""
+DF_ODDS_DELTA: refresh intradía de odds que solo recalcula los eventos que cambiaron.
+
+1. Refresh de odds de los deportes pedidos (The Odds API, solo sus claves de liga, con cache de
+   max_age_hours en vez de las 6h del run diario). Va a .odds_cache/<day>_odds_refresh.json:
+   el cache diario y su fetch_id (el de events/ y odds/ de las 06:00) no se reescriben.
+2. Diff contra api/data/odds/<day>/<sport>.json por (sport, eventId, bookmaker, market):
+   un evento cambia si alguna de sus líneas aparece, desaparece o mueve su cuota.
+3. Solo se reescriben los <sport>.json con cambios y la cadena corre en modo delta
+   (pipeline_engine.run_delta): normalization..risk solo para esos eventos, y pools/picks
+   solo si algún evento tocado está en ellos.
+
+Uso:
+    python -m api.services.odds_delta_refresh 2026-01-20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from api.services import odds_normalization_multisport
+from api.services.odds_ingestion_multisport import fetch_sport_payloads
+from api.services.pipeline_engine import Log, run_delta
+from api.services.snapshot_store import load_json as load_snapshot_json
+from api.services.snapshot_store import write_json_artifact
+from api.utils.paths import data_path, ensure_dir
+
+# edad máxima del cache de The Odds API para un refresh intradía
+DELTA_MAX_AGE_HOURS = float(os.environ.get("ODDS_DELTA_MAX_AGE_HOURS", "1"))
+# DF_QUOTA_BUDGET: clase de las llamadas del refresh (no puede gastar la reserva de settlement/live)
+DELTA_PRIORITY = os.environ.get("ODDS_DELTA_PRIORITY", "refresh")
+
+LineKey = Tuple[str, Any, Any]  # (eventId, bookmaker, market)
+
+
+def event_lines(sport: str, data: Any) -> Dict[LineKey, Tuple[Tuple[str, float], ...]]:
+    """{(eventId, bookmaker, market): ((selection, odds), ...)} tal y como los ve la normalización."""
+    rows = odds_normalization_multisport.rows_from_payloads(odds_normalization_multisport.payloads_from_data(sport, data))
+    lines: Dict[LineKey, List[Tuple[str, float]]] = {}
+    for _sport, event_id, bookmaker, market, selection, odds in rows:
+        lines.setdefault((event_id, bookmaker, market), []).append((str(selection), odds))
+    return {k: tuple(sorted(v)) for k, v in lines.items()}
+
+
+def diff_events(sport: str, old_data: Any, new_data: Any) -> Set[str]:
+    """eventIds con alguna línea nueva, desaparecida o con cuota distinta."""
+    old_lines = event_lines(sport, old_data)
+    new_lines = event_lines(sport, new_data)
+    changed: Set[str] = set()
+    for key in set(old_lines) | set(new_lines):
+        if old_lines.get(key) != new_lines.get(key):
+            changed.add(key[0])
+    return changed
+
+
+def ingest_odds_delta(
+    day: str,
+    sports: Optional[List[str]] = None,
+    max_age_hours: float = DELTA_MAX_AGE_HOURS,
+    priority: str = DELTA_PRIORITY,
+) -> Dict[str, List[str]]:
+    """
+    Fetch + diff. Escribe solo los <sport>.json con eventos cambiados.
+    Devuelve {sport: [eventId, ...]} de los eventos a recalcular.
+    """
+    odds_dir = ensure_dir(data_path("odds", day))
+    changed: Dict[str, List[str]] = {}
+    for sport, payload in fetch_sport_payloads(day, sports=sports, max_age_hours=max_age_hours, priority=priority).items():
+        if not payload.get("response"):
+            # sin datos del proveedor (cuota agotada, sin key...): no es "todas las líneas desaparecieron"
+            continue
+        out_file = odds_dir / f"{sport}.json"
+        old_data = load_snapshot_json(out_file) if out_file.exists() else None
+        events = diff_events(sport, old_data, payload)
+        if old_data is not None and not events:
+            continue
+        write_json_artifact(out_file, payload, sport=sport)
+        if events:
+            changed[sport] = sorted(events)
+    return changed
+
+
+def refresh_odds_delta(
+    day: str,
+    sports: Optional[List[str]] = None,
+    max_age_hours: float = DELTA_MAX_AGE_HOURS,
+    checkpoints: bool = True,
+    log: Optional[Log] = None,
+    use_cache: bool = True,
+    priority: str = DELTA_PRIORITY,
+) -> Dict[str, Any]:
+    changed = ingest_odds_delta(day, sports=sports, max_age_hours=max_age_hours, priority=priority)
+    summary = run_delta(day, changed, checkpoints=checkpoints, log=log, use_cache=use_cache)
+    summary["changed"] = {sport: len(eids) for sport, eids in changed.items()}
+    return summary
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Intraday odds refresh: recompute only events whose odds changed")
+    p.add_argument("day", help="YYYY-MM-DD")
+    p.add_argument("--sports", default=None, help="Comma-separated subset (default: all)")
+    p.add_argument("--max-age-hours", type=float, default=DELTA_MAX_AGE_HOURS, help="Reuse cached odds younger than this")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    sports = [s.strip() for s in args.sports.split(",") if s.strip()] if args.sports else None
+    print(json.dumps(refresh_odds_delta(args.day, sports=sports, max_age_hours=args.max_age_hours), ensure_ascii=False))
@@ -3,7 +3,17 @@ from __future__ import annotations
 import json
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    from api.services.odds_columns import OddsColumns
+except ModuleNotFoundError:
+    from services.odds_columns import OddsColumns  # type: ignore
+
+try:
+    from api.services.odds_kernel import DEFAULT_MARKET_ADJUSTMENT, estimate_batch, estimated_probability
+except ModuleNotFoundError:
+    from services.odds_kernel import DEFAULT_MARKET_ADJUSTMENT, estimate_batch, estimated_probability  # type: ignore
 
 
 # Repo root: .../bot-ultimate-prediction
@@ -25,26 +35,39 @@ MARKET_ADJUSTMENTS = {
 }
 
 
-def clamp(value: float, min_value: float = 0.01, max_value: float = 0.99) -> float:
-    return max(min_value, min(max_value, value))
+def estimate_probability(item: Dict[str, Any]) -> float:
+    market_adj = MARKET_ADJUSTMENTS.get(item.get("market"), DEFAULT_MARKET_ADJUSTMENT)
+    return estimated_probability(float(item["p_implied"]), market_adj, float(item["odds"]))
 
 
-def estimate_probability(item: Dict[str, Any]) -> float:
-    p_base = float(item["p_implied"])
-    odds = float(item["odds"])
-    market = item.get("market")
+def estimate_records(odds_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Añade p_estimated a records enriquecidos (en memoria, sin I/O)."""
+    estimated = []
+    for item in odds_list:
+        p_estimated = estimate_probability(item)
 
-    market_adj = MARKET_ADJUSTMENTS.get(market, -0.03)
+        estimated.append({
+            "sport": item["sport"],
+            "eventId": item["eventId"],
+            "bookmaker": item.get("bookmaker"),
+            "market": item.get("market"),
+            "selection": item.get("selection"),
+            "odds": float(item["odds"]),
+            "p_implied": float(item["p_implied"]),
+            "p_estimated": p_estimated,
+        })
+    return estimated
 
-    if odds < 1.50:
-        odds_adj = -0.05
-    elif odds > 3.50:
-        odds_adj = -0.07
-    else:
-        odds_adj = 0.00
 
-    p_estimated = p_base + market_adj + odds_adj
-    return round(clamp(p_estimated), 4)
+def estimate_columns(cols: OddsColumns) -> OddsColumns:
+    """Versión columnar de estimate_records: añade la columna p_estimated."""
+    # el ajuste por market se resuelve una vez por market distinto, no por fila
+    market_adj = [MARKET_ADJUSTMENTS.get(m, DEFAULT_MARKET_ADJUSTMENT) for m in cols.tables["market"].values]
+    cols.set_column(
+        "p_estimated",
+        estimate_batch(cols.column("odds"), cols.column("p_implied"), cols.codes["market"], market_adj),
+    )
+    return cols
 
 
 def estimate_odds_for_day(day: Optional[str] = None) -> Dict[str, Any]:
@@ -62,20 +85,7 @@ def estimate_odds_for_day(day: Optional[str] = None) -> Dict[str, Any]:
 
     odds_list = json.loads(in_path.read_text(encoding="utf-8"))
 
-    estimated = []
-    for item in odds_list:
-        p_estimated = estimate_probability(item)
-
-        estimated.append({
-            "sport": item["sport"],
-            "eventId": item["eventId"],
-            "bookmaker": item.get("bookmaker"),
-            "market": item.get("market"),
-            "selection": item.get("selection"),
-            "odds": float(item["odds"]),
-            "p_implied": float(item["p_implied"]),
-            "p_estimated": p_estimated,
-        })
+    estimated = estimate_records(odds_list)
 
     out_file.write_text(json.dumps(estimated, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
 import json
+from array import array
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    from api.services.odds_columns import OddsColumns
+except ModuleNotFoundError:
+    from services.odds_columns import OddsColumns  # type: ignore
+
+try:
+    from api.services.odds_kernel import ev_batch, expected_value
+except ModuleNotFoundError:
+    from services.odds_kernel import ev_batch, expected_value  # type: ignore
 
 DEFAULT_STAKE = 50.0
 
@@ -13,24 +24,11 @@ API_DATA_DIR = REPO_ROOT / "api" / "data"
 
 
 def calculate_ev(p_estimated: float, odds: float, stake: float) -> float:
-    return (p_estimated * odds - 1.0) * stake
-
-
-def calculate_ev_for_day(day: Optional[str] = None, stake: float = DEFAULT_STAKE) -> Dict[str, Any]:
-    if day is None:
-        day = date.today().isoformat()
-
-    in_path = API_DATA_DIR / "odds_estimated" / day / "all.json"
-    out_dir = API_DATA_DIR / "odds_ev" / day
-    out_file = out_dir / "all.json"
+    return expected_value(p_estimated, odds, stake)
 
-    if not in_path.exists():
-        raise FileNotFoundError(f"No estimated odds file found: {in_path}")
-
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    odds_list = json.loads(in_path.read_text(encoding="utf-8"))
 
+def calculate_ev_records(odds_list: List[Dict[str, Any]], stake: float = DEFAULT_STAKE) -> List[Dict[str, Any]]:
+    """Añade stake/ev a records estimados (en memoria, sin I/O)."""
     enriched = []
     for item in odds_list:
         ev = calculate_ev(
@@ -51,6 +49,36 @@ def calculate_ev_for_day(day: Optional[str] = None, stake: float = DEFAULT_STAKE
             "stake": float(stake),
             "ev": round(ev, 2),
         })
+    return enriched
+
+
+def calculate_ev_columns(cols: OddsColumns, stake: float = DEFAULT_STAKE) -> OddsColumns:
+    """Versión columnar de calculate_ev_records: añade las columnas stake y ev."""
+    stake = float(stake)
+    p_est = cols.column("p_estimated")
+    odds = cols.column("odds")
+    n = len(cols)
+    cols.set_column("stake", array("d", [stake]) * n)
+    cols.set_column("ev", ev_batch(p_est, odds, stake))
+    return cols
+
+
+def calculate_ev_for_day(day: Optional[str] = None, stake: float = DEFAULT_STAKE) -> Dict[str, Any]:
+    if day is None:
+        day = date.today().isoformat()
+
+    in_path = API_DATA_DIR / "odds_estimated" / day / "all.json"
+    out_dir = API_DATA_DIR / "odds_ev" / day
+    out_file = out_dir / "all.json"
+
+    if not in_path.exists():
+        raise FileNotFoundError(f"No estimated odds file found: {in_path}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    odds_list = json.loads(in_path.read_text(encoding="utf-8"))
+
+    enriched = calculate_ev_records(odds_list, stake=stake)
 
     out_file.write_text(json.dumps(enriched, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -1,8 +1,12 @@
 import os
 import json
-import requests
 from datetime import datetime
 
+try:
+    from services.http_transport import http_get
+except ModuleNotFoundError:
+    from api.services.http_transport import http_get  # type: ignore
+
 API_KEY = os.getenv("API_SPORTS_KEY")
 
 # DF_DIAG_API_SPORTS_KEY
@@ -47,7 +51,7 @@ def ingest_odds_for_today():
         print(f"[ODDS] ({idx}/{len(fixture_ids)}) Fixture {fixture_id}")
 
         try:
-            response = requests.get(
+            response = http_get(
                 BASE_URL,
                 headers=HEADERS,
                 params={"fixture": fixture_id},
@@ -11,9 +11,11 @@ from typing import Any, Dict, List, Optional
 try:
     from services.api_sports_client import ApiSportsClient  # type: ignore
     from services.api_theodds_cached import TheOddsAPICached  # type: ignore
+    from services.snapshot_store import write_json_artifact  # type: ignore
 except ModuleNotFoundError:
     from api.services.api_sports_client import ApiSportsClient  # type: ignore
     from api.services.api_theodds_cached import TheOddsAPICached  # type: ignore
+    from api.services.snapshot_store import write_json_artifact  # type: ignore
 
 logger = logging.getLogger(__name__)
 
@@ -149,6 +151,58 @@ def _is_rate_limit_exc(exc: BaseException) -> bool:
     return code == 429
 
 
+def build_sport_payload(
+    day: str,
+    sport: str,
+    all_odds: Dict[str, List[Dict[str, Any]]],
+    fetch_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Payload de api/data/odds/<day>/<sport>.json a partir del fetch de The Odds API."""
+    odds_sport = ODDS_MODE_BY_SPORT[sport].get("odds_sport", sport)
+    
+    # Get from cached result
+    events = all_odds.get(odds_sport, [])
+    
+    payload = {
+        "sport": sport,
+        "day": day,
+        "source": "theodds_api_cached",
+        "strategy": "real_market_odds_cached",
+        "results": len(events),
+        "response": events,
+        "bookmakers": ["draftkings", "fanduel", "betmgm", "betrivers"],
+    }
+    if fetch_id:
+        payload["fetch_id"] = fetch_id
+    return payload
+
+
+def fetch_sport_payloads(
+    day: str,
+    sports: Optional[List[str]] = None,
+    max_age_hours: float = 6,
+    priority: str = "refresh",
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Refresh intradía (o cache si es más reciente que max_age_hours) sin escribir nada en disco.
+    Solo se piden las claves de los deportes seleccionados y el cache diario no se reescribe
+    (TheOddsAPICached.refresh_sports). priority: clase DF_QUOTA_BUDGET de las llamadas.
+    Devuelve {sport: payload} para los theodds_api.
+    """
+    selected = sorted(ODDS_MODE_BY_SPORT.keys()) if not sports else sports
+    selected = [s for s in selected if ODDS_MODE_BY_SPORT.get(s, {}).get("mode", "theodds_api") == "theodds_api"]
+    if not selected:
+        return {}
+    odds_sports = sorted({ODDS_MODE_BY_SPORT.get(s, {}).get("odds_sport", s) for s in selected})
+    landed = TheOddsAPICached(priority=priority).refresh_sports(day, sports=odds_sports, max_age_hours=max_age_hours)
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for sport in selected:
+        odds_sport = ODDS_MODE_BY_SPORT.get(sport, {}).get("odds_sport", sport)
+        current = landed.get(odds_sport) or {}
+        payloads[sport] = build_sport_payload(day, sport, {odds_sport: current.get("events") or []}, fetch_id=current.get("fetch_id"))
+    return payloads
+
+
 def ingest_odds_for_day(
     day: Optional[str] = None,
     force: bool = False,
@@ -188,16 +242,39 @@ def ingest_odds_for_day(
     # Caching ensures we fetch all odds ONCE per day, not multiple times per hour
     theodds_client = TheOddsAPICached()
     
+    theodds_sports_used = []
+    streamed: Dict[str, Dict[str, Any]] = {}
+
+    def _write_landed(odds_sport: str, events: List[Dict[str, Any]]) -> None:
+        # DF_THEODDS_WINDOW_FETCH: cada <sport>.json se escribe en cuanto llega su respuesta
+        for sport in selected:
+            conf = ODDS_MODE_BY_SPORT[sport]
+            if conf.get("mode", "theodds_api") != "theodds_api" or conf.get("odds_sport", sport) != odds_sport:
+                continue
+            out_file = out_dir / f"{sport}.json"
+            if sport in streamed or (out_file.exists() and not force):
+                continue
+            try:
+                payload = build_sport_payload(day, sport, {odds_sport: events})
+                write_json_artifact(out_file, payload, sport=sport)
+                streamed[sport] = payload
+            except Exception as e:
+                logger.error(f"Error writing {sport}: {e}")
+    
     # Fetch all odds for the day (uses cache if fresh)
     logger.info(f"Fetching odds for {day} (uses caching to reduce API quota)")
-    all_odds = theodds_client.fetch_all_odds(day, force_refresh=force)
-    
-    theodds_sports_used = []
+    all_odds = theodds_client.fetch_all_odds(day, force_refresh=force, on_sport=_write_landed)
 
     for sport in selected:
         conf = ODDS_MODE_BY_SPORT[sport]
         out_file = out_dir / f"{sport}.json"
         
+        if sport in streamed:
+            payload = streamed[sport]
+            summary["sports"].append(OddsIngestSummary(sport, "created", str(out_file), 1, payload["results"]).__dict__)
+            theodds_sports_used.append(sport)
+            continue
+
         if out_file.exists() and not force:
             summary["sports"].append(OddsIngestSummary(sport, "skipped", str(out_file), 0, 0).__dict__)
             continue
@@ -207,23 +284,10 @@ def ingest_odds_for_day(
             
             # Use The Odds API for real betting odds (9 verified sports ONLY)
             if mode == "theodds_api":
-                odds_sport = conf.get("odds_sport", sport)
-                
-                # Get from cached result
-                events = all_odds.get(odds_sport, [])
-                
-                payload = {
-                    "sport": sport,
-                    "day": day,
-                    "source": "theodds_api_cached",
-                    "strategy": "real_market_odds_cached",
-                    "results": len(events),
-                    "response": events,
-                    "bookmakers": ["draftkings", "fanduel", "betmgm", "betrivers"],
-                }
+                payload = build_sport_payload(day, sport, all_odds)
                 
-                out_file.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-                summary["sports"].append(OddsIngestSummary(sport, "created", str(out_file), 1, len(events)).__dict__)
+                write_json_artifact(out_file, payload, sport=sport)
+                summary["sports"].append(OddsIngestSummary(sport, "created", str(out_file), 1, payload["results"]).__dict__)
                 theodds_sports_used.append(sport)
                 continue
 
@@ -0,0 +1,261 @@
+"""
+DF_ODDS_KERNEL: kernel batch de probabilidad / EV / risk sobre días enteros de odds.
+
+Misma matemática que las funciones por record de
+  odds_probability_multisport / odds_estimation_multisport / odds_ev_multisport /
+  odds_risk_multisport
+(que ahora son wrappers finos de las funciones escalares de aquí), pero sobre arrays:
+
+  p_implied   = round(1/odds, 4)
+  p_estimated = round(clamp(p_implied + market_adj + odds_adj), 4)
+  ev          = round((p_estimated * odds - 1) * stake, 2)
+  delta_p     = p_estimated - p_implied
+  ev_margin   = ev / risk_stake
+  risk level  = EXTREME / LOW / MEDIUM / HIGH
+
+Usa NumPy si está instalado y si no un bucle Python puro. El resultado es idéntico
+bit a bit: +, *, / son IEEE en ambos casos, y el redondeo vectorizado
+(rint(x*10^d)/10^d) solo puede discrepar de round() de Python en los casos casi
+empate, que se recalculan con round().
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+try:  # NumPy es opcional
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH", "EXTREME")
+LEVEL_LOW, LEVEL_MEDIUM, LEVEL_HIGH, LEVEL_EXTREME = range(4)
+
+P_CLAMP_MIN = 0.01
+P_CLAMP_MAX = 0.99
+DEFAULT_MARKET_ADJUSTMENT = -0.03
+
+# odds_adj por rango de cuota
+ODDS_LOW = 1.50
+ODDS_LOW_ADJ = -0.05
+ODDS_HIGH = 3.50
+ODDS_HIGH_ADJ = -0.07
+
+# umbrales de risk (ver risk_values)
+EXTREME_P_MAX = 0.50
+EXTREME_MARGIN_MAX = 0.02
+EXTREME_ODDS_MIN = 5.00
+LOW_P_MIN = 0.78
+LOW_ODDS_MAX = 1.65
+LOW_MARGIN_MIN = 0.02
+LOW_DELTA_MAX = 0.04
+MEDIUM_P_MIN = 0.65
+MEDIUM_ODDS_MAX = 2.20
+MEDIUM_MARGIN_MIN = 0.025
+
+# |frac(x*10^d) - 0.5| por debajo de esto se recalcula con round() de Python
+_TIE_EPS = 1e-6
+
+FloatArray = array
+
+
+def use_numpy() -> bool:
+    return np is not None
+
+
+# -------------------------
+# Escalares (API por record)
+# -------------------------
+def clamp(value: float, min_value: float = P_CLAMP_MIN, max_value: float = P_CLAMP_MAX) -> float:
+    return max(min_value, min(max_value, value))
+
+
+def implied_probability(odds: float) -> Optional[float]:
+    """round(1/odds, 4) o None si la cuota no es positiva."""
+    if not odds > 0:
+        return None
+    return round(1 / odds, 4)
+
+
+def odds_adjustment(odds: float) -> float:
+    if odds < ODDS_LOW:
+        return ODDS_LOW_ADJ
+    if odds > ODDS_HIGH:
+        return ODDS_HIGH_ADJ
+    return 0.00
+
+
+def estimated_probability(p_implied: float, market_adj: float, odds: float) -> float:
+    return round(clamp(p_implied + market_adj + odds_adjustment(odds)), 4)
+
+
+def expected_value(p_estimated: float, odds: float, stake: float) -> float:
+    return (p_estimated * odds - 1.0) * stake
+
+
+def risk_level(odds: float, p_est: float, delta_p: float, ev_margin: float) -> int:
+    if (p_est < EXTREME_P_MAX) or (ev_margin < EXTREME_MARGIN_MAX) or (odds > EXTREME_ODDS_MIN):
+        return LEVEL_EXTREME
+    if (p_est >= LOW_P_MIN) and (odds <= LOW_ODDS_MAX) and (ev_margin >= LOW_MARGIN_MIN) and (abs(delta_p) <= LOW_DELTA_MAX):
+        return LEVEL_LOW
+    if (p_est >= MEDIUM_P_MIN) and (odds <= MEDIUM_ODDS_MAX) and (ev_margin >= MEDIUM_MARGIN_MIN):
+        return LEVEL_MEDIUM
+    return LEVEL_HIGH
+
+
+def risk_values(odds: float, p_est: float, p_impl: float, ev: float, risk_stake: float) -> Tuple[str, float, float]:
+    """Devuelve (level, delta_p, ev_margin) sin redondear."""
+    delta_p = p_est - p_impl
+    ev_margin = ev / risk_stake
+    return RISK_LEVELS[risk_level(odds, p_est, delta_p, ev_margin)], delta_p, ev_margin
+
+
+# -------------------------
+# Helpers NumPy
+# -------------------------
+def _np_view(values: Sequence[float]) -> Any:
+    if isinstance(values, array) and values.typecode == "d":
+        return np.frombuffer(values, dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _to_array(x: Any, typecode: str = "d") -> array:
+    out = array(typecode)
+    out.frombytes(np.ascontiguousarray(x, dtype=np.float64 if typecode == "d" else np.int8).tobytes())
+    return out
+
+
+def _np_round(x: Any, ndigits: int) -> Any:
+    """round(x, ndigits) de Python, vectorizado (casi-empates resueltos con round())."""
+    scale = 10.0 ** ndigits
+    scaled = x * scale
+    out = np.rint(scaled) / scale
+    frac = scaled - np.floor(scaled)
+    suspect = np.nonzero(np.abs(frac - 0.5) < _TIE_EPS)[0]
+    for i in suspect.tolist():
+        out[i] = round(float(x[i]), ndigits)
+    # no finitos: round() de Python lanzaría; se dejan tal cual
+    return out
+
+
+# -------------------------
+# Batch
+# -------------------------
+def implied_batch(odds: Sequence[float]) -> Tuple[array, array]:
+    """
+    Devuelve (keep, p_implied): índices de filas con odds > 0 y su p_implied.
+    """
+    if np is not None:
+        o = _np_view(odds)
+        keep_mask = o > 0
+        keep = np.nonzero(keep_mask)[0]
+        p = _np_round(1 / o[keep], 4)
+        return array("l", keep.tolist()), _to_array(p)
+
+    keep_py = array("l")
+    p_py = array("d")
+    for i, o in enumerate(odds):
+        if o > 0:
+            keep_py.append(i)
+            p_py.append(round(1 / o, 4))
+    return keep_py, p_py
+
+
+def estimate_batch(
+    odds: Sequence[float],
+    p_implied: Sequence[float],
+    market_codes: Sequence[int],
+    market_adj_table: Sequence[float],
+) -> array:
+    """p_estimated por fila. market_adj_table[code] = ajuste del market."""
+    n = len(odds)
+    if np is not None:
+        o = _np_view(odds)
+        pi = _np_view(p_implied)
+        adj = np.asarray(market_adj_table, dtype=np.float64)[np.asarray(market_codes, dtype=np.int64)] if n else np.zeros(0)
+        oadj = np.where(o < ODDS_LOW, ODDS_LOW_ADJ, np.where(o > ODDS_HIGH, ODDS_HIGH_ADJ, 0.00))
+        raw = (pi + adj) + oadj
+        return _to_array(_np_round(np.maximum(P_CLAMP_MIN, np.minimum(P_CLAMP_MAX, raw)), 4))
+
+    return array(
+        "d",
+        [estimated_probability(p_implied[i], market_adj_table[market_codes[i]], odds[i]) for i in range(n)],
+    )
+
+
+def ev_batch(p_estimated: Sequence[float], odds: Sequence[float], stake: float) -> array:
+    """round(ev, 2) por fila."""
+    stake = float(stake)
+    if np is not None:
+        raw = (_np_view(p_estimated) * _np_view(odds) - 1.0) * stake
+        return _to_array(_np_round(raw, 2))
+    return array("d", [round(expected_value(p_estimated[i], odds[i], stake), 2) for i in range(len(odds))])
+
+
+def risk_batch(
+    odds: Sequence[float],
+    p_estimated: Sequence[float],
+    p_implied: Sequence[float],
+    ev: Sequence[float],
+    risk_stake: float,
+) -> Dict[str, array]:
+    """
+    Devuelve {"level": array('b') de códigos RISK_LEVELS, "p_est", "delta_p", "ev_margin"}
+    con los valores ya redondeados a 4 decimales (lo que se guarda en sel["risk"]).
+    """
+    n = len(odds)
+    if np is not None:
+        o = _np_view(odds)
+        pe = _np_view(p_estimated)
+        delta = pe - _np_view(p_implied)
+        margin = _np_view(ev) / float(risk_stake)
+        extreme = (pe < EXTREME_P_MAX) | (margin < EXTREME_MARGIN_MAX) | (o > EXTREME_ODDS_MIN)
+        low = (pe >= LOW_P_MIN) & (o <= LOW_ODDS_MAX) & (margin >= LOW_MARGIN_MIN) & (np.abs(delta) <= LOW_DELTA_MAX)
+        medium = (pe >= MEDIUM_P_MIN) & (o <= MEDIUM_ODDS_MAX) & (margin >= MEDIUM_MARGIN_MIN)
+        level = np.select([extreme, low, medium], [LEVEL_EXTREME, LEVEL_LOW, LEVEL_MEDIUM], LEVEL_HIGH)
+        return {
+            "level": _to_array(level, "b"),
+            "p_est": _to_array(_np_round(pe, 4)),
+            "delta_p": _to_array(_np_round(delta, 4)),
+            "ev_margin": _to_array(_np_round(margin, 4)),
+        }
+
+    levels = array("b", bytes(n))
+    r_p_est = array("d", bytes(8 * n))
+    r_delta = array("d", bytes(8 * n))
+    r_margin = array("d", bytes(8 * n))
+    for i in range(n):
+        pe_i = p_estimated[i]
+        delta_i = pe_i - p_implied[i]
+        margin_i = ev[i] / risk_stake
+        levels[i] = risk_level(odds[i], pe_i, delta_i, margin_i)
+        r_p_est[i] = round(pe_i, 4)
+        r_delta[i] = round(delta_i, 4)
+        r_margin[i] = round(margin_i, 4)
+    return {"level": levels, "p_est": r_p_est, "delta_p": r_delta, "ev_margin": r_margin}
+
+
+def score_batch(
+    odds: Sequence[float],
+    p_implied: Sequence[float],
+    market_codes: Sequence[int],
+    market_adj_table: Sequence[float],
+    stake: float,
+    risk_stake: float,
+) -> Dict[str, array]:
+    """
+    Una pasada completa (estimación + EV + risk) sobre filas ya con p_implied.
+    Devuelve p_estimated, ev, delta_p, ev_margin (redondeados como en sel["risk"]),
+    risk_p_est y level.
+    """
+    p_est = estimate_batch(odds, p_implied, market_codes, market_adj_table)
+    ev = ev_batch(p_est, odds, stake)
+    risk = risk_batch(odds, p_est, p_implied, ev, risk_stake)
+    return {
+        "p_estimated": p_est,
+        "ev": ev,
+        "delta_p": risk["delta_p"],
+        "ev_margin": risk["ev_margin"],
+        "risk_p_est": risk["p_est"],
+        "level": risk["level"],
+    }
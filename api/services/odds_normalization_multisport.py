@@ -3,7 +3,14 @@ from __future__ import annotations
 import json
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from api.services.odds_columns import OddsColumns
+    from api.services.snapshot_store import load_json as load_snapshot_json
+except ModuleNotFoundError:
+    from services.odds_columns import OddsColumns  # type: ignore
+    from services.snapshot_store import load_json as load_snapshot_json  # type: ignore
 
 # Repo root: .../bot-ultimate-prediction
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -60,7 +67,12 @@ def _iter_odds_payloads_for_sport(day: str, sport: str) -> List[Tuple[str, int,
     if not p.exists():
         return []
 
-    data = json.loads(p.read_text(encoding="utf-8"))
+    # DF_BSNAP: usa el .bsnap compacto si corresponde al JSON actual
+    return payloads_from_data(sport, load_snapshot_json(p))
+
+
+def payloads_from_data(sport: str, data: Any) -> List[Tuple[str, int, Dict[str, Any]]]:
+    """Igual que _iter_odds_payloads_for_sport pero sobre el JSON ya cargado (p.ej. un fetch nuevo)."""
     out: List[Tuple[str, int, Dict[str, Any]]] = []
 
     # ✅ football (date mode) actual: dict directo con response:[{fixture:{id},bookmakers...}, ...]
@@ -106,63 +118,110 @@ def _iter_odds_payloads_for_sport(day: str, sport: str) -> List[Tuple[str, int,
     return out
 
 
-def normalize_odds_for_day(day: Optional[str] = None) -> Dict[str, Any]:
-    if day is None:
-        day = date.today().isoformat()
+RawRow = Tuple[str, str, Any, Any, Any, float]  # (sport, eventId, bookmaker, market, selection, odds)
+
+
+def _row_sort_key(r: RawRow) -> Tuple[str, int, str, str, str, float]:
+    # mismo orden que el sort histórico sobre dicts
+    sport, event_id, bookmaker, market, selection, odds = r
+    return (
+        sport or "",
+        int(event_id or 0),
+        market or "",
+        str(selection or ""),
+        bookmaker or "",
+        float(odds or 0.0),
+    )
+
+
+def record_sort_key(r: Dict[str, Any]) -> Tuple[str, int, str, str, str, float]:
+    """_row_sort_key sobre un record (dict) de cualquier etapa de la cadena."""
+    return _row_sort_key((r.get("sport"), r.get("eventId"), r.get("bookmaker"), r.get("market"), r.get("selection"), r.get("odds")))
+
+
+def rows_from_payloads(payloads: List[Tuple[str, int, Dict[str, Any]]]) -> List[RawRow]:
+    """Filas crudas (sin ordenar) de los payloads de un deporte."""
+    rows: List[RawRow] = []
+    for sport, event_id, payload in payloads:
+        for item in payload.get("response", []) or []:
+            bookmakers = item.get("bookmakers") or []
+            for bookmaker in bookmakers:
+                bookmaker_name = bookmaker.get("name")
+                bets = bookmaker.get("bets") or []
+                for bet in bets:
+                    market = bet.get("name")
+                    values = bet.get("values") or []
+                    for value in values:
+                        odds = _as_float(value.get("odd"))
+                        selection = value.get("value")
+                        if odds is None or selection is None or market is None:
+                            continue
+
+                        rows.append((sport, str(event_id), bookmaker_name, market, selection, odds))
+    return rows
 
-    out_dir = API_DATA_DIR / "odds_normalized" / day
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_file = out_dir / "all.json"
 
+def _collect_rows(day: str, only: Optional[Set[Tuple[str, str]]] = None) -> Tuple[List[RawRow], Dict[str, int], List[str]]:
+    """only: {(sport, eventId)} para normalizar solo esos eventos (refresh delta)."""
     odds_dir = API_DATA_DIR / "odds" / day
     sports = sorted([p.stem for p in odds_dir.glob("*.json")])
+    if only is not None:
+        wanted = {sport for sport, _eid in only}
+        sports = [s for s in sports if s in wanted]
 
-    normalized: List[Dict[str, Any]] = []
+    rows: List[RawRow] = []
     sport_counts: Dict[str, int] = {}
 
     for sport in sports:
         payloads = _iter_odds_payloads_for_sport(day, sport)
-        sport_total = 0
-
-        for _sport, event_id, payload in payloads:
-            for item in payload.get("response", []) or []:
-                bookmakers = item.get("bookmakers") or []
-                for bookmaker in bookmakers:
-                    bookmaker_name = bookmaker.get("name")
-                    bets = bookmaker.get("bets") or []
-                    for bet in bets:
-                        market = bet.get("name")
-                        values = bet.get("values") or []
-                        for value in values:
-                            odds = _as_float(value.get("odd"))
-                            selection = value.get("value")
-                            if odds is None or selection is None or market is None:
-                                continue
-
-                            normalized.append(
-                                {
-                                    "sport": sport,
-                                    "eventId": str(event_id),
-                                    "bookmaker": bookmaker_name,
-                                    "market": market,
-                                    "selection": selection,
-                                    "odds": odds,
-                                }
-                            )
-                            sport_total += 1
-
-        sport_counts[sport] = sport_total
-
-    normalized.sort(
-        key=lambda r: (
-            r.get("sport") or "",
-            int(r.get("eventId") or 0),
-            r.get("market") or "",
-            str(r.get("selection") or ""),
-            r.get("bookmaker") or "",
-            float(r.get("odds") or 0.0),
-        )
-    )
+        if only is not None:
+            payloads = [pl for pl in payloads if (pl[0], str(pl[1])) in only]
+        sport_rows = rows_from_payloads(payloads)
+        rows.extend(sport_rows)
+        sport_counts[sport] = len(sport_rows)
+
+    rows.sort(key=_row_sort_key)
+    return rows, sport_counts, sports
+
+
+def collect_normalized_odds(day: str) -> Tuple[List[Dict[str, Any]], Dict[str, int], List[str]]:
+    """
+    Normaliza api/data/odds/<day>/*.json en memoria (sin escribir).
+    Devuelve (records ordenados, conteo por deporte, deportes leídos).
+    """
+    rows, sport_counts, sports = _collect_rows(day)
+    normalized = [
+        {
+            "sport": sport,
+            "eventId": event_id,
+            "bookmaker": bookmaker,
+            "market": market,
+            "selection": selection,
+            "odds": odds,
+        }
+        for sport, event_id, bookmaker, market, selection, odds in rows
+    ]
+    return normalized, sport_counts, sports
+
+
+def collect_normalized_columns(day: str, only: Optional[Set[Tuple[str, str]]] = None) -> Tuple[OddsColumns, Dict[str, int], List[str]]:
+    """Igual que collect_normalized_odds pero en un OddsColumns (sin un dict por fila)."""
+    rows, sport_counts, sports = _collect_rows(day, only=only)
+    cols = OddsColumns()
+    for row in rows:
+        cols.append_row(*row)
+    return cols, sport_counts, sports
+
+
+def normalize_odds_for_day(day: Optional[str] = None) -> Dict[str, Any]:
+    if day is None:
+        day = date.today().isoformat()
+
+    out_dir = API_DATA_DIR / "odds_normalized" / day
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / "all.json"
+
+    normalized, sport_counts, sports = collect_normalized_odds(day)
 
     out_file.write_text(json.dumps(normalized, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 PREMIUM_PROBABILITY_THRESHOLD = 0.86
 MIN_PREMIUM_PER_DAY = 2
@@ -38,21 +38,11 @@ def is_premium_strict(sel: Dict[str, Any]) -> bool:
     return (_risk_level(sel) == "LOW") and (_f(sel.get("p_estimated")) >= PREMIUM_PROBABILITY_THRESHOLD)
 
 
-def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
-    if day is None:
-        day = date.today().isoformat()
-
-    in_path = API_DATA_DIR / "odds_risk" / day / "all.json"
-    out_dir = API_DATA_DIR / "odds_premium" / day
-    out_file = out_dir / "all.json"
-
-    if not in_path.exists():
-        raise FileNotFoundError(f"No risk file found: {in_path}")
-
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    data = json.loads(in_path.read_text(encoding="utf-8"))
-
+def mark_premium(data: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Marca sel["premium"] / sel["premium_reason"] in-place.
+    Devuelve (premium_strict, premium_total).
+    """
     # 1) Premium estricto
     strict_count = 0
     for sel in data:
@@ -105,6 +95,25 @@ def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
             picked += 1
 
     premium_total = sum(1 for sel in data if sel.get("premium") is True)
+    return strict_count, premium_total
+
+
+def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
+    if day is None:
+        day = date.today().isoformat()
+
+    in_path = API_DATA_DIR / "odds_risk" / day / "all.json"
+    out_dir = API_DATA_DIR / "odds_premium" / day
+    out_file = out_dir / "all.json"
+
+    if not in_path.exists():
+        raise FileNotFoundError(f"No risk file found: {in_path}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    data = json.loads(in_path.read_text(encoding="utf-8"))
+
+    strict_count, premium_total = mark_premium(data)
 
     out_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
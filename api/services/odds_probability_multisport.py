@@ -3,7 +3,17 @@ from __future__ import annotations
 import json
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    from api.services.odds_columns import OddsColumns
+except ModuleNotFoundError:
+    from services.odds_columns import OddsColumns  # type: ignore
+
+try:
+    from api.services.odds_kernel import implied_batch, implied_probability
+except ModuleNotFoundError:
+    from services.odds_kernel import implied_batch, implied_probability  # type: ignore
 
 
 # Repo root: .../bot-ultimate-prediction
@@ -11,26 +21,13 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 API_DATA_DIR = REPO_ROOT / "api" / "data"
 
 
-def enrich_odds_with_implied_probability(day: Optional[str] = None) -> Dict[str, Any]:
-    if day is None:
-        day = date.today().isoformat()
-
-    in_path = API_DATA_DIR / "odds_normalized" / day / "all.json"
-    out_dir = API_DATA_DIR / "odds_enriched" / day
-    out_file = out_dir / "all.json"
-
-    if not in_path.exists():
-        raise FileNotFoundError(f"No normalized odds file found: {in_path}")
-
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    odds_list = json.loads(in_path.read_text(encoding="utf-8"))
-
+def enrich_records(odds_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Añade p_implied a records normalizados (en memoria, sin I/O)."""
     enriched = []
     for item in odds_list:
         try:
             odds = float(item["odds"])
-            p_implied = 1 / odds if odds > 0 else None
+            p_implied = implied_probability(odds)
             if p_implied is None:
                 continue
         except Exception:
@@ -43,8 +40,36 @@ def enrich_odds_with_implied_probability(day: Optional[str] = None) -> Dict[str,
             "market": item.get("market"),
             "selection": item.get("selection"),
             "odds": odds,
-            "p_implied": round(p_implied, 4),
+            "p_implied": p_implied,
         })
+    return enriched
+
+
+def enrich_columns(cols: OddsColumns) -> OddsColumns:
+    """Versión columnar de enrich_records: añade la columna p_implied (descarta odds <= 0)."""
+    keep, p_implied = implied_batch(cols.column("odds"))
+    if len(keep) != len(cols):
+        cols = cols.take(keep)
+    cols.set_column("p_implied", p_implied)
+    return cols
+
+
+def enrich_odds_with_implied_probability(day: Optional[str] = None) -> Dict[str, Any]:
+    if day is None:
+        day = date.today().isoformat()
+
+    in_path = API_DATA_DIR / "odds_normalized" / day / "all.json"
+    out_dir = API_DATA_DIR / "odds_enriched" / day
+    out_file = out_dir / "all.json"
+
+    if not in_path.exists():
+        raise FileNotFoundError(f"No normalized odds file found: {in_path}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    odds_list = json.loads(in_path.read_text(encoding="utf-8"))
+
+    enriched = enrich_records(odds_list)
 
     out_file.write_text(json.dumps(enriched, ensure_ascii=False, indent=2), encoding="utf-8")
 
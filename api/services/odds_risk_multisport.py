@@ -3,7 +3,17 @@ from __future__ import annotations
 import json
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from api.services.odds_columns import OddsColumns
+except ModuleNotFoundError:
+    from services.odds_columns import OddsColumns  # type: ignore
+
+try:
+    from api.services import odds_kernel
+except ModuleNotFoundError:
+    from services import odds_kernel  # type: ignore
 
 STAKE_DEFAULT = 50.0
 
@@ -12,6 +22,11 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 API_DATA_DIR = REPO_ROOT / "api" / "data"
 
 
+def risk_values(odds: float, p_est: float, p_impl: float, ev: float) -> Tuple[str, float, float]:
+    """Devuelve (level, delta_p, ev_margin) sin redondear."""
+    return odds_kernel.risk_values(odds, p_est, p_impl, ev, STAKE_DEFAULT)
+
+
 def classify_risk(selection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     odds = selection.get("odds")
     p_est = selection.get("p_estimated")
@@ -21,31 +36,40 @@ def classify_risk(selection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if odds is None or p_est is None or p_impl is None or ev is None:
         return None
 
-    odds = float(odds)
-    p_est = float(p_est)
-    p_impl = float(p_impl)
-    ev = float(ev)
-
-    delta_p = p_est - p_impl
-    ev_margin = ev / STAKE_DEFAULT
-
-    if (p_est < 0.50) or (ev_margin < 0.02) or (odds > 5.00):
-        level = "EXTREME"
-    elif (p_est >= 0.78) and (odds <= 1.65) and (ev_margin >= 0.02) and (abs(delta_p) <= 0.04):
-        level = "LOW"
-    elif (p_est >= 0.65) and (odds <= 2.20) and (ev_margin >= 0.025):
-        level = "MEDIUM"
-    else:
-        level = "HIGH"
+    level, delta_p, ev_margin = risk_values(float(odds), float(p_est), float(p_impl), float(ev))
 
     return {
         "level": level,
-        "p_est": round(p_est, 4),
+        "p_est": round(float(p_est), 4),
         "delta_p": round(delta_p, 4),
         "ev_margin": round(ev_margin, 4),
     }
 
 
+def classify_records(data: List[Dict[str, Any]]) -> int:
+    """Añade sel["risk"] in-place. Devuelve cuántos records quedaron clasificados."""
+    kept = 0
+    for sel in data:
+        risk = classify_risk(sel)
+        if risk:
+            sel["risk"] = risk
+            kept += 1
+    return kept
+
+
+def classify_columns(cols: OddsColumns) -> int:
+    """Versión columnar de classify_records: añade las columnas de risk. Devuelve filas clasificadas."""
+    risk = odds_kernel.risk_batch(
+        cols.column("odds"),
+        cols.column("p_estimated"),
+        cols.column("p_implied"),
+        cols.column("ev"),
+        STAKE_DEFAULT,
+    )
+    cols.set_risk(risk["level"], risk["p_est"], risk["delta_p"], risk["ev_margin"])
+    return len(cols)
+
+
 def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
     if day is None:
         day = date.today().isoformat()
@@ -61,12 +85,7 @@ def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
 
     data = json.loads(in_path.read_text(encoding="utf-8"))
 
-    kept = 0
-    for sel in data:
-        risk = classify_risk(sel)
-        if risk:
-            sel["risk"] = risk
-            kept += 1
+    kept = classify_records(data)
 
     out_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
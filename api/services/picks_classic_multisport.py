@@ -284,20 +284,32 @@ def debug_filter_reasons(all_sel: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
-def build_picks(day: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    in_path = API_DATA_DIR / "odds_premium" / day / "all.json"
-    if not in_path.exists():
-        raise FileNotFoundError(f"No premium odds file found: {in_path}")
+def build_picks(day: str, all_sel: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    all_sel: odds premium ya en memoria (pipeline in-process). Si es None se lee
+    api/data/odds_premium/<day>/all.json.
+    """
+    if all_sel is None:
+        in_path = API_DATA_DIR / "odds_premium" / day / "all.json"
+        if not in_path.exists():
+            raise FileNotFoundError(f"No premium odds file found: {in_path}")
 
-    all_sel = json.loads(in_path.read_text(encoding="utf-8"))
+        all_sel = json.loads(in_path.read_text(encoding="utf-8"))
     if not isinstance(all_sel, list):
         raise ValueError("odds_premium/all.json no es una lista")
 
-    # Filtrado por ventana del contrato: 06:00 Europe/Madrid -> +24h (end exclusivo)
+    return select_picks(filter_cycle_window(day, all_sel))
+
+
+def filter_cycle_window(day: str, all_sel: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Filtrado por ventana del contrato: 06:00 Europe/Madrid -> +24h (end exclusivo)."""
     display_index = build_display_index(day)
     start_utc, end_utc = _cycle_window_utc(day)
-    all_sel = [x for x in all_sel if isinstance(x, dict) and _sel_in_cycle_window(x, display_index, start_utc, end_utc)]
+    return [x for x in all_sel if isinstance(x, dict) and _sel_in_cycle_window(x, display_index, start_utc, end_utc)]
 
+
+def select_picks(all_sel: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Selección de picks sobre selecciones ya filtradas por ventana (sin IO: el backtest la reutiliza)."""
     # debug siempre disponible para logs si picks=0
     dbg = debug_filter_reasons([s for s in all_sel if isinstance(s, dict)])
 
@@ -373,20 +385,18 @@ def build_picks(day: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     return out, dbg
 
 
-def main() -> None:
-    day = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].strip() else date.today().isoformat()
-
+def run_for_day(day: str, all_sel: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     out_dir = API_DATA_DIR / "picks_classic" / day
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / "all.json"
 
-    picks, dbg = build_picks(day)
+    picks, dbg = build_picks(day, all_sel=all_sel)
     out_path.write_text(json.dumps(picks, ensure_ascii=False, indent=2), encoding="utf-8")
 
     sports = sorted({str(p.get("sport")) for p in picks if p.get("sport")})
     markets_top = Counter([_market(p) for p in picks]).most_common(10)
 
-    summary = {
+    return {
         "day": day,
         "picks": len(picks),
         "sports": sports,
@@ -394,6 +404,12 @@ def main() -> None:
         "output": str(out_path),
         "debug": dbg if len(picks) == 0 else None,
     }
+
+
+def main() -> None:
+    day = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].strip() else date.today().isoformat()
+
+    summary = run_for_day(day)
     print(json.dumps(summary, ensure_ascii=False, indent=2))
 
 
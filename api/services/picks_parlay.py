@@ -1,8 +1,8 @@
+import heapq
 import json
 import sys
 from pathlib import Path
 from datetime import date
-from itertools import combinations
 from typing import List, Dict, Any, Optional, Tuple
 from api.utils.paths import data_path, ensure_dir
 
@@ -201,84 +201,237 @@ def build_best_parlay(selections: List[Dict[str, Any]], rule_key: str, rule: Dic
         except Exception:
             min_edge_sum = None
 
-    def _build_candidates(margin: float) -> List[Dict[str, Any]]:
-        candidates: List[Dict[str, Any]] = []
-        for combo in combinations(selections, int(rule["legs"])):
-            combo_list = list(combo)
-            if not valid_events(combo_list):
-                continue
+    # 1) premium  2) fallback mínimo si premium no da nada -> ambos márgenes en UNA pasada
+    margins = [value_margin]
+    if float(fallback_value_margin) != float(value_margin):
+        margins.append(fallback_value_margin)
+
+    tops = search_top_parlays(
+        selections,
+        rule_key,
+        int(rule["legs"]),
+        margins,
+        min_combined_odds=min_combined_odds,
+        max_combined_odds=max_combined_odds,
+        min_combined_prob=min_combined_prob,
+        prob_floor=prob_floor,
+        min_profit=float(rule["min_profit"]),
+        min_edge_sum=min_edge_sum,
+        top_k=1,
+    )
+    for top in tops:
+        if top:
+            return top[0]
+    return None
+
+
+# -------------------------
+# DF_PARLAY_BNB: búsqueda branch-and-bound
+# -------------------------
+# Misma semántica que enumerar itertools.combinations + filtrar + sort(reverse=True)
+# y quedarse con [0]:
+#   - las legs se recorren ordenadas por cuota ascendente y se poda con
+#     max/min_combined_odds, min_profit, la cota superior de probabilidad combinada
+#     y la de p*odds (regla de valor), usando el menor de los márgenes;
+#   - cada combinación que llega a la hoja se evalúa EXACTAMENTE como antes (legs en
+#     el orden original, mismos productos/sumas/redondeos) para cada margen;
+#   - empates: sort() es estable, así que ganaba la primera combinación en orden de
+#     combinations() = tupla de índices lexicográficamente menor. Se replica con el
+#     desempate (key, -índices) en un heap acotado de tamaño top_k.
+_BNB_SLACK = 1e-9  # las cotas se calculan en otro orden de multiplicación: nunca podar por redondeo
+
+
+def _parlay_rank_key(rule_key: str, cand: Dict[str, Any]) -> Tuple:
+    # Principal: atractivo/odds primero; Marketing: edge primero
+    if rule_key == "principal_2_legs":
+        return (
+            cand.get("combined_odds", 0.0),
+            cand.get("combined_probability", 0.0),
+            cand.get("expected_edge_sum", 0.0),
+            cand.get("consensus_score_sum", 0),
+        )
+    return (
+        cand.get("expected_edge_sum", 0.0),
+        cand.get("combined_probability", 0.0),
+        cand.get("consensus_score_sum", 0),
+        cand.get("expected_profit", 0.0),
+    )
 
-            odds = combined_odds(combo_list)
-            if odds > max_combined_odds:
-                continue
-            if odds < min_combined_odds:
-                continue
 
-            tot_prob = combined_probability(combo_list)
-            min_required_prob = max(prob_floor, (1.0 / float(odds)) + float(margin))
+def _leg_float(p: Dict[str, Any], key: str, default: float) -> float:
+    try:
+        return float(p.get(key) or default)
+    except Exception:
+        return default
+
+
+def _suffix_top(values: List[float], legs: int, combine) -> List[List[Optional[float]]]:
+    """top[s][r] = combine de los r mayores valores en values[s:] (None si no hay r)."""
+    n = len(values)
+    top: List[List[Optional[float]]] = [[None] * (legs + 1) for _ in range(n + 1)]
+    best: List[float] = []  # r mayores vistos, descendente
+    for s in range(n - 1, -1, -1):
+        best.append(values[s])
+        best.sort(reverse=True)
+        del best[legs:]
+        acc: Optional[float] = None
+        for r in range(1, len(best) + 1):
+            acc = best[0] if r == 1 else combine(acc, best[r - 1])
+            top[s][r] = acc
+    return top
+
+
+def search_top_parlays(
+    selections: List[Dict[str, Any]],
+    rule_key: str,
+    legs: int,
+    margins: List[float],
+    min_combined_odds: float,
+    max_combined_odds: float,
+    min_combined_prob: float,
+    prob_floor: float,
+    min_profit: float,
+    min_edge_sum: Optional[float],
+    top_k: int = 1,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Mejores top_k parlays (ordenados como el sort legacy) para cada margen de valor.
+    El primer margen manda: en cuanto tiene top_k candidatos se poda también por objetivo.
+    """
+    n = len(selections)
+    out: List[List[Dict[str, Any]]] = [[] for _ in margins]
+    if legs <= 0 or n < legs or not margins:
+        return out
+
+    odds = [_leg_float(s, "odds", 1.0) for s in selections]
+    probs = [_leg_float(s, "probability", 0.0) for s in selections]
+    edges = [_leg_float(s, "edge", 0.0) for s in selections]
+    events = [str(s.get("eventId")) for s in selections]
+
+    order = sorted(range(n), key=lambda i: (odds[i], i))
+    so = [odds[i] for i in order]
+    sp = [probs[i] for i in order]
+    sv = [probs[i] * odds[i] for i in order]
+    se = [edges[i] for i in order]
+    sev = [events[i] for i in order]
+
+    # cotas de productos solo valen con valores no negativos
+    nonneg = all(x > 0 for x in so) and all(x >= 0 for x in sp)
+    top_p = _suffix_top(sp, legs, lambda a, b: a * b) if nonneg else None
+    top_v = _suffix_top(sv, legs, lambda a, b: a * b) if nonneg else None
+    top_e = _suffix_top(se, legs, lambda a, b: a + b)
+    # producto de las r mayores cuotas (las últimas del orden ascendente)
+    max_odds_r = [1.0] * (legs + 1)
+    for r in range(1, legs + 1):
+        max_odds_r[r] = max_odds_r[r - 1] * so[n - r]
+
+    m_min = min(float(m) for m in margins)
+    odds_lb = max(float(min_combined_odds), (float(min_profit) + STAKE) / STAKE)
+    odds_ub = float(max_combined_odds)
+    req_prob = max(float(min_combined_prob), float(prob_floor))
+    if odds_ub > 0:
+        req_prob = max(req_prob, 1.0 / odds_ub + m_min)
+    req_value = 1.0 + m_min * odds_lb if m_min >= 0 else 0.0
+
+    lo_slack = 1.0 - _BNB_SLACK
+    hi_slack = 1.0 + _BNB_SLACK
+    heaps: List[List[Tuple]] = [[] for _ in margins]
+    principal = rule_key == "principal_2_legs"
+
+    def threshold() -> Optional[Tuple]:
+        h = heaps[0]
+        return h[0][0] if len(h) >= top_k else None
+
+    def leaf(chosen: List[int]) -> None:
+        idx = sorted(order[t] for t in chosen)
+        combo_list = [selections[i] for i in idx]
+
+        c_odds = combined_odds(combo_list)
+        if c_odds > max_combined_odds or c_odds < min_combined_odds:
+            return
+        tot_prob = combined_probability(combo_list)
+        profit = profit_from_odds(c_odds)
+        if profit < float(min_profit):
+            return
+
+        total_edge = 0.0
+        total_cons = 0
+        for p in combo_list:
+            try:
+                total_edge += float(p.get("edge") or 0.0)
+            except Exception:
+                total_edge += 0.0
+            total_cons += _consensus_rank(p.get("consensus"))
+        if min_edge_sum is not None and total_edge < float(min_edge_sum):
+            return
+
+        cand = None
+        tie = tuple(-i for i in idx)
+        for mi, margin in enumerate(margins):
+            min_required_prob = max(prob_floor, (1.0 / float(c_odds)) + float(margin))
             if tot_prob < max(min_combined_prob, min_required_prob):
                 continue
-
-            profit = profit_from_odds(odds)
-            if profit < float(rule["min_profit"]):
-                continue
-
-            total_edge = 0.0
-            total_cons = 0
-            for p in combo_list:
-                try:
-                    total_edge += float(p.get("edge") or 0.0)
-                except Exception:
-                    total_edge += 0.0
-                total_cons += _consensus_rank(p.get("consensus"))
-
-            if min_edge_sum is not None and total_edge < float(min_edge_sum):
+            if cand is None:
+                cand = {
+                    "picks": combo_list,
+                    "combined_odds": round(float(c_odds), 4),
+                    "combined_probability": round(float(tot_prob), 6),
+                    "stake": float(STAKE),
+                    "expected_profit": round(float(profit), 2),
+                    "expected_edge_sum": round(float(total_edge), 4),
+                    "consensus_score_sum": int(total_cons),
+                }
+                rank = (_parlay_rank_key(rule_key, cand), tie)
+            h = heaps[mi]
+            if len(h) < top_k:
+                heapq.heappush(h, (rank, cand))
+            elif rank > h[0][0]:
+                heapq.heapreplace(h, (rank, cand))
+
+    def dfs(r: int, s: int, o: float, p: float, v: float, e: float, chosen: List[int], used: set) -> None:
+        if r == 0:
+            leaf(chosen)
+            return
+        if s > n - r:
+            return
+        if nonneg:
+            if o * max_odds_r[r] < odds_lb * lo_slack:
+                return
+            if p * top_p[s][r] < req_prob * lo_slack:
+                return
+            if v * top_v[s][r] < req_value * lo_slack:
+                return
+
+        thr = threshold()
+        if thr is not None:
+            best_key = thr[0]
+            if principal:
+                ub = round(o * max_odds_r[r] * hi_slack, 4) if nonneg else None
+            else:
+                ub = round(e + top_e[s][r] + _BNB_SLACK, 4)
+            if ub is not None and ub < best_key[0]:
+                return
+
+        for t in range(s, n - r + 1):
+            # mínima cuota alcanzable eligiendo t y las siguientes (orden ascendente)
+            lo = o
+            for j in range(t, t + r):
+                lo *= so[j]
+            if nonneg and lo > odds_ub * hi_slack:
+                break
+            if sev[t] in used:
                 continue
+            chosen.append(t)
+            used.add(sev[t])
+            dfs(r - 1, t + 1, o * so[t], p * sp[t], v * sv[t], e + se[t], chosen, used)
+            used.discard(sev[t])
+            chosen.pop()
 
-            candidates.append({
-                "picks": combo_list,
-                "combined_odds": round(float(odds), 4),
-                "combined_probability": round(float(tot_prob), 6),
-                "stake": float(STAKE),
-                "expected_profit": round(float(profit), 2),
-                "expected_edge_sum": round(float(total_edge), 4),
-                "consensus_score_sum": int(total_cons),
-            })
-        return candidates
-
-    # 1) premium
-    candidates = _build_candidates(value_margin)
-
-    # 2) fallback mínimo si premium no da nada
-    if (not candidates) and (float(fallback_value_margin) != float(value_margin)):
-        candidates = _build_candidates(fallback_value_margin)
+    dfs(legs, 0, 1.0, 1.0, 1.0, 0.0, [], set())
 
-    if not candidates:
-        return None
-
-    # Principal: atractivo/odds primero; Marketing: edge primero
-    if rule_key == "principal_2_legs":
-        candidates.sort(
-            key=lambda x: (
-                x.get("combined_odds", 0.0),
-                x.get("combined_probability", 0.0),
-                x.get("expected_edge_sum", 0.0),
-                x.get("consensus_score_sum", 0),
-            ),
-            reverse=True,
-        )
-    else:
-        candidates.sort(
-            key=lambda x: (
-                x.get("expected_edge_sum", 0.0),
-                x.get("combined_probability", 0.0),
-                x.get("consensus_score_sum", 0),
-                x.get("expected_profit", 0.0),
-            ),
-            reverse=True,
-        )
-
-    return candidates[0]
+    for mi, h in enumerate(heaps):
+        out[mi] = [cand for _rank, cand in sorted(h, key=lambda x: x[0], reverse=True)]
+    return out
 
 def _get_pick_id(pick: Dict[str, Any]) -> str:
     """Get unique pick identifier (sport:eventId:market:selection)"""
@@ -299,20 +452,26 @@ def _try_sources_for_rule(
     rule_key: str, 
     rule: Dict[str, Any],
     used_picks_ids: set = None,
+    pools: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+    classic: Optional[List[Dict[str, Any]]] = None,
 ) -> Tuple[Optional[Dict[str, Any]], str]:
     """
     Build best parlay for a rule, excluding picks already used in other parlays.
     This implements DF_PARLAY_NO_DUPLICATION (A+B strategy):
     - Exclude picks from 4-legs when building 3-legs/2-legs
     - Also try alternative picks with similar EV if top choice has conflicts
+
+    pools/classic: (inflated, parlay_eligible) y picks classic ya en memoria (backtest);
+    si son None se leen de api/data.
     """
     if used_picks_ids is None:
         used_picks_ids = set()
     
     guard = PARLAY_GUARDRAILS[rule_key]
 
-    inflated = load_pool(day, "inflated")
-    eligible = load_pool(day, "parlay_eligible")
+    if pools is None:
+        pools = (load_pool(day, "inflated"), load_pool(day, "parlay_eligible"))
+    inflated, eligible = pools
 
     if inflated or eligible:
         # Remove used picks from pools
@@ -331,7 +490,8 @@ def _try_sources_for_rule(
 
         return None, "pool_no_match"
 
-    classic = load_classic_selections(day)
+    if classic is None:
+        classic = load_classic_selections(day)
     # Remove used picks from classic selections
     classic_filtered = _filter_out_picks(classic, used_picks_ids)
     classic_f = base_filter_classic(classic_filtered, rule["min_odds"])
@@ -339,45 +499,51 @@ def _try_sources_for_rule(
     return p, "classic"
 
 
-def run(day: str) -> None:
+def build_parlays(
+    day: str,
+    pools: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+    classic: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
     """
     DF_PARLAY_NO_DUPLICATION: Generate parlays while avoiding repetition.
-    
+
     Order: 4-legs first (marketing_4), then 3-legs (marketing_3), then 2-legs (principal)
     Each uses picks NOT in previous ones.
+    Returns (marketing_parlays, principal) without writing anything.
     """
+    if pools is None:
+        pools = (load_pool(day, "inflated"), load_pool(day, "parlay_eligible"))
+
     used_picks_ids = set()
     marketing_parlays: List[Dict[str, Any]] = []
-    
-    # 1) 4-legs first (highest risk, most picks used)
-    parlay_4, source_4 = _try_sources_for_rule(day, "marketing_4_legs", PARLAY_RULES["marketing_4_legs"], used_picks_ids)
-    if parlay_4:
-        parlay_4["type"] = "marketing_4_legs"
-        parlay_4["day"] = day
-        parlay_4["source"] = source_4
-        marketing_parlays.append(parlay_4)
-        # Mark 4-leg picks as used
-        for pick in parlay_4.get("picks", []):
-            used_picks_ids.add(_get_pick_id(pick))
 
+    # 1) 4-legs first (highest risk, most picks used)
     # 2) 3-legs (excluding 4-leg picks)
-    parlay_3, source_3 = _try_sources_for_rule(day, "marketing_3_legs", PARLAY_RULES["marketing_3_legs"], used_picks_ids)
-    if parlay_3:
-        parlay_3["type"] = "marketing_3_legs"
-        parlay_3["day"] = day
-        parlay_3["source"] = source_3
-        marketing_parlays.append(parlay_3)
-        # Mark 3-leg picks as used
-        for pick in parlay_3.get("picks", []):
-            used_picks_ids.add(_get_pick_id(pick))
-    
+    for rule_key in ("marketing_4_legs", "marketing_3_legs"):
+        parlay, source = _try_sources_for_rule(day, rule_key, PARLAY_RULES[rule_key], used_picks_ids, pools, classic)
+        if parlay:
+            parlay["type"] = rule_key
+            parlay["day"] = day
+            parlay["source"] = source
+            marketing_parlays.append(parlay)
+            # Mark picks as used
+            for pick in parlay.get("picks", []):
+                used_picks_ids.add(_get_pick_id(pick))
+
     # 3) 2-legs principal (excluding 4-leg and 3-leg picks)
-    principal, principal_source = _try_sources_for_rule(day, "principal_2_legs", PARLAY_RULES["principal_2_legs"], used_picks_ids)
+    principal, principal_source = _try_sources_for_rule(day, "principal_2_legs", PARLAY_RULES["principal_2_legs"], used_picks_ids, pools, classic)
     if principal:
         principal["type"] = "principal_2_legs"
         principal["day"] = day
         principal["source"] = principal_source
 
+    return marketing_parlays, principal
+
+
+def run(day: str) -> None:
+    marketing_parlays, principal = build_parlays(day)
+
+    if principal:
         featured_path = Path(f"api/data/picks_parlay_featured/{day}")
         featured_path.mkdir(parents=True, exist_ok=True)
         with open(featured_path / "featured_parlay.json", "w", encoding="utf-8") as f:
@@ -388,11 +554,12 @@ def run(day: str) -> None:
     with open(output_path / "parlays.json", "w", encoding="utf-8") as f:
         json.dump({"parlays": marketing_parlays}, f, ensure_ascii=False, indent=2)
 
+    kinds = {p["type"] for p in marketing_parlays}
     print(
         f"✅ Parlays generados ({day}) — "
         f"principal: {'sí' if principal else 'no'}, "
-        f"marketing 4-legs: {'sí' if parlay_4 else 'no'}, "
-        f"marketing 3-legs: {'sí' if parlay_3 else 'no'}"
+        f"marketing 4-legs: {'sí' if 'marketing_4_legs' in kinds else 'no'}, "
+        f"marketing 3-legs: {'sí' if 'marketing_3_legs' in kinds else 'no'}"
     )
 
 
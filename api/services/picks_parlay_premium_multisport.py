@@ -2,8 +2,8 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 from datetime import date
-from itertools import combinations
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -25,6 +25,9 @@ BOOM_ALLOWED_RISK = {"MEDIUM", "HIGH"}
 BOOM_TARGET_ODDS_1 = 3.0
 BOOM_TARGET_ODDS_2 = 2.5
 
+# Candidatos (mejor pick por evento, prob desc) que entran en la búsqueda de triples
+BOOM_MAX_CANDIDATES = int(os.environ.get("BOOM_MAX_CANDIDATES", "60"))
+
 OUTPUT_FILENAMES = {
     "SAFE_2_A": "parlay_safe_2_a.json",
     "SAFE_2_B": "parlay_safe_2_b.json",
@@ -198,14 +201,112 @@ def build_safe_parlays(all_picks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return out
 
 
-def _diversity_markets_ok(legs: List[Dict[str, Any]]) -> bool:
-    markets = {_market_key(p) for p in legs}
-    return len(markets) >= 2
+# DF_BOOM_SINGLE_PASS: niveles de búsqueda BOOM_3 en orden de preferencia.
+# (odds objetivo, diversidad, note). El primero con triple gana.
+_BOOM_TIERS: Tuple[Tuple[Optional[float], Optional[str], Optional[str]], ...] = (
+    (BOOM_TARGET_ODDS_1, "markets", None),
+    (BOOM_TARGET_ODDS_2, "markets", None),
+    (BOOM_TARGET_ODDS_1, "sports", "Fallback: mismo mercado, variedad por deporte"),
+    (BOOM_TARGET_ODDS_2, "sports", "Fallback: mismo mercado, variedad por deporte"),
+    (None, "sports", "Fallback final: mejor probabilidad"),
+    (None, None, "Fallback final: sin diversidad disponible"),
+)
+
+
+def _codes(values: List[Any]) -> List[int]:
+    table: Dict[Any, int] = {}
+    return [table.setdefault(v, len(table)) for v in values]
+
+
+def _boom_search(candidates: List[Dict[str, Any]]) -> List[Optional[Tuple[float, float, Tuple[int, int, int]]]]:
+    """
+    Una sola pasada sobre los triples (i<j<k, mismo orden que combinations) que lleva
+    el mejor (prob, odds) de cada nivel de _BOOM_TIERS a la vez.
+
+    candidates viene ordenado por prob desc, así que prob(i,j,k) no crece con k ni con j:
+    en cuanto la cota de prob queda por debajo del mejor del nivel, ese nivel se descarta
+    para el resto del prefijo. Los niveles con odds objetivo se podan además con la odds
+    máxima alcanzable (max de odds del sufijo). Solo se poda con cota estrictamente menor,
+    así que los empates se resuelven igual que antes (gana el primer triple).
+    """
+    n = len(candidates)
+    odds = [_odds(p) for p in candidates]
+    prob = [_prob(p) for p in candidates]
+    ev = _codes([_event_key(p) for p in candidates])
+    mkt = _codes([_market_key(p) for p in candidates])
+    spt = _codes([_s(p.get("sport")).lower() for p in candidates])
+
+    # Las cotas por producto solo valen con factores positivos
+    prune_prob = all(x > 0 for x in prob) and all(prob[x] >= prob[x + 1] for x in range(n - 1))
+    prune_odds = all(x > 0 for x in odds)
+
+    # suf_odds[x] = max(odds[x:])
+    suf_odds = [0.0] * (n + 1)
+    for x in range(n - 1, -1, -1):
+        suf_odds[x] = max(odds[x], suf_odds[x + 1])
+
+    # Sin dos mercados (o deportes) distintos en todo el pool el nivel no tiene triples
+    distinct = {"markets": len(set(mkt)), "sports": len(set(spt))}
+    tiers = [t for t, (_, mode, _) in enumerate(_BOOM_TIERS) if mode is None or distinct[mode] >= 2]
+    targets = [t[0] for t in _BOOM_TIERS]
+    modes = [t[1] for t in _BOOM_TIERS]
+    best: List[Optional[Tuple[float, float, Tuple[int, int, int]]]] = [None] * len(_BOOM_TIERS)
+
+    def prob_live(live: List[int], bound: float) -> List[int]:
+        if not prune_prob:
+            return live
+        return [t for t in live if best[t] is None or bound >= best[t][0]]
+
+    def odds_live(live: List[int], bound: float) -> List[int]:
+        if not prune_odds:
+            return live
+        return [t for t in live if targets[t] is None or bound >= targets[t]]
+
+    for i in range(n - 2):
+        pl_i = prob_live(tiers, (prob[i] * prob[i + 1]) * prob[i + 2])
+        if not pl_i:
+            break
+        live_i = odds_live(pl_i, (odds[i] * suf_odds[i + 1]) * suf_odds[i + 1])
+        if not live_i:
+            continue
 
+        for j in range(i + 1, n - 1):
+            if ev[j] == ev[i]:
+                continue
+            p_ij = prob[i] * prob[j]
+            o_ij = odds[i] * odds[j]
+            pl_j = prob_live(live_i, p_ij * prob[j + 1])
+            if not pl_j:
+                break
+            live = odds_live(pl_j, o_ij * suf_odds[j + 1])
+            if not live:
+                continue
+            same_mkt_ij = mkt[i] == mkt[j]
+            same_spt_ij = spt[i] == spt[j]
 
-def _diversity_sports_ok(legs: List[Dict[str, Any]]) -> bool:
-    sports = {_s(p.get("sport")).lower() for p in legs}
-    return len(sports) >= 2
+            for k in range(j + 1, n):
+                if ev[k] == ev[i] or ev[k] == ev[j]:
+                    continue
+                pr = p_ij * prob[k]
+                o = o_ij * odds[k]
+                if prune_prob:
+                    live = [t for t in live if best[t] is None or pr >= best[t][0]]
+                    if not live:
+                        break
+                for t in live:
+                    mode = modes[t]
+                    if mode == "markets" and same_mkt_ij and mkt[k] == mkt[i]:
+                        continue
+                    if mode == "sports" and same_spt_ij and spt[k] == spt[i]:
+                        continue
+                    target = targets[t]
+                    if target is not None and o < target:
+                        continue
+                    b = best[t]
+                    if b is None or (pr, o) > (b[0], b[1]):
+                        best[t] = (pr, o, (i, j, k))
+
+    return best
 
 
 def build_boom_parlay(all_picks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -215,91 +316,33 @@ def build_boom_parlay(all_picks: List[Dict[str, Any]]) -> Optional[Dict[str, Any
     per_event = _best_pick_per_event(pool)
     per_event.sort(key=lambda p: (_prob(p), _ev(p), _odds(p)), reverse=True)
 
-    K = min(60, len(per_event))
+    K = min(BOOM_MAX_CANDIDATES, len(per_event))
     candidates = per_event[:K]
     if len(candidates) < 3:
         return None
 
-    def search(target_odds: float, diversity_mode: str) -> Optional[List[Dict[str, Any]]]:
-        best_local: Optional[List[Dict[str, Any]]] = None
-        best_score: Tuple[float, float] = (-1.0, -1.0)  # (prob, odds)
-
-        for a, b, c in combinations(candidates, 3):
-            legs = [a, b, c]
-            if len({_event_key(x) for x in legs}) != 3:
-                continue
-
-            if diversity_mode == "markets":
-                if not _diversity_markets_ok(legs):
-                    continue
-            elif diversity_mode == "sports":
-                if not _diversity_sports_ok(legs):
-                    continue
-
-            o = combined_odds(legs)
-            if o < target_odds:
-                continue
-            pr = combined_prob(legs)
-            score = (pr, o)
-            if score > best_score:
-                best_score = score
-                best_local = legs
-
-        return best_local
-
-    legs = search(BOOM_TARGET_ODDS_1, "markets") or search(BOOM_TARGET_ODDS_2, "markets")
-    if legs:
-        return make_parlay("BOOM_3", legs, "Boom (3 piernas)")
-
-    legs = search(BOOM_TARGET_ODDS_1, "sports") or search(BOOM_TARGET_ODDS_2, "sports")
-    if legs:
-        return make_parlay("BOOM_3", legs, "Boom (3 piernas)", note="Fallback: mismo mercado, variedad por deporte")
-
-    # 3) Último fallback: mejor por probabilidad
-    best_local = None
-    best_score = (-1.0, -1.0)
-    for a, b, c in combinations(candidates, 3):
-        legs = [a, b, c]
-        if len({_event_key(x) for x in legs}) != 3:
-            continue
-        if not _diversity_sports_ok(legs):
-            continue
-        pr = combined_prob(legs)
-        o = combined_odds(legs)
-        score = (pr, o)
-        if score > best_score:
-            best_score = score
-            best_local = legs
-    if best_local:
-        return make_parlay("BOOM_3", best_local, "Boom (3 piernas)", note="Fallback final: mejor probabilidad")
-
-    best_local = None
-    best_score = (-1.0, -1.0)
-    for a, b, c in combinations(candidates, 3):
-        legs = [a, b, c]
-        if len({_event_key(x) for x in legs}) != 3:
-            continue
-        pr = combined_prob(legs)
-        o = combined_odds(legs)
-        score = (pr, o)
-        if score > best_score:
-            best_score = score
-            best_local = legs
-    if best_local:
-        return make_parlay("BOOM_3", best_local, "Boom (3 piernas)", note="Fallback final: sin diversidad disponible")
+    for (_, _, note), hit in zip(_BOOM_TIERS, _boom_search(candidates)):
+        if hit is not None:
+            legs = [candidates[x] for x in hit[2]]
+            return make_parlay("BOOM_3", legs, "Boom (3 piernas)", note=note)
 
     return None
 
 
-def run_for_day(day: Optional[str] = None) -> Dict[str, Any]:
+def run_for_day(day: Optional[str] = None, all_picks: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    all_picks: odds premium ya en memoria (pipeline in-process). Si es None se lee
+    api/data/odds_premium/<day>/all.json.
+    """
     if day is None:
         day = date.today().isoformat()
 
-    in_path = API_DATA_DIR / "odds_premium" / day / "all.json"
-    if not in_path.exists():
-        raise FileNotFoundError(f"No existe odds_premium: {in_path}")
+    if all_picks is None:
+        in_path = API_DATA_DIR / "odds_premium" / day / "all.json"
+        if not in_path.exists():
+            raise FileNotFoundError(f"No existe odds_premium: {in_path}")
 
-    all_picks = json.loads(in_path.read_text(encoding="utf-8"))
+        all_picks = json.loads(in_path.read_text(encoding="utf-8"))
     if not isinstance(all_picks, list):
         raise ValueError("odds_premium/all.json no es una lista")
 
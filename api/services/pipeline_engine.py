@@ -0,0 +1,603 @@
+"""
+DF_INPROCESS_PIPELINE: motor in-process para la cadena de odds del daily pipeline.
+
+Ejecuta normalization -> probability -> estimation -> EV -> risk -> premium -> pools -> picks
+en UN solo intérprete (sin subprocess por etapa) y pasa las listas de records en memoria.
+
+Los all.json intermedios (odds_normalized, odds_enriched, ...) pasan a ser checkpoints
+opcionales: se siguen escribiendo por defecto porque los usan los SKIP del pipeline y los
+scripts de diagnóstico, pero con checkpoints=False solo se escriben los artefactos finales
+(pools + picks) que consume el contrato.
+
+DF_STAGE_CACHE: con use_cache=True cada etapa se salta si su clave de contenido
+(inputs + código + constantes, ver stage_cache.py) coincide con la del manifest y su
+salida no se tocó desde entonces, aunque el pipeline vaya con --force.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from api.services import (
+    display_enrichment,
+    inflated_pool_builder,
+    odds_columns,
+    odds_estimation_multisport,
+    odds_ev_multisport,
+    odds_kernel,
+    odds_normalization_multisport,
+    odds_premium_multisport,
+    odds_probability_multisport,
+    odds_risk_multisport,
+    picks_classic_multisport,
+    picks_parlay_premium_multisport,
+)
+from api.services.odds_columns import OddsColumns, write_records_json
+from api.services.stage_cache import StageManifest, dir_digest, stage_key
+from api.utils.paths import data_path, ensure_dir
+
+Records = List[Dict[str, Any]]
+EventKey = Tuple[str, str]  # (sport, eventId)
+# DF_ODDS_COLUMNS: de normalization a risk los datos viajan como OddsColumns
+Rows = Union[Records, OddsColumns]
+Log = Callable[[str], None]
+
+
+# -------------------------
+# "ok" checks (compartidos con daily_pipeline.py)
+# -------------------------
+def dir_has_nonempty_json(dirpath: Path) -> bool:
+    if not dirpath.exists() or not dirpath.is_dir():
+        return False
+    for p in sorted(dirpath.glob("*.json")):
+        try:
+            if p.stat().st_size > 2:  # > "[]"
+                return True
+        except Exception:
+            pass
+    return False
+
+
+def file_nonempty(p: Path) -> bool:
+    return p.exists() and p.is_file() and p.stat().st_size > 2
+
+
+def json_file_has_nonempty_list_key(p: Path, key: str) -> bool:
+    if not file_nonempty(p):
+        return False
+    try:
+        obj = json.loads(p.read_text(encoding="utf-8"))
+        v = obj.get(key) if isinstance(obj, dict) else None
+        return isinstance(v, list) and len(v) > 0
+    except Exception:
+        return False
+
+
+# -------------------------
+# Checkpoints
+# -------------------------
+def _read_checkpoint(path: Path) -> Records:
+    if not path.exists():
+        raise FileNotFoundError(f"Missing checkpoint: {path}")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"Checkpoint no es una lista: {path}")
+    return data
+
+
+def _write_checkpoint(path: Path, rows: Rows) -> None:
+    # mismo formato que escribían los scripts por separado (json indent=2), en streaming
+    ensure_dir(path.parent)
+    write_records_json(path, rows.iter_records() if isinstance(rows, OddsColumns) else rows)
+
+
+def _as_columns(rows: Optional[Rows]) -> OddsColumns:
+    if isinstance(rows, OddsColumns):
+        return rows
+    return OddsColumns.from_records(rows or [])
+
+
+def _as_records(rows: Optional[Rows]) -> Records:
+    if isinstance(rows, OddsColumns):
+        return rows.to_records()
+    return rows or []
+
+
+# -------------------------
+# Etapas
+# -------------------------
+def _run_normalization(day: str, _rows: Optional[Rows]) -> Rows:
+    cols, _counts, _sports = odds_normalization_multisport.collect_normalized_columns(day)
+    return cols
+
+
+def _run_probability(day: str, rows: Optional[Rows]) -> Rows:
+    return odds_probability_multisport.enrich_columns(_as_columns(rows))
+
+
+def _run_estimation(day: str, rows: Optional[Rows]) -> Rows:
+    return odds_estimation_multisport.estimate_columns(_as_columns(rows))
+
+
+def _run_ev(day: str, rows: Optional[Rows]) -> Rows:
+    return odds_ev_multisport.calculate_ev_columns(_as_columns(rows), stake=odds_ev_multisport.DEFAULT_STAKE)
+
+
+def _run_risk(day: str, rows: Optional[Rows]) -> Rows:
+    cols = _as_columns(rows)
+    odds_risk_multisport.classify_columns(cols)
+    return cols
+
+
+def _run_premium(day: str, rows: Optional[Rows]) -> Rows:
+    # premium y lo que viene detrás (pools/picks) trabajan sobre dicts
+    data = _as_records(rows)
+    odds_premium_multisport.mark_premium(data)
+    return data
+
+
+def _run_pools(day: str, rows: Optional[Rows]) -> Rows:
+    records = _as_records(rows)
+    inflated_pool_builder.build_pools(day, rows=records)
+    return records
+
+
+def _run_picks_parlay(day: str, rows: Optional[Rows]) -> Rows:
+    records = _as_records(rows)
+    summary = picks_parlay_premium_multisport.run_for_day(day, all_picks=records)
+    print(json.dumps(summary, ensure_ascii=False), flush=True)
+    return records
+
+
+def _run_picks_classic(day: str, rows: Optional[Rows]) -> Rows:
+    records = _as_records(rows)
+    summary = picks_classic_multisport.run_for_day(day, all_sel=records)
+    compact = {k: summary.get(k) for k in ("day", "picks", "sports", "output", "debug")}
+    print(json.dumps(compact, ensure_ascii=False), flush=True)
+    return records
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[str, Optional[Rows]], Rows]
+    output: Callable[[str], Path]
+    # etapa cuya salida consume (None = lee del disco por su cuenta)
+    input_stage: Optional[str] = None
+    # True: la salida es un all.json de records (checkpoint opcional, recargable)
+    checkpoint: bool = True
+    # módulos cuyo código/constantes forman parte de la clave de cache
+    modules: Tuple[ModuleType, ...] = ()
+    # directorios de api/data/<dir>/<day> que la etapa lee directamente
+    external_inputs: Tuple[str, ...] = ()
+
+
+def _odds_all(stage_dir: str) -> Callable[[str], Path]:
+    return lambda day: data_path(stage_dir, day, "all.json")
+
+
+STAGES: List[Stage] = [
+    Stage(
+        "odds_normalization_multisport",
+        _run_normalization,
+        _odds_all("odds_normalized"),
+        modules=(odds_normalization_multisport, odds_columns, odds_kernel),
+        external_inputs=("odds",),
+    ),
+    # NOTE: la etapa de probabilidad siempre escribió en odds_enriched/ (no odds_probability/)
+    Stage(
+        "odds_probability_multisport",
+        _run_probability,
+        _odds_all("odds_enriched"),
+        "odds_normalization_multisport",
+        modules=(odds_probability_multisport, odds_columns, odds_kernel),
+    ),
+    Stage(
+        "odds_estimation_multisport",
+        _run_estimation,
+        _odds_all("odds_estimated"),
+        "odds_probability_multisport",
+        modules=(odds_estimation_multisport, odds_columns, odds_kernel),
+    ),
+    Stage(
+        "odds_ev_multisport",
+        _run_ev,
+        _odds_all("odds_ev"),
+        "odds_estimation_multisport",
+        modules=(odds_ev_multisport, odds_columns, odds_kernel),
+    ),
+    Stage(
+        "odds_risk_multisport",
+        _run_risk,
+        _odds_all("odds_risk"),
+        "odds_ev_multisport",
+        modules=(odds_risk_multisport, odds_columns, odds_kernel),
+    ),
+    Stage(
+        "odds_premium_multisport",
+        _run_premium,
+        _odds_all("odds_premium"),
+        "odds_risk_multisport",
+        modules=(odds_premium_multisport,),
+    ),
+    Stage(
+        "inflated_pool_builder",
+        _run_pools,
+        lambda day: data_path("pools", day, "parlay_eligible.json"),
+        "odds_premium_multisport",
+        checkpoint=False,
+        modules=(inflated_pool_builder,),
+    ),
+    # los picks filtran por ventana 06:00->06:00 con el display index (events/<day>)
+    Stage(
+        "picks_parlay_premium_multisport",
+        _run_picks_parlay,
+        lambda day: data_path("picks_parlay", day, "parlays.json"),
+        "odds_premium_multisport",
+        checkpoint=False,
+        modules=(picks_parlay_premium_multisport, display_enrichment),
+        external_inputs=("events",),
+    ),
+    Stage(
+        "picks_classic_multisport",
+        _run_picks_classic,
+        lambda day: data_path("picks_classic", day),
+        "odds_premium_multisport",
+        checkpoint=False,
+        modules=(picks_classic_multisport, display_enrichment),
+        external_inputs=("events",),
+    ),
+]
+
+STAGES_BY_NAME: Dict[str, Stage] = {s.name: s for s in STAGES}
+
+
+def stage_output_ok(stage: Stage, day: str) -> bool:
+    out = stage.output(day)
+    if out.is_dir():
+        return dir_has_nonempty_json(out)
+    if stage.name == "picks_parlay_premium_multisport":
+        return json_file_has_nonempty_list_key(out, "parlays")  # FIX: no basta con "exists"
+    return file_nonempty(out) if out.suffix == ".json" else out.exists()
+
+
+def _default_log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def _stage_keys(day: str) -> Dict[str, str]:
+    keys: Dict[str, str] = {}
+    digests: Dict[str, Optional[str]] = {}
+    for stage in STAGES:
+        inputs: Dict[str, Optional[str]] = {}
+        for d in stage.external_inputs:
+            if d not in digests:
+                digests[d] = dir_digest(data_path(d, day))
+            inputs[d] = digests[d]
+        upstream = keys.get(stage.input_stage) if stage.input_stage else None
+        keys[stage.name] = stage_key(stage.name, upstream, inputs, stage.modules)
+    return keys
+
+
+def run_chain(
+    day: str,
+    recompute: bool = False,
+    checkpoints: bool = True,
+    log: Optional[Log] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Ejecuta la cadena completa en proceso.
+
+    recompute=False conserva la semántica del pipeline: una etapa con salida válida se
+    salta, pero en cuanto corre una etapa se recalcula todo lo que va detrás.
+    Con use_cache=True además se salta cualquier etapa cuya clave de contenido no cambió
+    (también con recompute=True); use_cache=False fuerza la cadena entera.
+    Las etapas saltadas se recargan desde su checkpoint solo si alguien las necesita.
+    """
+    log = log or _default_log
+    memo: Dict[str, Rows] = {}
+    summary: Dict[str, Any] = {"day": day, "stages": []}
+
+    manifest = StageManifest.load(day) if use_cache else None
+    keys = _stage_keys(day) if use_cache else {}
+
+    def _input_for(stage: Stage) -> Optional[Rows]:
+        if stage.input_stage is None:
+            return None
+        if stage.input_stage not in memo:
+            src = STAGES_BY_NAME[stage.input_stage]
+            memo[stage.input_stage] = _read_checkpoint(src.output(day))
+        return memo[stage.input_stage]
+
+    for stage in STAGES:
+        out = stage.output(day)
+        key = keys.get(stage.name)
+
+        if manifest is not None and key and manifest.is_fresh(stage.name, key, out) and stage_output_ok(stage, day):
+            log(f"SKIP {stage.name} (unchanged): {out}")
+            summary["stages"].append({"stage": stage.name, "status": "cached"})
+            continue
+
+        # sin entrada en el manifest (p.ej. primer run) cae en el check clásico de "exists"
+        known = manifest is not None and manifest.has_entry(stage.name)
+        if not recompute and not known and stage_output_ok(stage, day):
+            log(f"SKIP {stage.name} (exists): {out}")
+            summary["stages"].append({"stage": stage.name, "status": "skipped"})
+            continue
+
+        ensure_dir(out if (out.is_dir() or not out.suffix) else out.parent)
+        log(f"DO   {stage.name} -> {out}")
+        t0 = time.perf_counter()
+        records = stage.run(day, _input_for(stage))
+        if stage.checkpoint:
+            memo[stage.name] = records
+            if checkpoints:
+                _write_checkpoint(out, records)
+        elapsed = time.perf_counter() - t0
+        log(f"OK   {stage.name} records={len(records)} secs={elapsed:.2f}")
+        summary["stages"].append({"stage": stage.name, "status": "ran", "records": len(records), "secs": round(elapsed, 3)})
+
+        if manifest is not None and key:
+            if stage.checkpoint and not checkpoints:
+                # la salida en disco no corresponde a esta clave
+                manifest.forget(stage.name)
+            else:
+                manifest.record(stage.name, key, out)
+            manifest.save()
+
+        # once we run any downstream step, keep recomputing the rest
+        recompute = True
+
+    return summary
+
+
+# -------------------------
+# DF_ODDS_DELTA: refresh intradía solo de los eventos cuyas odds cambiaron
+# -------------------------
+# normalization -> risk son fila a fila: recalcular solo las filas de los eventos tocados y
+# mezclarlas (en el orden de la normalización) con el resto del checkpoint da exactamente
+# lo mismo que la cadena completa. premium tiene un fallback global (top-2 del día), así
+# que se vuelve a marcar sobre la lista completa (barato: sin recálculo de probabilidades).
+_ROW_STAGES = (
+    "odds_normalization_multisport",
+    "odds_probability_multisport",
+    "odds_estimation_multisport",
+    "odds_ev_multisport",
+    "odds_risk_multisport",
+)
+_PREMIUM_STAGE = "odds_premium_multisport"
+_POOLS_STAGE = "inflated_pool_builder"
+_PICK_STAGES = ("picks_parlay_premium_multisport", "picks_classic_multisport")
+
+
+def _event_of(rec: Dict[str, Any]) -> EventKey:
+    return (str(rec.get("sport") or ""), str(rec.get("eventId") or ""))
+
+
+# separador entre records en el formato de write_records_json (dentro de un record las
+# líneas van indentadas con 4+ espacios, así que no puede aparecer)
+_RECORD_SEP = ",\n  {"
+
+
+def _load_chunks(path: Path) -> Tuple[Records, Optional[List[str]]]:
+    """Records del checkpoint + el texto de cada uno (None si el formato no es el esperado)."""
+    text = path.read_text(encoding="utf-8")
+    old = json.loads(text)
+    if not isinstance(old, list):
+        raise ValueError(f"Checkpoint no es una lista: {path}")
+    chunks = text[4:-2].split(_RECORD_SEP) if old else []
+    if len(chunks) != len(old):
+        return old, None
+    for i in range(1, len(chunks)):
+        chunks[i] = "{" + chunks[i]
+    return old, chunks
+
+
+def _merge_chunks(path: Path, new: Records, touched: Set[EventKey]) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+    """(record, texto original | None) del checkpoint parcheado, en el orden de la normalización."""
+    old, chunks = _load_chunks(path)
+    sort_key = odds_normalization_multisport.record_sort_key
+    kept = (
+        (sort_key(r), r, chunks[i] if chunks is not None else None)
+        for i, r in enumerate(old) if _event_of(r) not in touched
+    )
+    fresh = ((sort_key(r), r, None) for r in new)
+    return [(r, chunk) for _k, r, chunk in heapq.merge(kept, fresh, key=lambda x: x[0])]
+
+
+def _write_chunks(path: Path, items: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+    """Mismo texto que write_records_json; las filas con texto original se copian tal cual."""
+    out = [chunk if chunk is not None else json.dumps(r, ensure_ascii=False, indent=2).replace("\n", "\n  ") for r, chunk in items]
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(("[\n  " + ",\n  ".join(out) + "\n]") if out else "[]", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _patch_checkpoint(path: Path, new: Records, touched: Set[EventKey]) -> int:
+    """
+    Sustituye las filas de los eventos tocados manteniendo el orden de la normalización.
+    Trabaja sobre el texto: las filas que no cambian se copian tal cual (sin volver a
+    serializarlas) y solo se hace json.dumps de las nuevas.
+    """
+    items = _merge_chunks(path, new, touched)
+    _write_chunks(path, items)
+    return len(items)
+
+
+def _event_refs(obj: Any, out: Set[EventKey]) -> Set[EventKey]:
+    """(sport, eventId) de cualquier dict anidado en obj que tenga ambas claves."""
+    if isinstance(obj, dict):
+        if obj.get("sport") is not None and obj.get("eventId") is not None:
+            out.add(_event_of(obj))
+        for v in obj.values():
+            _event_refs(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _event_refs(v, out)
+    return out
+
+
+def _output_events(path: Path) -> Set[EventKey]:
+    out: Set[EventKey] = set()
+    files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+    for p in files:
+        try:
+            _event_refs(json.loads(p.read_text(encoding="utf-8")), out)
+        except Exception:
+            continue
+    return out
+
+
+def _premium_flag(sel: Dict[str, Any]) -> Tuple[Any, Any]:
+    return (sel.get("premium"), sel.get("premium_reason"))
+
+
+def _could_pick_parlay(sel: Dict[str, Any]) -> bool:
+    m = picks_parlay_premium_multisport
+    return bool(m.filter_pool(
+        [sel],
+        min(m.SAFE_P_MIN, m.BOOM_P_MIN),
+        min(m.SAFE_EV_MIN, m.BOOM_EV_MIN),
+        m.SAFE_ALLOWED_RISK | m.BOOM_ALLOWED_RISK,
+    ))
+
+
+def _could_pick_classic(sel: Dict[str, Any]) -> bool:
+    m = picks_classic_multisport
+    return m.is_candidate(sel, min(m.P_SAFE_MIN_PRIMARY, m.P_SAFE_MIN_FALLBACK))
+
+
+# prefiltro de cada etapa de picks: una fila que no lo pasa no puede acabar en su salida
+_PICK_CANDIDATE: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+    "picks_parlay_premium_multisport": _could_pick_parlay,
+    "picks_classic_multisport": _could_pick_classic,
+}
+
+
+def run_delta(
+    day: str,
+    changed: Dict[str, Iterable[Any]],
+    checkpoints: bool = True,
+    log: Optional[Log] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Recalcula la cadena solo para los eventos de changed ({sport: [eventId, ...]}) cuyas
+    odds ya se escribieron en api/data/odds/<day>/<sport>.json.
+
+    - normalization..risk: solo las filas de esos eventos, parcheadas en cada all.json
+      (con checkpoints=False no se tocan y el manifest los olvida, como en run_chain).
+    - premium: filas nuevas + resto del odds_premium/all.json, re-marcado sobre la lista completa.
+    - pools / picks: se reconstruyen solo si un evento tocado está (o puede entrar) en ellos.
+
+    Necesita las salidas del día (y los checkpoints si checkpoints=True); si falta
+    alguna cae en run_chain completo.
+    """
+    log = log or _default_log
+    touched: Set[EventKey] = {(str(sport), str(eid)) for sport, eids in changed.items() for eid in eids}
+    summary: Dict[str, Any] = {"day": day, "mode": "delta", "events": len(touched), "stages": []}
+    if not touched:
+        log("SKIP delta: no odds changes")
+        return summary
+
+    # el delta parte de los checkpoints: tienen que existir y (con manifest) ser los del último run
+    required = [st for st in STAGES if checkpoints or not st.checkpoint or st.name == _PREMIUM_STAGE]
+    manifest = StageManifest.load(day) if use_cache else None
+    stale = [
+        st.name for st in required
+        if not stage_output_ok(st, day)
+        or (manifest is not None and st.checkpoint and not manifest.output_unchanged(st.name, st.output(day)))
+    ]
+    if stale:
+        # el fallback siempre deja checkpoints: son la base del siguiente delta
+        log(f"DELTA fallback to full chain (missing/stale outputs: {stale})")
+        full = run_chain(day, recompute=True, checkpoints=True, log=log, use_cache=use_cache)
+        full["mode"] = "full"
+        return full
+
+    t_all = time.perf_counter()
+
+    # 1) normalization -> risk solo para los eventos tocados
+    rows: Optional[Rows] = None
+    for name in _ROW_STAGES:
+        stage = STAGES_BY_NAME[name]
+        t0 = time.perf_counter()
+        if name == "odds_normalization_multisport":
+            rows, _counts, _sports = odds_normalization_multisport.collect_normalized_columns(day, only=touched)
+        elif len(rows):
+            rows = stage.run(day, rows)
+        else:
+            # los eventos tocados se quedaron sin líneas: solo hay que quitar sus filas
+            rows = []
+        if checkpoints:
+            _patch_checkpoint(stage.output(day), _as_records(rows), touched)
+        log(f"OK   {name} delta rows={len(rows)} secs={time.perf_counter() - t0:.2f}")
+        summary["stages"].append({"stage": name, "status": "patched" if checkpoints else "delta", "records": len(rows)})
+
+    # 2) premium: re-marcar el día completo (mark_premium reescribe premium/premium_reason de
+    # todas las filas, así que las viejas valen como base). Las filas no tocadas cuyo flag cambia
+    # (fallback top-2 del día) se reserializan y sus eventos cuentan como tocados aguas abajo.
+    t0 = time.perf_counter()
+    prem_out = STAGES_BY_NAME[_PREMIUM_STAGE].output(day)
+    items = _merge_chunks(prem_out, _as_records(rows), touched)
+    before = [_premium_flag(r) for r, _chunk in items]
+    premium = _run_premium(day, [r for r, _chunk in items])
+    flipped: Set[EventKey] = set()
+    for i, (r, chunk) in enumerate(items):
+        if chunk is not None and _premium_flag(r) != before[i]:
+            flipped.add(_event_of(r))
+            items[i] = (r, None)
+    _write_chunks(prem_out, items)
+    log(f"OK   {_PREMIUM_STAGE} remarked total={len(premium)} secs={time.perf_counter() - t0:.2f}")
+    summary["stages"].append({"stage": _PREMIUM_STAGE, "status": "remarked", "records": len(premium)})
+
+    fresh_rows = [sel for sel in premium if _event_of(sel) in touched]
+
+    # 3) pools: solo si un evento tocado estaba en ellos o entra ahora
+    pools_stage = STAGES_BY_NAME[_POOLS_STAGE]
+    in_pools = _output_events(data_path("pools", day)) | inflated_pool_builder.pool_events(fresh_rows)
+    if touched & in_pools:
+        t0 = time.perf_counter()
+        pools_stage.run(day, premium)
+        log(f"OK   {_POOLS_STAGE} rebuilt secs={time.perf_counter() - t0:.2f}")
+        summary["stages"].append({"stage": _POOLS_STAGE, "status": "ran"})
+    else:
+        log(f"SKIP {_POOLS_STAGE} (no touched events)")
+        summary["stages"].append({"stage": _POOLS_STAGE, "status": "untouched"})
+
+    # 4) picks: igual, contando también los eventos cuyo flag premium cambió
+    for name in _PICK_STAGES:
+        stage = STAGES_BY_NAME[name]
+        referenced = _output_events(stage.output(day))
+        if name == "picks_parlay_premium_multisport":
+            referenced |= _output_events(data_path("picks_parlay_featured", day))
+        candidate = _PICK_CANDIDATE[name]
+        hit = ((touched | flipped) & referenced) or any(candidate(sel) for sel in fresh_rows)
+        if hit:
+            t0 = time.perf_counter()
+            stage.run(day, premium)
+            log(f"OK   {name} rebuilt secs={time.perf_counter() - t0:.2f}")
+            summary["stages"].append({"stage": name, "status": "ran"})
+        else:
+            log(f"SKIP {name} (no touched events)")
+            summary["stages"].append({"stage": name, "status": "untouched"})
+
+    # las salidas quedan igual que con la cadena completa: el manifest pasa a las claves nuevas
+    if manifest is not None:
+        for name, key in _stage_keys(day).items():
+            if name in _ROW_STAGES and not checkpoints:
+                manifest.forget(name)
+            else:
+                manifest.record(name, key, STAGES_BY_NAME[name].output(day))
+        manifest.save()
+
+    summary["secs"] = round(time.perf_counter() - t_all, 3)
+    summary["rebuilt"] = [st["stage"] for st in summary["stages"] if st["status"] == "ran"]
+    return summary
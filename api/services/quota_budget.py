@@ -0,0 +1,435 @@
+"""
+DF_QUOTA_BUDGET: presupuesto de cuota y ritmo por proveedor (The Odds API, API-SPORTS).
+
+- Ledger persistente (api/data/quota/ledger.json) de llamadas por proveedor / día / periodo
+  (mes para The Odds API, día para cada producto API-SPORTS), reconciliado con las cabeceras
+  de cuota restante de cada respuesta (x-requests-remaining, x-ratelimit-requests-remaining).
+- Token bucket por host para espaciar las requests (sustituye los sleep(min_request_interval)).
+- Clases de prioridad: ingestion (06:00) > settlement > live > refresh (odds delta intradía)
+  > debug. Las clases bajas no pueden gastar la reserva que se deja a las altas
+  (RESERVE_FRACTION del periodo).
+- Planner: reparte la cuota mensual restante de The Odds API entre los deportes según los
+  eventos esperados (media de los últimos días en api/data/events/).
+
+Si no hay presupuesto (cuota, reserva, o un 429 reciente con Retry-After), budget_get lanza
+BudgetExhausted SIN hacer la request: el caller responde rápido en vez de quemar un 429.
+Hosts sin proveedor configurado pasan directos a http_get.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from api.services.http_transport import configure_host, http_get
+    from api.utils.paths import data_path, ensure_dir
+except ModuleNotFoundError:
+    from services.http_transport import configure_host, http_get  # type: ignore
+    from utils.paths import data_path, ensure_dir  # type: ignore
+
+THEODDS_MONTHLY_QUOTA = int(os.environ.get("THEODDS_MONTHLY_QUOTA", "500"))
+APISPORTS_DAILY_QUOTA = int(os.environ.get("APISPORTS_DAILY_QUOTA", "100"))
+# segundos de 429 sin Retry-After durante los que no se vuelve a intentar el host
+THROTTLE_DEFAULT_SECS = float(os.environ.get("QUOTA_THROTTLE_DEFAULT_SECS", "60"))
+
+PRIORITIES = ("ingestion", "settlement", "live", "refresh", "debug")
+# fracción de la cuota del periodo que una clase NO puede gastar (reservada a las superiores)
+RESERVE_FRACTION: Dict[str, float] = {"ingestion": 0.0, "settlement": 0.05, "live": 0.10, "refresh": 0.15, "debug": 0.20}
+# espera máxima en el token bucket antes de rendirse
+MAX_WAIT_SECS: Dict[str, float] = {"ingestion": 30.0, "settlement": 10.0, "live": 2.0, "refresh": 5.0, "debug": 0.0}
+
+
+class BudgetExhausted(RuntimeError):
+    def __init__(self, provider: str, reason: str, priority: str, remaining: Optional[int] = None, retry_after: Optional[float] = None):
+        self.provider = provider
+        self.reason = reason  # quota | reserve | rate | throttled
+        self.priority = priority
+        self.remaining = remaining
+        self.retry_after = retry_after
+        super().__init__(f"budget exhausted for {provider} ({reason}, priority={priority}, remaining={remaining})")
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    period: str  # "month" | "day"
+    quota: int
+    rate_per_sec: float
+    burst: int
+    remaining_header: str
+    cost_header: Optional[str] = None
+
+
+PROVIDERS: Dict[str, ProviderConfig] = {
+    "theodds": ProviderConfig(
+        period="month",
+        quota=THEODDS_MONTHLY_QUOTA,
+        rate_per_sec=float(os.environ.get("THEODDS_RATE_PER_SEC", "1.0")),
+        burst=int(os.environ.get("THEODDS_BURST", "2")),
+        remaining_header="x-requests-remaining",
+        cost_header="x-requests-last",
+    ),
+    # cada producto API-SPORTS (football, basketball, ...) tiene su propia cuota diaria
+    "apisports": ProviderConfig(
+        period="day",
+        quota=APISPORTS_DAILY_QUOTA,
+        rate_per_sec=float(os.environ.get("APISPORTS_RATE_PER_MIN", "10")) / 60.0,
+        burst=int(os.environ.get("APISPORTS_BURST", "5")),
+        remaining_header="x-ratelimit-requests-remaining",
+    ),
+}
+
+
+def provider_for_url(url: str) -> Optional[Tuple[str, ProviderConfig]]:
+    """(clave del ledger, config) del host de url; None si el host no tiene presupuesto."""
+    netloc = urlsplit(url).netloc.lower()
+    if netloc.endswith("the-odds-api.com"):
+        return "theodds", PROVIDERS["theodds"]
+    if netloc.endswith("api-sports.io"):
+        return f"apisports:{netloc.split('.api-sports.io')[0]}", PROVIDERS["apisports"]
+    return None
+
+
+def _period_key(period: str, day: date) -> str:
+    return day.strftime("%Y-%m") if period == "month" else day.isoformat()
+
+
+def _days_left_in_period(period: str, day: date) -> int:
+    if period == "day":
+        return 1
+    return monthrange(day.year, day.month)[1] - day.day + 1
+
+
+# ---------------------------------------------------------------------------
+# Token bucket por host
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = max(1e-6, rate_per_sec)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reserva un token. Devuelve los segundos a esperar, o None si superan max_wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
+# ---------------------------------------------------------------------------
+# Ledger
+# ---------------------------------------------------------------------------
+
+class QuotaLedger:
+    def __init__(self, path=None):
+        self.path = path or data_path("quota", "ledger.json")
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {"providers": {}}
+        self._sig: Any = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._throttled_until: Dict[str, float] = {}
+
+    def _signature(self) -> Any:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_locked(self) -> None:
+        # el pipeline de las 06:00 corre en otro proceso: recargar si el fichero cambió
+        sig = self._signature()
+        if sig == self._sig:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self._data = data if isinstance(data, dict) and isinstance(data.get("providers"), dict) else {"providers": {}}
+        self._sig = sig
+
+    def _save_locked(self) -> None:
+        ensure_dir(self.path.parent)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._sig = self._signature()
+
+    def _state(self, key: str) -> Dict[str, Any]:
+        st = self._data["providers"].setdefault(key, {})
+        for name in ("periods", "days", "by_priority"):
+            st.setdefault(name, {})
+        return st
+
+    def _remaining_locked(self, key: str, cfg: ProviderConfig, today: date) -> int:
+        st = self._state(key)
+        period = _period_key(cfg.period, today)
+        if st.get("remaining_period") == period and st.get("remaining") is not None:
+            return max(0, int(st["remaining"]))
+        return max(0, cfg.quota - int(st["periods"].get(period, 0)))
+
+    def remaining(self, key: str, cfg: ProviderConfig, today: Optional[date] = None) -> int:
+        with self._lock:
+            self._load_locked()
+            return self._remaining_locked(key, cfg, today or date.today())
+
+    def check(self, key: str, cfg: ProviderConfig, priority: str, cost: int = 1, host: Optional[str] = None) -> None:
+        """Lanza BudgetExhausted si la clase `priority` no puede gastar `cost` llamadas ahora."""
+        if priority not in RESERVE_FRACTION:
+            raise ValueError(f"priority debe ser una de {PRIORITIES}")
+        if host is not None:
+            until = self._throttled_until.get(host, 0.0)
+            if until > time.time():
+                raise BudgetExhausted(key, "throttled", priority, retry_after=round(until - time.time(), 1))
+        remaining = self.remaining(key, cfg)
+        if remaining < cost:
+            raise BudgetExhausted(key, "quota", priority, remaining)
+        if remaining - cost < math.ceil(cfg.quota * RESERVE_FRACTION[priority]):
+            raise BudgetExhausted(key, "reserve", priority, remaining)
+
+    def pace(self, host: str, cfg: ProviderConfig, key: str, priority: str, max_wait: float) -> None:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(cfg.rate_per_sec, cfg.burst)
+        wait = bucket.reserve(max_wait)
+        if wait is None:
+            raise BudgetExhausted(key, "rate", priority)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, key: str, cfg: ProviderConfig, priority: str, cost: int, headers: Any = None, status: Optional[int] = None, host: Optional[str] = None) -> None:
+        """Apunta una llamada hecha y reconcilia con las cabeceras de cuota de la respuesta."""
+        headers = headers or {}
+        if cfg.cost_header and headers.get(cfg.cost_header) is not None:
+            try:
+                cost = int(float(headers.get(cfg.cost_header)))
+            except (TypeError, ValueError):
+                pass
+        today = date.today()
+        period = _period_key(cfg.period, today)
+        with self._lock:
+            self._load_locked()
+            st = self._state(key)
+            st["period"] = cfg.period
+            st["quota"] = cfg.quota
+            st["periods"][period] = int(st["periods"].get(period, 0)) + cost
+            st["days"][today.isoformat()] = int(st["days"].get(today.isoformat(), 0)) + cost
+            by_prio = st["by_priority"].setdefault(today.isoformat(), {})
+            by_prio[priority] = int(by_prio.get(priority, 0)) + cost
+            # solo se guardan los últimos 62 días
+            for name in ("days", "by_priority"):
+                for old in sorted(st[name])[:-62]:
+                    del st[name][old]
+
+            header_remaining = headers.get(cfg.remaining_header)
+            try:
+                header_remaining = int(float(header_remaining)) if header_remaining is not None else None
+            except (TypeError, ValueError):
+                header_remaining = None
+            if header_remaining is not None:
+                st["remaining"] = header_remaining
+                st["remaining_period"] = period
+                st["reconciled_at"] = datetime.utcnow().isoformat()
+            elif st.get("remaining_period") == period and st.get("remaining") is not None:
+                st["remaining"] = max(0, int(st["remaining"]) - cost)
+            st["last_status"] = status
+            self._save_locked()
+
+        if status == 429 and host is not None:
+            try:
+                retry_after = float(headers.get("retry-after") or THROTTLE_DEFAULT_SECS)
+            except (TypeError, ValueError):
+                retry_after = THROTTLE_DEFAULT_SECS
+            self._throttled_until[host] = time.time() + retry_after
+
+    def status(self) -> Dict[str, Any]:
+        today = date.today()
+        with self._lock:
+            self._load_locked()
+            out: Dict[str, Any] = {}
+            for key, st in self._data["providers"].items():
+                cfg = PROVIDERS["theodds" if key == "theodds" else "apisports"]
+                out[key] = {
+                    "period": cfg.period,
+                    "quota": cfg.quota,
+                    "used_period": int(st.get("periods", {}).get(_period_key(cfg.period, today), 0)),
+                    "used_today": int(st.get("days", {}).get(today.isoformat(), 0)),
+                    "remaining": self._remaining_locked(key, cfg, today),
+                    "reconciled_at": st.get("reconciled_at"),
+                    "by_priority_today": dict(st.get("by_priority", {}).get(today.isoformat(), {})),
+                }
+        throttled = {h: round(t - time.time(), 1) for h, t in self._throttled_until.items() if t > time.time()}
+        return {"providers": out, "throttled": throttled}
+
+
+LEDGER = QuotaLedger()
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+# hosts con presupuesto cuya sesión ya se configuró sin reintentos de 429
+_NO_RETRY_429_HOSTS: set = set()
+
+
+def _ensure_no_retry_429(host: str) -> None:
+    """
+    Un 429 reintentado dentro de urllib3 gasta cuota sin pasar por el ledger (record()
+    vería una sola llamada y nunca el 429). En hosts con presupuesto el 429 llega siempre
+    al caller: record() lo cuenta y bloquea el host (BudgetExhausted hasta Retry-After).
+    """
+    if host in _NO_RETRY_429_HOSTS:
+        return
+    configure_host(host, retry_429=False)
+    _NO_RETRY_429_HOSTS.add(host)
+
+
+def check_budget(url: str, priority: str = "ingestion", cost: int = 1) -> None:
+    """Comprobación sin hacer la request (p.ej. antes de un lote)."""
+    provider = provider_for_url(url)
+    if provider is not None:
+        LEDGER.check(provider[0], provider[1], priority, cost, host=_host(url))
+
+
+def budget_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    priority: str = "ingestion",
+    cost: int = 1,
+    max_wait: Optional[float] = None,
+    **kwargs: Any,
+):
+    """http_get con presupuesto: check de cuota/reserva -> token bucket -> request -> ledger."""
+    provider = provider_for_url(url)
+    if provider is None:
+        return http_get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+    key, cfg = provider
+    host = _host(url)
+    LEDGER.check(key, cfg, priority, cost, host=host)
+    LEDGER.pace(host, cfg, key, priority, MAX_WAIT_SECS.get(priority, 0.0) if max_wait is None else max_wait)
+    _ensure_no_retry_429(host)
+    resp = http_get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+    LEDGER.record(key, cfg, priority, cost, headers=resp.headers, status=resp.status_code, host=host)
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Planner (The Odds API)
+# ---------------------------------------------------------------------------
+
+def expected_event_counts(days_back: int = 7, today: Optional[date] = None) -> Dict[str, float]:
+    """Media de eventos por deporte en api/data/events/<day>/<sport>.json de los últimos días."""
+    today = today or date.today()
+    totals: Dict[str, List[int]] = {}
+    for i in range(1, days_back + 1):
+        day_dir = data_path("events", (today - timedelta(days=i)).isoformat())
+        if not day_dir.is_dir():
+            continue
+        for f in day_dir.glob("*.json"):
+            try:
+                payload = json.loads(f.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            resp = payload.get("response") if isinstance(payload, dict) else None
+            totals.setdefault(f.stem, []).append(len(resp) if isinstance(resp, list) else 0)
+    return {sport: sum(v) / len(v) for sport, v in totals.items() if v}
+
+
+def plan_allocation(
+    sports: List[str],
+    expected: Optional[Dict[str, float]] = None,
+    today: Optional[date] = None,
+    calls_per_sport: int = 1,
+    league_keys: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Reparte la cuota restante del mes de The Odds API: allowance de hoy = restante / días
+    que quedan del mes; cada deporte recibe calls_per_sport llamadas en orden de eventos
+    esperados (un deporte sin histórico cuenta como 1 evento) hasta agotar el allowance.
+
+    league_keys ({sport: [claves de liga]}, liga principal primero): una llamada por clave
+    (THEODDS_EXTRA_LEAGUES incluidas) y las claves compartidas entre deportes
+    (soccer/football) se cuentan una vez. "keys" dice qué claves puede pedir cada deporte;
+    "allocation" es cuántas llamadas nuevas se le cargan (0 si todas son compartidas).
+    """
+    today = today or date.today()
+    cfg = PROVIDERS["theodds"]
+    expected = expected_event_counts(today=today) if expected is None else expected
+    remaining = LEDGER.remaining("theodds", cfg, today)
+    days_left = _days_left_in_period(cfg.period, today)
+    allowance = remaining // max(1, days_left)
+
+    ranked = sorted(sports, key=lambda s: (-max(1.0, float(expected.get(s, 0.0))), s))
+    allocation: Dict[str, int] = {}
+    keys: Dict[str, List[str]] = {}
+    planned: set = set()
+    left = allowance
+    for sport in ranked:
+        if league_keys is None:
+            n = min(calls_per_sport, left)
+            allocation[sport] = n
+            left -= n
+            continue
+        allowed: List[str] = []
+        n = 0
+        for key in league_keys.get(sport) or []:
+            if key in planned:
+                allowed.append(key)
+            elif left > 0:
+                planned.add(key)
+                allowed.append(key)
+                n += 1
+                left -= 1
+        allocation[sport] = n
+        keys[sport] = allowed
+    out: Dict[str, Any] = {
+        "remaining": remaining,
+        "days_left": days_left,
+        "allowance_today": allowance,
+        "expected_events": {s: round(float(expected.get(s, 0.0)), 1) for s in ranked},
+        "allocation": allocation,
+    }
+    if league_keys is not None:
+        out["keys"] = keys
+        out["planned_calls"] = len(planned)
+    return out
+
+
+def budget_status() -> Dict[str, Any]:
+    return LEDGER.status()
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Provider quota ledger and The Odds API allocation plan")
+    p.add_argument("--sports", default=None, help="Comma-separated sports for the allocation plan")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    out: Dict[str, Any] = {"status": budget_status()}
+    if args.sports:
+        out["plan"] = plan_allocation([s.strip() for s in args.sports.split(",") if s.strip()])
+    print(json.dumps(out, ensure_ascii=False, indent=2))
@@ -0,0 +1,151 @@
+"""
+DF_RESPONSE_CACHE: cache de respuestas ya renderizadas (bytes JSON + ETag) por endpoint y día.
+
+Cada entrada guarda una "versión" de sus inputs (firmas (mtime_ns, size) de contract.json,
+de los picks locales y del índice de display) calculada ANTES de renderizar. La entrada
+es válida mientras la versión no cambie; como mucho se re-calcula cada
+RESPONSE_CACHE_REVALIDATE_SECS, así que un poll normal es un lookup en un dict.
+
+Invalidación explícita (freeze del contrato, live scores) vía invalidate(); además
+cualquier escritor externo (p.ej. el pipeline en subprocess) se detecta por la firma.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+REVALIDATE_SECS = float(os.environ.get("RESPONSE_CACHE_REVALIDATE_SECS", "1.0"))
+MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "32"))
+
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: Path) -> Signature:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def signatures(paths: Iterable[Path]) -> Tuple[Tuple[str, Signature], ...]:
+    return tuple((p.name, file_signature(p)) for p in paths)
+
+
+def render_json(obj: Any) -> bytes:
+    """Mismos bytes que JSONResponse de Starlette (compacto, UTF-8, sin NaN)."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+@dataclass
+class RenderedResponse:
+    body: bytes
+    etag: str
+    version: Any
+    meta: Dict[str, Any] = field(default_factory=dict)
+    validated_at: float = 0.0
+
+    def to_response(self, request: Optional[Request] = None, cache_control: str = "no-cache") -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control}
+        if request is not None and _etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    def __init__(self, name: str, revalidate_secs: float = REVALIDATE_SECS, max_entries: int = MAX_ENTRIES):
+        self.name = name
+        self.revalidate_secs = revalidate_secs
+        self.max_entries = max_entries
+        self._entries: Dict[str, RenderedResponse] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+
+    def get(self, key: str, version_fn: Callable[[], Any]) -> Optional[RenderedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            self._bump("misses")
+            return None
+
+        now = time.monotonic()
+        if now - entry.validated_at >= self.revalidate_secs:
+            if version_fn() != entry.version:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                self._bump("stale")
+                self._bump("misses")
+                return None
+            entry.validated_at = now
+
+        self._bump("hits")
+        return entry
+
+    def put(self, key: str, obj: Any, version: Any, meta: Optional[Dict[str, Any]] = None) -> RenderedResponse:
+        body = render_json(obj)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        entry = RenderedResponse(body=body, etag=etag, version=version, meta=meta or {}, validated_at=time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > max(1, self.max_entries):
+                self._entries.pop(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._stats["invalidations"] += 1
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entries"] = {k: dict(v.meta, etag=v.etag, bytes=len(v.body)) for k, v in self._entries.items()}
+        return out
+
+
+# /bets/today (clave = cycle day)
+BETS_TODAY_CACHE = ResponseCache("bets_today")
+
+
+def invalidate_bets_today(day: Optional[str] = None) -> None:
+    """Hook para los escritores de contracts/<day>/contract.json."""
+    BETS_TODAY_CACHE.invalidate(day)
+
+
+def file_sha256(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def dir_json_files(dirpath: Path) -> List[Path]:
+    if not dirpath.is_dir():
+        return []
+    return sorted(dirpath.glob("*.json"))
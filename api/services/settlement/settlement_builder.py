@@ -5,6 +5,7 @@ from pathlib import Path
 
 from api.services.settlement.resolvers.football import FootballResolver
 from api.services.settlement.resolvers.tennis import TennisResolver
+from api.services.stats_service import StatsService
 
 
 class SettlementBuilder:
@@ -114,3 +115,6 @@ class SettlementBuilder:
 
         with open(settlement_path, "w") as f:
             json.dump(settlement, f, indent=2)
+
+        # DF_ROLLING_STATS: stats del día + delta en stats/rolling.json
+        StatsService(self.data_path).build(date)
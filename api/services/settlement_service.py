@@ -2,17 +2,22 @@ from __future__ import annotations
 
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Tuple, Union, Optional
+from typing import Any, List, Dict, Tuple, Union, Optional
 
-from utils.football_results import get_football_result
+from utils.football_results import get_football_result, get_football_results
 from services.safe_call import safe_call
-from utils.other_sports_results import get_other_sport_result
+from utils.other_sports_results import get_other_sport_result, get_other_sport_results
 from utils.bet_evaluator import evaluate_bet
 from services.contract_service import normalize_bet
 
 DATA_DIR = "data"
 SETTLEMENT_LOG = os.path.join("logs", "settlement.log")
+# DF_SETTLEMENT_BATCH: resultados finales ya consultados ("football:<id>" / "other:<id>").
+# Un marcador final no cambia, así que no caduca.
+RESULTS_CACHE = os.path.join(DATA_DIR, "results_cache", "final_results.json")
+SETTLEMENT_WORKERS = int(os.environ.get("SETTLEMENT_WORKERS", "4"))
 
 
 def load_json(path: str) -> Union[Dict, List]:
@@ -27,6 +32,15 @@ def save_json(path: str, data):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
+def save_json_atomic(path: str, data):
+    """Escribe en <path>.tmp y reemplaza: un lector nunca ve el fichero a medias."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
 def _append_log(obj: Dict):
     os.makedirs(os.path.dirname(SETTLEMENT_LOG), exist_ok=True)
     line = json.dumps(
@@ -118,3 +132,117 @@ def settle_all_pending_bets() -> Dict:
 
     _append_log({"status": "ok", "settled": settled})
     return {"status": "ok", "settled": settled}
+
+
+# -------------------------
+# DF_SETTLEMENT_BATCH
+# -------------------------
+def _provider(bet: Dict) -> str:
+    return "football" if _is_football_sport(bet.get("sport", "")) else "other"
+
+
+def _fetch_results(missing: Dict[str, List[str]]) -> Dict[str, Dict]:
+    """
+    {"football": [ids], "other": [ids]} -> {"<provider>:<id>": resultado} de los finalizados.
+    Football va en requests multi-id (get_football_results parte los ids en batches);
+    los proveedores corren en paralelo.
+    """
+    tasks: List[Tuple[str, Any]] = []
+    if missing.get("football"):
+        tasks.append(("football", lambda: get_football_results(missing["football"])))
+    if missing.get("other"):
+        tasks.append(("other", lambda: get_other_sport_results(missing["other"], max_workers=SETTLEMENT_WORKERS)))
+
+    found: Dict[str, Dict] = {}
+    if not tasks:
+        return found
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SETTLEMENT_WORKERS, len(tasks)))) as pool:
+        futures = [
+            (provider, pool.submit(safe_call, fn, name=f"{provider}_api"))
+            for provider, fn in tasks
+        ]
+        for provider, fut in futures:
+            for event_id, result in (fut.result() or {}).items():
+                found[f"{provider}:{event_id}"] = result
+    return found
+
+
+def settle_pending_bets_batched() -> Dict:
+    """
+    Igual que settle_all_pending_bets, pero:
+    - cada fichero se lee una vez y se escribe (atómico) una vez si cambió;
+    - un resultado por (proveedor, eventId) aunque varias apuestas compartan evento;
+    - los resultados finales se guardan en RESULTS_CACHE y no se vuelven a pedir.
+    """
+    pending: Dict[str, Tuple[Dict, List[Tuple[List, int, Dict]]]] = {}
+    if os.path.exists(DATA_DIR):
+        for filename in sorted(os.listdir(DATA_DIR)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(DATA_DIR, filename)
+            payload = load_json(path)
+            if not isinstance(payload, dict):
+                continue
+            bets = [
+                (lst, i, bet) for lst, i, bet in _iter_bets(payload)
+                if bet.get("result") is None and isinstance(bet.get("id"), str)
+            ]
+            if bets:
+                pending[path] = (payload, bets)
+
+    if not pending:
+        return {"status": "ok", "message": "no pending bets"}
+
+    cache = load_json(RESULTS_CACHE)
+    if not isinstance(cache, dict):
+        cache = {}
+
+    missing: Dict[str, set] = {}
+    for _payload, bets in pending.values():
+        for _lst, _i, bet in bets:
+            event_id = bet.get("eventId")
+            if not event_id:
+                continue
+            provider = _provider(bet)
+            if f"{provider}:{event_id}" not in cache:
+                missing.setdefault(provider, set()).add(str(event_id))
+
+    fetched = _fetch_results({provider: sorted(ids) for provider, ids in missing.items()})
+    if fetched:
+        cache.update(fetched)
+        save_json_atomic(RESULTS_CACHE, cache)
+
+    settled = 0
+    files_written = 0
+    for path, (payload, bets) in pending.items():
+        changed = False
+        for container, idx, bet in bets:
+            event_result = cache.get(f"{_provider(bet)}:{bet.get('eventId')}")
+            if event_result is None:
+                continue
+
+            bet["result"] = evaluate_bet(bet, event_result)
+            bet["status"] = "settled"
+
+            normalized, errs = normalize_bet(bet, bet_type=bet.get("type"), default_stake=50.0)
+            if errs:
+                _append_log({"status": "warn", "betId": bet.get("id"), "normalizeErrors": errs})
+
+            container[idx] = normalized
+            changed = True
+            settled += 1
+
+        if changed:
+            save_json_atomic(path, payload)
+            files_written += 1
+
+    summary = {
+        "status": "ok",
+        "settled": settled,
+        "files_written": files_written,
+        "events_fetched": sum(len(v) for v in missing.values()),
+        "results_found": len(fetched),
+    }
+    _append_log({"mode": "batched", **summary})
+    return summary
@@ -0,0 +1,331 @@
+"""
+DF_BSNAP: formato binario compacto (.bsnap) que acompaña a los JSON de api/data/<stage>/<day>/.
+
+El JSON (indent=2) sigue siendo el export legible y la fuente de verdad; el .bsnap se
+escribe al lado (football.json -> football.bsnap) y permite:
+  - leer un evento concreto por (sport, eventId) vía mmap sin parsear el fichero entero,
+  - reconstruir el objeto completo parseando solo JSON compacto (sin indentación).
+
+Layout (little-endian):
+  header   : magic, version, n_strings, n_records, offsets de cada sección,
+             tamaño + mtime_ns del JSON de origen (para detectar snapshots obsoletos)
+  meta     : JSON compacto con el "sobre" del fichero (claves distintas de la lista
+             de records) y dónde va la lista ("response" o la raíz)
+  strings  : tabla de strings (u32 len + utf-8) para sport / eventId
+  index    : n_records x (sport_sid u32, event_sid u32, offset u64, length u32)
+  data     : records = u32 len + JSON compacto, en el orden original
+
+Si el JSON cambió después de escribir el .bsnap (tamaño o mtime distintos) el
+snapshot se ignora y se lee el JSON.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BSNAP\x00\x00\x01"
+VERSION = 1
+SUFFIX = ".bsnap"
+
+# magic, version, flags, n_strings, n_records, meta_off, meta_len, strings_off, index_off, data_off, src_size, src_mtime_ns
+_HEADER = struct.Struct("<8sHHIIQIQQQQq")
+_INDEX_ENTRY = struct.Struct("<IIQI")
+_U32 = struct.Struct("<I")
+
+# readers abiertos (mmap + fd) por .bsnap, LRU acotado: cada día añade uno por deporte/etapa
+READERS_MAX = int(os.environ.get("BSNAP_READERS_MAX", "64"))
+_READERS: "OrderedDict[str, SnapshotReader]" = OrderedDict()
+_READERS_LOCK = threading.Lock()
+
+
+def snapshot_path(json_path: Path) -> Path:
+    return json_path.with_suffix(SUFFIX)
+
+
+def _compact(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def record_event_id(item: Any) -> Optional[str]:
+    """eventId de un record de events/odds en cualquiera de los formatos que guardamos."""
+    if not isinstance(item, dict):
+        return None
+    for wrapper in ("fixture", "game"):
+        w = item.get(wrapper)
+        if isinstance(w, dict) and w.get("id") is not None:
+            return str(w.get("id"))
+    for k in ("id", "event_id"):
+        if item.get(k) is not None:
+            return str(item.get(k))
+    # football legacy odds: {fixture:<id>, response:<payload>}
+    fx = item.get("fixture")
+    if fx is not None and not isinstance(fx, dict):
+        return str(fx)
+    return None
+
+
+def _split(obj: Any) -> Tuple[Dict[str, Any], List[Any]]:
+    """(meta, records): la lista de records es la raíz o obj["response"]."""
+    if isinstance(obj, list):
+        return {"root": "list", "envelope": None}, obj
+    if isinstance(obj, dict) and isinstance(obj.get("response"), list):
+        envelope = {k: v for k, v in obj.items() if k != "response"}
+        keys = list(obj.keys())
+        return {"root": "dict", "key": "response", "keys": keys, "envelope": envelope}, obj["response"]
+    return {"root": "raw", "envelope": obj}, []
+
+
+# -------------------------
+# Escritura
+# -------------------------
+def write_snapshot(json_path: Path, obj: Any, sport: Optional[str] = None) -> Optional[Path]:
+    """
+    Escribe <json_path>.bsnap para el objeto obj (ya escrito como JSON en json_path).
+    Nunca lanza: el snapshot es una optimización y el JSON sigue siendo válido sin él.
+    """
+    try:
+        sport = sport or json_path.stem
+        meta, records = _split(obj)
+
+        strings: List[str] = []
+        sids: Dict[str, int] = {}
+
+        def sid(s: str) -> int:
+            i = sids.get(s)
+            if i is None:
+                i = len(strings)
+                sids[s] = i
+                strings.append(s)
+            return i
+
+        blobs: List[bytes] = [_compact(r) for r in records]
+        keys: List[Tuple[int, int]] = [(sid(sport), sid(record_event_id(r) or "")) for r in records]
+
+        meta_b = _compact(meta)
+        strings_b = b"".join(_U32.pack(len(b)) + b for b in (s.encode("utf-8") for s in strings))
+
+        meta_off = _HEADER.size
+        strings_off = meta_off + len(meta_b)
+        index_off = strings_off + len(strings_b)
+        data_off = index_off + _INDEX_ENTRY.size * len(records)
+
+        index_parts: List[bytes] = []
+        off = data_off
+        for (s_sid, e_sid), blob in zip(keys, blobs):
+            index_parts.append(_INDEX_ENTRY.pack(s_sid, e_sid, off, len(blob)))
+            off += _U32.size + len(blob)
+
+        st = json_path.stat()
+        header = _HEADER.pack(
+            MAGIC, VERSION, 0, len(strings), len(records),
+            meta_off, len(meta_b), strings_off, index_off, data_off,
+            st.st_size, st.st_mtime_ns,
+        )
+
+        out = snapshot_path(json_path)
+        tmp = out.with_name(out.name + ".tmp")
+        with tmp.open("wb") as fh:
+            fh.write(header)
+            fh.write(meta_b)
+            fh.write(strings_b)
+            fh.write(b"".join(index_parts))
+            for blob in blobs:
+                fh.write(_U32.pack(len(blob)))
+                fh.write(blob)
+        os.replace(tmp, out)
+        return out
+    except Exception as err:
+        logger.warning(f"bsnap write failed for {json_path}: {err}")
+        return None
+
+
+def write_json_artifact(json_path: Path, obj: Any, sport: Optional[str] = None) -> None:
+    """Escribe el JSON legible (indent=2, como siempre) + su .bsnap."""
+    json_path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_snapshot(json_path, obj, sport=sport)
+
+
+# -------------------------
+# Lectura
+# -------------------------
+class SnapshotReader:
+    """Lector mmap de un .bsnap. El índice (sport, eventId) se decodifica al primer lookup."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, version, _flags, self.n_strings, self.n_records,
+            self._meta_off, self._meta_len, self._strings_off, self._index_off, self._data_off,
+            self.source_size, self.source_mtime_ns,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a bsnap v{VERSION} file: {path}")
+        st = path.stat()
+        self.signature = (st.st_size, st.st_mtime_ns)
+        self._strings: Optional[List[str]] = None
+        self._index: Optional[Dict[Tuple[str, str], Tuple[int, int]]] = None
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+
+    def matches(self, json_path: Path) -> bool:
+        try:
+            st = json_path.stat()
+        except OSError:
+            return False
+        return st.st_size == self.source_size and st.st_mtime_ns == self.source_mtime_ns
+
+    def _load_strings(self) -> List[str]:
+        if self._strings is None:
+            out: List[str] = []
+            pos = self._strings_off
+            for _ in range(self.n_strings):
+                (n,) = _U32.unpack_from(self._mm, pos)
+                pos += _U32.size
+                out.append(self._mm[pos:pos + n].decode("utf-8"))
+                pos += n
+            self._strings = out
+        return self._strings
+
+    def _entries(self) -> Iterator[Tuple[int, int, int, int]]:
+        end = self._index_off + _INDEX_ENTRY.size * self.n_records
+        return _INDEX_ENTRY.iter_unpack(self._mm[self._index_off:end])
+
+    def index(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        if self._index is None:
+            strings = self._load_strings()
+            idx: Dict[Tuple[str, str], Tuple[int, int]] = {}
+            for s_sid, e_sid, off, n in self._entries():
+                # duplicados: gana el último, igual que al indexar el JSON en un dict
+                idx[(strings[s_sid], strings[e_sid])] = (off, n)
+            self._index = idx
+        return self._index
+
+    def _read(self, off: int, n: int) -> Any:
+        start = off + _U32.size
+        return json.loads(self._mm[start:start + n])
+
+    def get(self, sport: str, event_id: Any) -> Optional[Any]:
+        loc = self.index().get((str(sport), str(event_id)))
+        return None if loc is None else self._read(*loc)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return (str(key[0]), str(key[1])) in self.index()
+
+    def iter_records(self) -> Iterator[Any]:
+        for _s, _e, off, n in self._entries():
+            yield self._read(off, n)
+
+    def meta(self) -> Dict[str, Any]:
+        return json.loads(self._mm[self._meta_off:self._meta_off + self._meta_len])
+
+    def load(self) -> Any:
+        """Reconstruye el objeto JSON completo (mismo contenido que el .json)."""
+        meta = self.meta()
+        records = list(self.iter_records())
+        root = meta.get("root")
+        if root == "list":
+            return records
+        if root == "dict":
+            env = meta.get("envelope") or {}
+            return {k: (records if k == meta.get("key") else env.get(k)) for k in meta.get("keys") or []}
+        return meta.get("envelope")
+
+
+def open_snapshot(json_path: Path) -> Optional[SnapshotReader]:
+    """Reader del .bsnap de json_path si existe y corresponde al JSON actual; si no, None."""
+    snap = snapshot_path(json_path)
+    key = str(snap)
+    try:
+        st = snap.stat()
+    except OSError:
+        return None
+
+    evicted: List[SnapshotReader] = []
+    with _READERS_LOCK:
+        reader = _READERS.get(key)
+        if reader is not None and reader.signature != (st.st_size, st.st_mtime_ns):
+            # sin close(): otro hilo puede estar leyendo; el mmap se libera con el GC
+            reader = None
+            _READERS.pop(key, None)
+        if reader is None:
+            try:
+                reader = SnapshotReader(snap)
+            except Exception as err:
+                logger.warning(f"bsnap open failed for {snap}: {err}")
+                return None
+            _READERS[key] = reader
+            while len(_READERS) > max(1, READERS_MAX):
+                evicted.append(_READERS.popitem(last=False)[1])
+        else:
+            _READERS.move_to_end(key)
+
+    # los readers expulsados son los menos usados; si alguno se estaba leyendo,
+    # load_json / get_record caen al JSON
+    for stale in evicted:
+        stale.close()
+
+    return reader if reader.matches(json_path) else None
+
+
+def load_json(json_path: Path) -> Any:
+    """json.loads(json_path) usando el .bsnap si está al día."""
+    reader = open_snapshot(json_path)
+    if reader is not None:
+        try:
+            return reader.load()
+        except Exception as err:
+            logger.warning(f"bsnap read failed for {json_path}: {err}")
+    return json.loads(json_path.read_text(encoding="utf-8"))
+
+
+def get_record(json_path: Path, sport: str, event_id: Any) -> Tuple[bool, Optional[Any]]:
+    """
+    (found_via_snapshot, record). Si no hay snapshot válido devuelve (False, None) y el
+    caller decide si parsear el JSON.
+    """
+    reader = open_snapshot(json_path)
+    if reader is None:
+        return False, None
+    try:
+        return True, reader.get(sport, event_id)
+    except (ValueError, OSError) as err:
+        # mmap cerrado por el LRU mientras se leía
+        logger.warning(f"bsnap lookup failed for {json_path}: {err}")
+        return False, None
+
+
+def main() -> None:
+    """Backfill: python -m api.services.snapshot_store api/data/events/2026-01-20 [...]"""
+    import sys
+
+    written = 0
+    for arg in sys.argv[1:]:
+        p = Path(arg)
+        files = sorted(p.glob("*.json")) if p.is_dir() else [p]
+        for f in files:
+            try:
+                obj = json.loads(f.read_text(encoding="utf-8"))
+            except Exception as err:
+                print(f"SKIP {f}: {err}")
+                continue
+            if write_snapshot(f, obj) is not None:
+                written += 1
+    print(json.dumps({"written": written}))
+
+
+if __name__ == "__main__":
+    main()
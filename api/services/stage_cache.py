@@ -0,0 +1,173 @@
+"""
+DF_STAGE_CACHE: manifest por día con la "clave" de cada etapa de la cadena de odds.
+
+La clave de una etapa es un sha256 de:
+  - la clave de la etapa de la que consume (encadenado), o el contenido de sus
+    inputs en disco (odds/<day>/*.json, events/<day>/*.json),
+  - el código fuente de los módulos que la implementan,
+  - las constantes ajustables de esos módulos (MARKET_ADJUSTMENTS, SAFE_P_MIN,
+    THRESHOLDS, ...), evaluadas en runtime para incluir overrides por env.
+
+Si la clave no cambió y la salida sigue siendo la que se registró (tamaño + mtime),
+la etapa se puede saltar aunque el pipeline vaya con --force.
+
+Manifest: api/data/pipeline_manifest/<day>.json
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.utils.paths import data_path, ensure_dir
+
+MANIFEST_VERSION = 1
+
+_SCALAR_TYPES = (int, float, str, bool, type(None))
+_CONTAINER_TYPES = (dict, list, tuple, set, frozenset)
+
+# cache por proceso: el fingerprint de un módulo no cambia mientras vive el intérprete
+_MODULE_FP_CACHE: Dict[str, str] = {}
+
+
+def _jsonable(x: Any) -> Any:
+    if isinstance(x, (set, frozenset)):
+        return sorted((_jsonable(v) for v in x), key=repr)
+    return repr(x)
+
+
+def _hash_files(paths: Iterable[Path]) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(p.name.encode("utf-8"))
+        h.update(b"\0")
+        with p.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def dir_digest(dirpath: Path, pattern: str = "*.json") -> Optional[str]:
+    """Hash del contenido (nombre + bytes) de los ficheros del directorio. None si no existe."""
+    if not dirpath.exists() or not dirpath.is_dir():
+        return None
+    return _hash_files(sorted(p for p in dirpath.glob(pattern) if p.is_file()))
+
+
+def module_constants(mod: ModuleType) -> Dict[str, Any]:
+    """Constantes MAYÚSCULAS del módulo con valor serializable (los Path/clases se ignoran)."""
+    out: Dict[str, Any] = {}
+    for name in sorted(vars(mod)):
+        if not name.isupper() or name.startswith("_"):
+            continue
+        v = getattr(mod, name)
+        if isinstance(v, _SCALAR_TYPES) or isinstance(v, _CONTAINER_TYPES):
+            out[name] = v
+    return out
+
+
+def module_fingerprint(mod: ModuleType) -> str:
+    """sha256(código fuente + constantes ajustables) del módulo."""
+    cached = _MODULE_FP_CACHE.get(mod.__name__)
+    if cached is not None:
+        return cached
+
+    h = hashlib.sha256()
+    src = getattr(mod, "__file__", None)
+    if src and Path(src).exists():
+        h.update(Path(src).read_bytes())
+    h.update(json.dumps(module_constants(mod), sort_keys=True, default=_jsonable).encode("utf-8"))
+    fp = h.hexdigest()
+    _MODULE_FP_CACHE[mod.__name__] = fp
+    return fp
+
+
+def stage_key(name: str, upstream: Optional[str], inputs: Dict[str, Optional[str]], modules: Iterable[ModuleType]) -> str:
+    payload = {
+        "v": MANIFEST_VERSION,
+        "stage": name,
+        "upstream": upstream,
+        "inputs": inputs,
+        "code": {m.__name__: module_fingerprint(m) for m in modules},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def output_signature(path: Path) -> Optional[List[Any]]:
+    """Firma barata de la salida: (nombre, tamaño, mtime_ns) por fichero."""
+    if path.is_dir():
+        files = sorted(p for p in path.glob("*.json") if p.is_file())
+    elif path.is_file():
+        files = [path]
+    else:
+        return None
+    out: List[Any] = []
+    for p in files:
+        st = p.stat()
+        out.append([p.name, st.st_size, st.st_mtime_ns])
+    return out
+
+
+class StageManifest:
+    def __init__(self, day: str, path: Optional[Path] = None):
+        self.day = day
+        self.path = path or data_path("pipeline_manifest", f"{day}.json")
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, day: str) -> "StageManifest":
+        m = cls(day)
+        try:
+            obj = json.loads(m.path.read_text(encoding="utf-8"))
+        except Exception:
+            return m
+        if isinstance(obj, dict) and obj.get("version") == MANIFEST_VERSION and isinstance(obj.get("stages"), dict):
+            m.stages = obj["stages"]
+        return m
+
+    def is_fresh(self, name: str, key: str, output: Path) -> bool:
+        entry = self.stages.get(name)
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return False
+        sig = output_signature(output)
+        return sig is not None and sig == entry.get("output")
+
+    def has_entry(self, name: str) -> bool:
+        return name in self.stages
+
+    def output_unchanged(self, name: str, output: Path) -> bool:
+        """La salida sigue siendo la que se registró (sin mirar la clave)."""
+        entry = self.stages.get(name)
+        if not isinstance(entry, dict):
+            return False
+        sig = output_signature(output)
+        return sig is not None and sig == entry.get("output")
+
+    def record(self, name: str, key: str, output: Path) -> None:
+        sig = output_signature(output)
+        if sig is None:
+            self.forget(name)
+            return
+        self.stages[name] = {"key": key, "output": sig}
+        self._dirty = True
+
+    def forget(self, name: str) -> None:
+        if self.stages.pop(name, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        ensure_dir(self.path.parent)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "day": self.day, "stages": self.stages}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -1,11 +1,207 @@
+import argparse
 import json
+import os
+import threading
 from pathlib import Path
 from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# -------------------------
+# DF_ROLLING_STATS: agregados acumulados (stake, profit, ROI, yield, rachas, por tier y deporte)
+# -------------------------
+# stats/rolling.json guarda, por día aplicado y en orden de fecha, la SUMA ACUMULADA
+# hasta ese día (prefix sums) + la secuencia W/L/V del día para las rachas:
+#   lifetime      -> cumulative[-1]
+#   últimos N días -> cumulative[-1] - cumulative[-1-N]
+# Aplicar un día es un delta O(picks) (índice por pick_id) y un append.
+ROLLING_VERSION = 1
+
+_AGG_FIELDS = ("stake", "profit", "picks", "parlays", "wins", "losses", "voids")
+_RESULT_CODES = {"WIN": "W", "LOSS": "L", "VOID": "V"}
+
+
+def _empty_agg() -> Dict[str, float]:
+    return {k: 0.0 if k in ("stake", "profit") else 0 for k in _AGG_FIELDS}
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"all": _empty_agg(), "tiers": {}, "sports": {}}
+
+
+def _count(agg: Dict[str, float], stake: float, profit: float, result: str, is_parlay: bool) -> None:
+    agg["stake"] += stake
+    agg["profit"] += profit
+    agg["parlays" if is_parlay else "picks"] += 1
+    if result == "WIN":
+        agg["wins"] += 1
+    elif result == "LOSS":
+        agg["losses"] += 1
+    else:
+        agg["voids"] += 1
+
+
+def _combine(a: Dict[str, Any], b: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """a + sign*b sobre {"all": agg, "tiers": {k: agg}, "sports": {k: agg}}."""
+    def agg(x: Optional[Dict[str, float]], y: Optional[Dict[str, float]]) -> Dict[str, float]:
+        x = x or _empty_agg()
+        y = y or _empty_agg()
+        return {k: x[k] + sign * y[k] for k in _AGG_FIELDS}
+
+    out: Dict[str, Any] = {"all": agg(a["all"], b["all"])}
+    for split in ("tiers", "sports"):
+        keys = set(a[split]) | set(b[split])
+        out[split] = {k: agg(a[split].get(k), b[split].get(k)) for k in sorted(keys)}
+        # en restas, los splits sin actividad en la ventana sobran
+        out[split] = {k: v for k, v in out[split].items() if v["picks"] or v["parlays"]}
+    return out
+
+
+def _finish_agg(agg: Dict[str, float]) -> Dict[str, Any]:
+    stake = agg["stake"]
+    profit = agg["profit"]
+    bets = agg["picks"] + agg["parlays"]
+    settled = agg["wins"] + agg["losses"]
+    return {
+        "stake": round(stake, 2),
+        "profit": round(profit, 2),
+        "roi": round(profit / stake, 4) if stake > 0 else 0.0,
+        "yield": round(profit / bets, 4) if bets > 0 else 0.0,
+        "picks": int(agg["picks"]),
+        "parlays": int(agg["parlays"]),
+        "wins": int(agg["wins"]),
+        "losses": int(agg["losses"]),
+        "voids": int(agg["voids"]),
+        "win_rate": round(agg["wins"] / settled, 4) if settled else 0.0,
+    }
+
+
+def _finish_totals(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **_finish_agg(totals["all"]),
+        "tiers": {k: _finish_agg(v) for k, v in totals["tiers"].items()},
+        "sports": {k: _finish_agg(v) for k, v in totals["sports"].items()},
+    }
+
+
+def _streaks(seqs: List[str], start: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Rachas sobre la secuencia W/L (los VOID no cortan ni suman)."""
+    st = dict(start or {"current_result": None, "current": 0, "longest_win": 0, "longest_loss": 0})
+    for seq in seqs:
+        for c in seq:
+            if c == "V":
+                continue
+            r = "WIN" if c == "W" else "LOSS"
+            if st["current_result"] == r:
+                st["current"] += 1
+            else:
+                st["current_result"] = r
+                st["current"] = 1
+            key = "longest_win" if r == "WIN" else "longest_loss"
+            st[key] = max(st[key], st["current"])
+    return st
+
+
+class RollingStats:
+    """Estado persistido en stats/rolling.json; lecturas O(1) sobre el estado en memoria."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._state: Optional[Dict[str, Any]] = None
+        self._sig: Optional[Tuple[int, int]] = None
+
+    def _file_sig(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _empty_state(self) -> Dict[str, Any]:
+        return {"version": ROLLING_VERSION, "days": [], "cumulative": [], "sequences": [], "streaks": _streaks([])}
+
+    def state(self) -> Dict[str, Any]:
+        sig = self._file_sig()
+        if self._state is None or sig != self._sig:
+            state = None
+            if sig is not None:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+            if not isinstance(state, dict) or state.get("version") != ROLLING_VERSION:
+                state = self._empty_state()
+            self._state, self._sig = state, sig
+        return self._state
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._state, self._sig = state, self._file_sig()
+
+    def apply_day(self, date: str, totals: Dict[str, Any], sequence: str) -> bool:
+        """Añade el delta de un día. Idempotente: un día ya aplicado no se vuelve a sumar."""
+        state = self.state()
+        days: List[str] = state["days"]
+        if date in days:
+            return False
+
+        cumulative: List[Dict[str, Any]] = state["cumulative"]
+        sequences: List[str] = state["sequences"]
+        if not days or date > days[-1]:
+            prev = cumulative[-1] if cumulative else _empty_totals()
+            days.append(date)
+            cumulative.append(_combine(prev, totals))
+            sequences.append(sequence)
+            state["streaks"] = _streaks([sequence], state["streaks"])
+        else:
+            # día fuera de orden (backfill): reconstruir prefix sums desde su posición
+            i = next(k for k, d in enumerate(days) if d > date)
+            deltas = [_combine(cumulative[k], cumulative[k - 1] if k else _empty_totals(), -1) for k in range(i, len(days))]
+            days.insert(i, date)
+            sequences.insert(i, sequence)
+            del cumulative[i:]
+            prev = cumulative[-1] if cumulative else _empty_totals()
+            for delta in [totals] + deltas:
+                prev = _combine(prev, delta)
+                cumulative.append(prev)
+            state["streaks"] = _streaks(sequences)
+
+        self._save(state)
+        return True
+
+    def lifetime(self) -> Dict[str, Any]:
+        state = self.state()
+        totals = state["cumulative"][-1] if state["cumulative"] else _empty_totals()
+        return {
+            "days": len(state["days"]),
+            "first_day": state["days"][0] if state["days"] else None,
+            "last_day": state["days"][-1] if state["days"] else None,
+            **_finish_totals(totals),
+            "streaks": state["streaks"],
+        }
+
+    def trailing(self, n: int) -> Dict[str, Any]:
+        """Agregado de los últimos n días aplicados (sin rachas: son de toda la serie)."""
+        state = self.state()
+        cumulative = state["cumulative"]
+        n = max(0, min(int(n), len(cumulative)))
+        if n == 0:
+            return {"days": 0, "first_day": None, "last_day": None, **_finish_totals(_empty_totals())}
+        base = cumulative[-1 - n] if len(cumulative) > n else _empty_totals()
+        return {
+            "days": n,
+            "first_day": state["days"][-n],
+            "last_day": state["days"][-1],
+            **_finish_totals(_combine(cumulative[-1], base, -1)),
+        }
 
 
 class StatsService:
     def __init__(self, data_path: Path):
         self.data_path = data_path
+        self._backfill_lock = threading.Lock()
+        self._backfilled = False
 
     def _contract_path(self, date: str) -> Path:
         return self.data_path / "contracts" / date / "contract.json"
@@ -16,9 +212,6 @@ class StatsService:
     def _stats_path(self, date: str) -> Path:
         return self.data_path / "stats" / date / "stats.json"
 
-    def _history_path(self) -> Path:
-        return self.data_path / "stats" / "history.json"
-
     def _profit(self, stake: float, odds: float, result: str) -> float:
         if result == "WIN":
             return stake * (odds - 1)
@@ -26,33 +219,37 @@ class StatsService:
             return -stake
         return 0.0
 
-    def build(self, date: str) -> None:
-        contract_path = self._contract_path(date)
-        settlement_path = self._settlement_path(date)
-        stats_path = self._stats_path(date)
+    def _rolling_path(self) -> Path:
+        return self.data_path / "stats" / "rolling.json"
 
-        if stats_path.exists():
-            return
-
-        if not contract_path.exists() or not settlement_path.exists():
-            return
-
-        with open(contract_path, "r") as f:
-            contract = json.load(f)
-
-        with open(settlement_path, "r") as f:
-            settlement = json.load(f)
-
-        stats_path.parent.mkdir(parents=True, exist_ok=True)
+    @property
+    def rolling(self) -> RollingStats:
+        if getattr(self, "_rolling", None) is None:
+            self._rolling = RollingStats(self._rolling_path())
+        return self._rolling
 
+    def _day_delta(self, contract: Dict[str, Any], settlement: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+        """
+        (tiers del stats.json diario, totales del día para el rolling, secuencia W/L/V).
+        Una pasada por picks + legs: las cuotas de las legs salen del índice por pick_id.
+        """
         tier_data = defaultdict(lambda: {
             "stake": 0.0,
             "profit": 0.0,
             "picks": 0
         })
+        totals = _empty_totals()
+        seq: List[str] = []
+
+        def add(tier: str, sport: str, stake: float, profit: float, result: str, is_parlay: bool) -> None:
+            _count(totals["all"], stake, profit, result, is_parlay)
+            _count(totals["tiers"].setdefault(tier, _empty_agg()), stake, profit, result, is_parlay)
+            _count(totals["sports"].setdefault(sport, _empty_agg()), stake, profit, result, is_parlay)
+            seq.append(_RESULT_CODES.get(result, "V"))
 
         # PICKS
         pick_map = {p["pick_id"]: p for p in contract.get("picks", [])}
+        settled_picks = {p["pick_id"]: p for p in settlement.get("picks", [])}
 
         for pick in settlement.get("picks", []):
             cp = pick_map.get(pick["pick_id"])
@@ -66,6 +263,7 @@ class StatsService:
             tier_data[tier]["stake"] += stake
             tier_data[tier]["profit"] += profit
             tier_data[tier]["picks"] += 1
+            add(tier, str(pick.get("sport") or cp.get("sport") or "unknown"), stake, profit, pick["result"], False)
 
         # PARLAYS
         parlay_map = {p["parlay_id"]: p for p in contract.get("parlays", [])}
@@ -77,15 +275,13 @@ class StatsService:
 
             tier = cp.get("tier", "classic")
             stake = cp.get("stake", 0.0)
+            legs = [settled_picks.get(leg["pick_id"]) for leg in parlay["legs"]]
 
             if parlay["final_result"] == "WIN":
                 odds = 1.0
-                for leg in parlay["legs"]:
-                    pick = next(
-                        p for p in settlement["picks"]
-                        if p["pick_id"] == leg["pick_id"]
-                    )
-                    odds *= pick["odds"]
+                for pick in legs:
+                    if pick is not None:
+                        odds *= pick["odds"]
                 profit = stake * (odds - 1)
             elif parlay["final_result"] == "LOSS":
                 profit = -stake
@@ -95,6 +291,9 @@ class StatsService:
             tier_data[tier]["stake"] += stake
             tier_data[tier]["profit"] += profit
 
+            sports = {str(p.get("sport") or "unknown") for p in legs if p is not None}
+            add(tier, sports.pop() if len(sports) == 1 else "multi", stake, profit, parlay["final_result"], True)
+
         tiers = {}
         for tier, d in tier_data.items():
             stake = d["stake"]
@@ -112,28 +311,95 @@ class StatsService:
                 "picks": picks
             }
 
+        return tiers, totals, "".join(seq)
+
+    def _load_day(self, date: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        contract_path = self._contract_path(date)
+        settlement_path = self._settlement_path(date)
+        if not contract_path.exists() or not settlement_path.exists():
+            return None
+
+        with open(contract_path, "r") as f:
+            contract = json.load(f)
+
+        with open(settlement_path, "r") as f:
+            settlement = json.load(f)
+
+        return contract, settlement
+
+    def build(self, date: str) -> bool:
+        """
+        stats/<date>/stats.json + delta del día en el rolling (idempotente).
+        Lo llama SettlementBuilder.build al escribir el settlement. Devuelve True si el
+        rolling cambió.
+        """
+        stats_path = self._stats_path(date)
+
+        if stats_path.exists() and date in self.rolling.state()["days"]:
+            return False
+
+        loaded = self._load_day(date)
+        if loaded is None:
+            return False
+
+        tiers, totals, seq = self._day_delta(*loaded)
+
         daily_stats = {
             "date": date,
             "tiers": tiers
         }
 
         # GUARDAR STATS DIARIOS
-        with open(stats_path, "w") as f:
-            json.dump(daily_stats, f, indent=2)
-
-        # HISTÓRICO
-        history_path = self._history_path()
-        history_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if history_path.exists():
-            with open(history_path, "r") as f:
-                history = json.load(f)
-        else:
-            history = {"history": []}
-
-        if not any(e["date"] == date for e in history["history"]):
-            history["history"].append(daily_stats)
-            history["history"].sort(key=lambda x: x["date"])
+        if not stats_path.exists():
+            stats_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(stats_path, "w") as f:
+                json.dump(daily_stats, f, indent=2)
+
+        # ROLLING (sustituye al append sobre stats/history.json)
+        return self.rolling.apply_day(date, totals, seq)
+
+    def rebuild_rolling(self) -> int:
+        """build() de todos los días con settlement que falten en el rolling (backfill)."""
+        settlements_dir = self.data_path / "settlements"
+        if not settlements_dir.exists():
+            return 0
+        applied = 0
+        for day_dir in sorted(settlements_dir.iterdir()):
+            if day_dir.name in self.rolling.state()["days"]:
+                continue
+            applied += int(self.build(day_dir.name))
+        return applied
 
-            with open(history_path, "w") as f:
-                json.dump(history, f, indent=2)
+    def _ensure_backfilled(self) -> None:
+        # primer summary del proceso con el rolling vacío: importar los settlements existentes
+        if self._backfilled:
+            return
+        with self._backfill_lock:
+            if self._backfilled:
+                return
+            if not self.rolling.state()["days"]:
+                self.rebuild_rolling()
+            self._backfilled = True
+
+    def summary(self, days: Optional[int] = None) -> Dict[str, Any]:
+        """Lifetime (days=None) o últimos N días, desde el estado rolling."""
+        self._ensure_backfilled()
+        return self.rolling.lifetime() if days is None else self.rolling.trailing(days)
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Rolling stats (stats/rolling.json) from settlements/<day>/settlement.json")
+    p.add_argument("days", nargs="*", help="YYYY-MM-DD days to build (default: every settled day missing from the rolling state)")
+    p.add_argument("--data-dir", default=str(Path(__file__).resolve().parents[1] / "data"))
+    p.add_argument("--trailing", type=int, default=None, help="Print the trailing N-day summary instead of lifetime")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    service = StatsService(Path(args.data_dir))
+    if args.days:
+        applied = sum(int(service.build(day)) for day in args.days)
+    else:
+        applied = service.rebuild_rolling()
+    print(json.dumps({"applied_days": applied, "summary": service.summary(args.trailing)}, ensure_ascii=False, indent=2))
@@ -0,0 +1,136 @@
+"""
+DF_UNIFIED_INGESTION: un único fetch de The Odds API por día para events/ y odds/.
+
+Antes el pipeline hacía dos pasadas: events_ingestion (TheOddsAPIClient, /events por
+deporte -> events/<day>/<sport>.json) y odds_ingestion_multisport (TheOddsAPICached ->
+odds/<day>/<sport>.json), es decir, dos requests por deporte sobre los mismos partidos y
+snapshots que podían no coincidir entre sí.
+
+Ahora cada deporte de The Odds API se pide una vez (fetch_all_odds, cacheado y en
+paralelo) y de ese mismo payload salen los dos snapshots, escritos en cuanto llega cada
+deporte. Ambos ficheros llevan el mismo "fetch_id", así que se puede comprobar que
+events/ y odds/ de un día vienen de la misma respuesta.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from api.services.api_theodds_cached import TheOddsAPICached
+    from api.services.events_ingestion import SUPPORTED_SPORTS, build_events_payload
+    from api.services.odds_ingestion_multisport import ODDS_MODE_BY_SPORT, build_sport_payload
+    from api.services.snapshot_store import write_json_artifact
+    from api.utils.paths import data_path, ensure_dir
+except ModuleNotFoundError:
+    from services.api_theodds_cached import TheOddsAPICached  # type: ignore
+    from services.events_ingestion import SUPPORTED_SPORTS, build_events_payload  # type: ignore
+    from services.odds_ingestion_multisport import ODDS_MODE_BY_SPORT, build_sport_payload  # type: ignore
+    from services.snapshot_store import write_json_artifact  # type: ignore
+    from utils.paths import data_path, ensure_dir  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def _odds_sport(sport: str) -> str:
+    return ODDS_MODE_BY_SPORT.get(sport, {}).get("odds_sport", sport)
+
+
+def _is_theodds(sport: str) -> bool:
+    return ODDS_MODE_BY_SPORT.get(sport, {}).get("mode", "theodds_api") == "theodds_api"
+
+
+def ingest_day(
+    day: Optional[str] = None,
+    force: bool = False,
+    events: bool = True,
+    odds_sports: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch único + escritura de events/<day>/<sport>.json y odds/<day>/<sport>.json.
+
+    events: escribir los snapshots de eventos (sin force, solo los que faltan).
+    odds_sports: deportes cuyo odds/<sport>.json hay que (re)escribir; None = todos.
+    Devuelve {day, fetch_id, events: [...], odds: [...]} con el estado por fichero.
+    """
+    if day is None:
+        day = date.today().isoformat()
+
+    events_dir = data_path("events", day)
+    odds_dir = data_path("odds", day)
+    event_sports = [s for s in SUPPORTED_SPORTS if _is_theodds(s)] if events else []
+    odds_selected = sorted(ODDS_MODE_BY_SPORT.keys()) if odds_sports is None else list(odds_sports)
+    unknown = [s for s in odds_selected if s not in ODDS_MODE_BY_SPORT]
+    if unknown:
+        raise ValueError(f"Unknown sports: {unknown}. Allowed: {sorted(ODDS_MODE_BY_SPORT.keys())}")
+    odds_selected = [s for s in odds_selected if _is_theodds(s)]
+
+    summary: Dict[str, Any] = {"day": day, "force": force, "fetch_id": None, "events": [], "odds": []}
+    if not event_sports and not odds_selected:
+        return summary
+    if event_sports:
+        ensure_dir(events_dir)
+    if odds_selected:
+        ensure_dir(odds_dir)
+
+    client = TheOddsAPICached()
+    written_events: set = set()
+    written_odds: set = set()
+
+    def _write(kind: str, sport: str, out_file: Path, payload: Dict[str, Any]) -> None:
+        try:
+            write_json_artifact(out_file, payload, sport=sport)
+            status = "created"
+        except Exception as e:
+            logger.error(f"Error writing {kind} {sport}: {e}")
+            status = "error"
+        summary[kind].append({"sport": sport, "status": status, "file": str(out_file), "results": payload.get("results", 0)})
+
+    def _write_sport(odds_sport: str, landed: List[Dict[str, Any]]) -> None:
+        # mismo payload para los dos snapshots: events/ con el sport del pipeline, odds/ tal cual
+        fetch_id = client.last_fetch_id
+        for sport in event_sports:
+            if sport in written_events or _odds_sport(sport) != odds_sport:
+                continue
+            written_events.add(sport)
+            out_file = events_dir / f"{sport}.json"
+            if out_file.exists() and out_file.stat().st_size > 2 and not force:
+                summary["events"].append({"sport": sport, "status": "skipped", "file": str(out_file), "results": 0})
+                continue
+            rows = [e if e.get("sport") == sport else dict(e, sport=sport) for e in landed]
+            _write("events", sport, out_file, build_events_payload(rows, fetch_id=fetch_id))
+        for sport in odds_selected:
+            if sport in written_odds or _odds_sport(sport) != odds_sport:
+                continue
+            written_odds.add(sport)
+            _write("odds", sport, odds_dir / f"{sport}.json", build_sport_payload(day, sport, {odds_sport: landed}, fetch_id=fetch_id))
+
+    logger.info(f"Unified ingestion for {day}: events={len(event_sports)} odds={len(odds_selected)} sports")
+    all_odds = client.fetch_all_odds(day, force_refresh=force, on_sport=_write_sport)
+    summary["fetch_id"] = client.last_fetch_id
+
+    # cache hit (o deportes que el plan de cuota no pidió): lo que no llegó por on_sport
+    for odds_sport in sorted({_odds_sport(s) for s in event_sports + odds_selected}):
+        _write_sport(odds_sport, all_odds.get(odds_sport, []))
+
+    return summary
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Single-fetch ingestion into api/data/events/<day> and api/data/odds/<day>")
+    p.add_argument("day", nargs="?", default=None, help="YYYY-MM-DD (default: today)")
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--no-events", action="store_true", help="Only write odds snapshots")
+    p.add_argument("--sports", default="", help=f"Comma-separated odds subset (default: all) Allowed: {','.join(sorted(ODDS_MODE_BY_SPORT.keys()))}")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    sports = [s.strip() for s in args.sports.split(",") if s.strip()] or None
+    print(json.dumps(ingest_day(args.day, force=args.force, events=not args.no_events, odds_sports=sports), ensure_ascii=False, indent=2))
@@ -1,9 +1,14 @@
 import os
-import requests
-from typing import Optional, Dict
+from typing import Dict, Iterable, Optional
+
+try:
+    from services.quota_budget import BudgetExhausted, budget_get
+except ModuleNotFoundError:
+    from api.services.quota_budget import BudgetExhausted, budget_get  # type: ignore
 
 API_KEY = os.getenv("API_FOOTBALL_KEY")
 BASE_URL = "https://v3.football.api-sports.io"
+FIXTURES_BATCH_SIZE = 20  # máximo de ids por request en /fixtures?ids=
 
 
 def get_football_result(bet: Dict) -> Optional[Dict]:
@@ -23,12 +28,16 @@ def get_football_result(bet: Dict) -> Optional[Dict]:
         "x-apisports-key": API_KEY
     }
 
-    response = requests.get(
-        f"{BASE_URL}/fixtures",
-        headers=headers,
-        params={"id": fixture_id},
-        timeout=10
-    )
+    try:
+        response = budget_get(
+            f"{BASE_URL}/fixtures",
+            headers=headers,
+            params={"id": fixture_id},
+            timeout=10,
+            priority="settlement"
+        )
+    except BudgetExhausted:
+        return None
 
     if response.status_code != 200:
         return None
@@ -38,7 +47,10 @@ def get_football_result(bet: Dict) -> Optional[Dict]:
     if not data.get("response"):
         return None
 
-    fixture = data["response"][0]
+    return _final_result(data["response"][0])
+
+
+def _final_result(fixture: Dict) -> Optional[Dict]:
     status = fixture["fixture"]["status"]["short"]
 
     # Partido no finalizado
@@ -52,3 +64,42 @@ def get_football_result(bet: Dict) -> Optional[Dict]:
         "away": goals["away"],
         "status": status
     }
+
+
+def get_football_results(fixture_ids: Iterable) -> Dict[str, Dict]:
+    """
+    Resultados de varios fixtures: {fixtureId: resultado}, solo los finalizados.
+    Una request por cada FIXTURES_BATCH_SIZE ids (parámetro ids=1-2-3 de API-Sports).
+    """
+
+    if not API_KEY:
+        raise RuntimeError("API_FOOTBALL_KEY not set")
+
+    ids = sorted({str(x) for x in fixture_ids if x})
+    headers = {
+        "x-apisports-key": API_KEY
+    }
+
+    out: Dict[str, Dict] = {}
+    for start in range(0, len(ids), FIXTURES_BATCH_SIZE):
+        chunk = ids[start:start + FIXTURES_BATCH_SIZE]
+        try:
+            response = budget_get(
+                f"{BASE_URL}/fixtures",
+                headers=headers,
+                params={"ids": "-".join(chunk)},
+                timeout=10,
+                priority="settlement"
+            )
+        except BudgetExhausted:
+            # sin cuota: los pendientes se liquidan en la próxima pasada
+            break
+        if response.status_code != 200:
+            continue
+
+        for fixture in response.json().get("response") or []:
+            result = _final_result(fixture)
+            if result is not None:
+                out[str(fixture["fixture"]["id"])] = result
+
+    return out
@@ -1,6 +1,11 @@
 import os
-import requests
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional
+
+try:
+    from services.http_transport import http_get
+except ModuleNotFoundError:
+    from api.services.http_transport import http_get  # type: ignore
 
 API_KEY = os.getenv("THESPORTSDB_API_KEY", "1")
 BASE_URL = "https://www.thesportsdb.com/api/v1/json"
@@ -16,7 +21,11 @@ def get_other_sport_result(bet: Dict) -> Optional[Dict]:
     if not event_id:
         return None
 
-    response = requests.get(
+    return _lookup_event(event_id)
+
+
+def _lookup_event(event_id) -> Optional[Dict]:
+    response = http_get(
         f"{BASE_URL}/{API_KEY}/lookupevent.php",
         params={"id": event_id},
         timeout=10
@@ -42,3 +51,26 @@ def get_other_sport_result(bet: Dict) -> Optional[Dict]:
         "away": int(event["intAwayScore"]),
         "status": "FT"
     }
+
+
+def get_other_sport_results(event_ids: Iterable, max_workers: int = 4) -> Dict[str, Dict]:
+    """
+    Resultados de varios eventos: {eventId: resultado}, solo los finalizados.
+    lookupevent.php no acepta varios ids: una request por evento distinto, en paralelo.
+    """
+    ids = sorted({str(x) for x in event_ids if x})
+    out: Dict[str, Dict] = {}
+    if not ids:
+        return out
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ids)))) as pool:
+        futures = {pool.submit(_lookup_event, eid): eid for eid in ids}
+        for fut in as_completed(futures):
+            try:
+                result = fut.result()
+            except Exception:
+                continue
+            if result is not None:
+                out[futures[fut]] = result
+
+    return out
@@ -57,9 +57,14 @@ async function getContract(signal?: AbortSignal): Promise<Contract> {
   return res.json();
 }
 
-async function getLiveEvents(sport: string, idsCsv: string, signal?: AbortSignal) {
-  const qs = new URLSearchParams({ sport, ids: idsCsv }).toString();
-  const res = await fetch(`${BACKEND_URL}/live/events?${qs}`, { cache: "no-store", signal });
+async function getLiveEventsBatch(idsBySport: Record<string, string[]>, signal?: AbortSignal) {
+  const res = await fetch(`${BACKEND_URL}/live/events/batch`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(idsBySport),
+    cache: "no-store",
+    signal,
+  });
   if (!res.ok) return null;
   return res.json();
 }
@@ -407,6 +412,7 @@ export default function Page() {
   const [selectedHistoryDay, setSelectedHistoryDay] = useState<string | null>(null);
   const [historyDayData, setHistoryDayData] = useState<any | null>(null);
   const liveRef = useRef<Record<string, any>>({});
+  const liveStreamOpenRef = useRef<boolean>(false);
 
   useEffect(() => {
     const ctrl = new AbortController();
@@ -448,7 +454,87 @@ export default function Page() {
     liveRef.current = liveOverrideByKey;
   }, [liveOverrideByKey]);
 
-  // Live polling (READ-ONLY): 1 request por deporte cada tick (ids deduplicados)
+  // Live push (SSE): el backend publica los deltas de score una sola vez para todos los clientes
+  useEffect(() => {
+    if (!contract || typeof window === "undefined" || typeof EventSource === "undefined") return;
+
+    const keys = new Set<string>();
+    const addKey = (p: any) => {
+      const k = liveKey(p?.sport, p?.eventId);
+      if (k) keys.add(k);
+    };
+    for (const p of asPickList(contract)) addKey(p);
+    for (const par of contract.picks_parlay_premium || []) for (const leg of (par?.legs || [])) addKey(leg);
+    const fp: any = (contract as any).daily_featured_parlay;
+    if (fp && typeof fp === "object") for (const leg of (fp?.legs || [])) addKey(leg);
+    if (keys.size === 0) return;
+
+    const params = new URLSearchParams({ ids: Array.from(keys).join(",") });
+    const day = (contract as any).cycle_day;
+    if (day) params.set("day", String(day));
+    const es = new EventSource(`${BACKEND_URL}/live/stream?${params.toString()}`);
+    const resyncCtrl = new AbortController();
+
+    const applyDeltas = (deltas: any[]) => {
+      if (!Array.isArray(deltas) || deltas.length === 0) return;
+      setLiveOverrideByKey((prev) => {
+        const next = { ...prev };
+        for (const d of deltas) {
+          const k = liveKey(d?.sport, d?.eventId);
+          if (k && d?.live) (next as any)[k] = d.live;
+        }
+        return next;
+      });
+    };
+
+    es.onopen = () => {
+      liveStreamOpenRef.current = true;
+    };
+    es.onerror = () => {
+      // EventSource reintenta solo; mientras tanto el polling hace de fallback
+      liveStreamOpenRef.current = false;
+    };
+    es.addEventListener("snapshot", (ev: MessageEvent) => {
+      try {
+        applyDeltas(JSON.parse(ev.data)?.events);
+      } catch {
+        // ignore malformed payload
+      }
+    });
+    es.addEventListener("live", (ev: MessageEvent) => {
+      try {
+        applyDeltas(JSON.parse(ev.data));
+      } catch {
+        // ignore malformed payload
+      }
+    });
+    // el servidor descartó deltas (cliente lento): recargar el estado live de todos los eventos
+    es.addEventListener("resync", () => {
+      const idsBySport: Record<string, string[]> = {};
+      for (const k of keys) {
+        const i = k.indexOf(":");
+        const sport = k.slice(0, i);
+        if (!idsBySport[sport]) idsBySport[sport] = [];
+        idsBySport[sport].push(k.slice(i + 1));
+      }
+      getLiveEventsBatch(idsBySport, resyncCtrl.signal)
+        .then((data) => {
+          const liveById = data?.live_by_id;
+          if (liveById && typeof liveById === "object") setLiveOverrideByKey((prev) => ({ ...prev, ...liveById }));
+        })
+        .catch(() => {
+          // silent: los próximos deltas (o el polling) vuelven a alinear
+        });
+    });
+
+    return () => {
+      liveStreamOpenRef.current = false;
+      resyncCtrl.abort();
+      es.close();
+    };
+  }, [contract]);
+
+  // Live polling (READ-ONLY, fallback sin SSE): 1 request batch por tick (ids deduplicados)
   useEffect(() => {
     if (!contract) return;
     const ctrl = new AbortController();
@@ -456,6 +542,7 @@ export default function Page() {
 
     const tick = async () => {
       if (stopped) return;
+      if (liveStreamOpenRef.current) return;
       const now = Date.now();
 
       const byK = new Map<string, { sport: string; id: string; startMs: number | null; snapshotLive: any }>();
@@ -512,23 +599,19 @@ export default function Page() {
         activeIdsBySport.get(ev.sport)!.add(ev.id);
       }
 
+      const idsBySport: Record<string, string[]> = {};
       for (const [sport, idSet] of activeIdsBySport.entries()) {
-        const idsCsv = Array.from(idSet).join(",");
-        if (!idsCsv) continue;
-        try {
-          const data = await getLiveEvents(sport, idsCsv, ctrl.signal);
-          const liveById = data?.live_by_id;
-          if (!liveById || typeof liveById !== "object") continue;
-          setLiveOverrideByKey((prev) => {
-            const next = { ...prev };
-            for (const [id, live] of Object.entries(liveById)) {
-              (next as any)[`${sport}:${String(id)}`] = live;
-            }
-            return next;
-          });
-        } catch {
-          // silent: UI falls back to snapshot
-        }
+        if (idSet.size) idsBySport[sport] = Array.from(idSet);
+      }
+      if (Object.keys(idsBySport).length === 0) return;
+      try {
+        // 1 request por tick para todos los deportes (claves "sport:eventId")
+        const data = await getLiveEventsBatch(idsBySport, ctrl.signal);
+        const liveById = data?.live_by_id;
+        if (!liveById || typeof liveById !== "object") return;
+        setLiveOverrideByKey((prev) => ({ ...prev, ...liveById }));
+      } catch {
+        // silent: UI falls back to snapshot
       }
     };
 